@@ -1,5 +1,5 @@
 # 用户认证模块
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
@@ -7,7 +7,7 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from app.database import get_db
 from app.models import User
-from app.config import DATABASE_URL
+from app.config import DATABASE_URL, BOOKING_STREAM_TOKEN_EXPIRE_SECONDS
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -17,6 +17,9 @@ SECRET_KEY = "your-secret-key-change-in-production"  # 生产环境必须修改
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30天
 
+# 预订事件流令牌的用途标记（带 scope 的令牌不能用作普通访问令牌）
+BOOKING_STREAM_SCOPE = "booking_stream"
+
 # HTTP Bearer Token 认证
 security = HTTPBearer()
 
@@ -57,7 +60,7 @@ def get_current_user(
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str = payload.get("sub")
-        if user_id_str is None:
+        if user_id_str is None or payload.get("scope"):
             raise credentials_exception
         # JWT标准要求sub是字符串，需要转换为整数
         user_id: int = int(user_id_str)
@@ -96,7 +99,7 @@ def get_current_user_optional(
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str = payload.get("sub")
         
-        if user_id_str is None:
+        if user_id_str is None or payload.get("scope"):
             return None
         
         # JWT标准要求sub是字符串，需要转换为整数
@@ -134,3 +137,44 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
             detail="需要管理员权限"
         )
     return current_user
+
+def create_stream_token(user: User) -> str:
+    """创建预订事件流的短期令牌（只能用于建立事件流连接）"""
+    return create_access_token(
+        {"sub": str(user.id), "scope": BOOKING_STREAM_SCOPE},
+        expires_delta=timedelta(seconds=BOOKING_STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+
+def require_stream_admin(
+    token: str | None = Query(None, description="事件流令牌（EventSource 无法设置请求头时使用）"),
+    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    事件流的管理员认证：优先使用查询参数中的短期事件流令牌，否则使用 Authorization 请求头
+    """
+    if token is None:
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="请先登录",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return require_admin(get_current_user(credentials, db))
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="无效或已过期的事件流令牌"
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("scope") != BOOKING_STREAM_SCOPE:
+            raise credentials_exception
+        user_id = int(payload.get("sub"))
+    except (JWTError, ValueError, TypeError):
+        raise credentials_exception
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None or user.status != "active":
+        raise credentials_exception
+    return require_admin(user)
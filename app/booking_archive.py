@@ -0,0 +1,128 @@
+# 预订冷热分离
+# 离店超过 BOOKING_ARCHIVE_AFTER_DAYS 天的已完成、已取消、未入住预订按批从 bookings 表迁移到 bookings_archive 表，
+# 创建、查询、取消预订等热路径只访问 bookings 表；统计、对账等需要历史数据的查询
+# 在查询范围涉及已归档日期时同时读取两张表：统计查询通过 booking_tables_for_range 对每张表分别聚合后相加
+# （日期条件直接作用于各表的索引），需要整体分组的对账查询使用 bookings_for_range 的 UNION ALL。
+# 由应用内调度器定时执行，也可单独运行：python -m app.booking_archive
+import logging
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import List, Optional
+from sqlalchemy import exists, func, insert, select, union_all
+from sqlalchemy.orm import Session, aliased
+from app.booking_events import booking_events
+from app.config import BOOKING_ARCHIVE_AFTER_DAYS, BOOKING_ARCHIVE_BATCH_SIZE
+from app.models import Booking, BookingArchive, Review, UserCoupon
+
+logger = logging.getLogger(__name__)
+
+# 可归档的预订状态（不再变化、不占用库存）
+ARCHIVABLE_STATUSES = ("completed", "cancelled", "no_show")
+
+# 两张表共有的列（归档表额外有 archived_at）
+BOOKING_COLUMNS = [column.name for column in Booking.__table__.columns]
+
+def latest_archived_check_in(db: Session) -> Optional[date]:
+    """归档表中最晚的入住日期（走 check_in_date 索引），归档表为空时返回 None"""
+    return db.query(func.max(BookingArchive.check_in_date)).scalar()
+
+def booking_tables_for_range(db: Session, start_date: Optional[date] = None) -> List[type]:
+    """
+    返回查询范围（入住日期 >= start_date）涉及的预订模型：[Booking] 或 [Booking, BookingArchive]
+    调用方对每张表分别查询、聚合后合并结果，避免在 UNION ALL 派生表上过滤导致两张表被全量读取
+    """
+    latest = latest_archived_check_in(db)
+    if latest is None or (start_date and start_date > latest):
+        return [Booking]
+    return [Booking, BookingArchive]
+
+def bookings_for_range(db: Session, start_date: Optional[date] = None):
+    """
+    返回统计查询使用的预订实体
+    查询范围（入住日期 >= start_date）不涉及已归档的日期时直接返回 Booking；
+    否则返回 bookings ∪ bookings_archive 的别名，用法与 Booking 相同（只读）
+    """
+    latest = latest_archived_check_in(db)
+    if latest is None or (start_date and start_date > latest):
+        return Booking
+
+    live = Booking.__table__
+    archived = BookingArchive.__table__
+    combined = union_all(
+        select(*[live.c[name] for name in BOOKING_COLUMNS]),
+        select(*[archived.c[name] for name in BOOKING_COLUMNS])
+    ).subquery("bookings_all")
+    return aliased(Booking, combined)
+
+def find_archived_booking(db: Session, booking_id: int) -> Optional[BookingArchive]:
+    """按ID查询已归档的预订"""
+    return db.query(BookingArchive).filter(BookingArchive.id == booking_id).first()
+
+def archive_bookings(
+    db: Session,
+    before: Optional[date] = None,
+    batch_size: int = BOOKING_ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    将离店日期早于 before 的可归档预订分批迁移到归档表，返回迁移的预订数
+    每批在一个事务中完成“复制到归档表 + 从预订表删除”，提交后发布 booking.archived 事件。
+    仍被评论或用户优惠券引用的预订不归档（外键为 ON DELETE SET NULL，删除会丢失关联）
+    """
+    before = before or date.today() - timedelta(days=BOOKING_ARCHIVE_AFTER_DAYS)
+    start = time.perf_counter()
+    live = Booking.__table__
+    total = 0
+
+    while True:
+        rows = db.query(
+            Booking.id,
+            Booking.booking_no,
+            Booking.user_id,
+            Booking.hotel_id,
+            Booking.room_type_id,
+            Booking.check_in_date,
+            Booking.check_out_date,
+            Booking.room_count,
+            Booking.final_price,
+            Booking.status
+        ).filter(
+            Booking.status.in_(ARCHIVABLE_STATUSES),
+            Booking.check_out_date < before,
+            ~exists().where(Review.booking_id == Booking.id),
+            ~exists().where(UserCoupon.booking_id == Booking.id)
+        ).order_by(Booking.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+
+        db.execute(insert(BookingArchive.__table__).from_select(
+            BOOKING_COLUMNS,
+            select(*[live.c[name] for name in BOOKING_COLUMNS]).where(live.c.id.in_(ids))
+        ))
+        db.query(Booking).filter(Booking.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        # 已归档的预订从前台的当前预订列表中移除
+        for row in rows:
+            booking_events.publish("booking.archived", SimpleNamespace(**row._asdict()))
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    logger.info("归档离店早于 %s 的预订 %d 条，耗时 %.1fms", before, total, (time.perf_counter() - start) * 1000)
+    return total
+
+def run_archive() -> int:
+    """定时任务入口：使用独立会话执行归档"""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        return archive_bookings(session)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    # 单独运行：python -m app.booking_archive
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(f"归档预订 {run_archive()} 条")
@@ -0,0 +1,162 @@
+# 预订事件推送（进程内发布/订阅）
+# 创建、取消、修改预订以及状态自动流转、归档提交后发布事件，前台和管理页面通过 SSE 长连接实时接收，不再轮询预订列表。
+# 最近的事件保存在有界环形缓冲区中，断线重连时按 Last-Event-ID 补发错过的事件；
+# 错过的事件已被挤出缓冲区（或服务已重启）时发送 reset 事件，客户端应重新加载预订列表。
+# 事件只在当前进程内传递：多进程部署时每个进程只推送本进程处理的预订变更
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+from app.config import BOOKING_EVENT_BUFFER_SIZE, BOOKING_EVENT_QUEUE_MAX
+
+class BookingEvent:
+    """一条已编号的预订事件"""
+
+    __slots__ = ("seq", "event_id", "event_type", "hotel_id", "data")
+
+    def __init__(self, seq: int, event_id: str, event_type: str, hotel_id: Optional[int], data: str):
+        self.seq = seq
+        self.event_id = event_id
+        self.event_type = event_type
+        self.hotel_id = hotel_id
+        self.data = data
+
+    def encode(self) -> str:
+        """SSE 消息格式"""
+        return f"id: {self.event_id}\nevent: {self.event_type}\ndata: {self.data}\n\n"
+
+class Subscription:
+    """一个 SSE 连接的订阅，事件通过所在事件循环的队列传递"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, hotel_id: Optional[int]):
+        self.loop = loop
+        self.hotel_id = hotel_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def matches(self, event: BookingEvent) -> bool:
+        return self.hotel_id is None or event.hotel_id is None or event.hotel_id == self.hotel_id
+
+    def deliver(self, event: Optional[BookingEvent]):
+        """在订阅所在的事件循环中执行；客户端处理不过来时断开，由客户端带 Last-Event-ID 重连补发"""
+        if self.closed:
+            return
+        if event is None or self.queue.qsize() >= BOOKING_EVENT_QUEUE_MAX:
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Optional[BookingEvent]:
+        """下一条事件；连接需要关闭时返回 None"""
+        return await self.queue.get()
+
+def booking_payload(booking) -> dict:
+    """事件中携带的预订摘要"""
+    return {
+        "id": booking.id,
+        "booking_no": booking.booking_no,
+        "user_id": booking.user_id,
+        "hotel_id": booking.hotel_id,
+        "room_type_id": booking.room_type_id,
+        "check_in_date": booking.check_in_date.isoformat(),
+        "check_out_date": booking.check_out_date.isoformat(),
+        "room_count": booking.room_count,
+        "final_price": str(booking.final_price),
+        "status": booking.status,
+    }
+
+class BookingEventBroker:
+    """进程内的预订事件发布/订阅，线程安全（同步路由在线程池中发布，SSE 连接在事件循环中订阅）"""
+
+    def __init__(self, buffer_size: int = BOOKING_EVENT_BUFFER_SIZE):
+        # 每次进程启动生成新的流ID，重启前的事件ID不会被误认为可以续传
+        self.stream_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self._subscribers = set()
+
+    def publish(self, event_type: str, booking) -> BookingEvent:
+        """发布预订事件（应在事务提交之后调用）"""
+        data = json.dumps({
+            "type": event_type,
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "booking": booking_payload(booking),
+        }, ensure_ascii=False)
+        with self._lock:
+            seq = next(self._seq)
+            event = BookingEvent(seq, f"{self.stream_id}:{seq}", event_type, booking.hotel_id, data)
+            self._buffer.append(event)
+            self._last_seq = seq
+            subscribers = [subscription for subscription in self._subscribers if subscription.matches(event)]
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # 事件循环已关闭（连接已结束）
+                self.unsubscribe(subscription)
+        return event
+
+    def _events_after(self, last_event_id: Optional[str]) -> Tuple[List[BookingEvent], bool]:
+        """
+        缓冲区中 last_event_id 之后的事件（调用方持有锁）
+        返回 (事件列表, 是否完整)；不完整说明有事件已无法补发
+        """
+        if not last_event_id:
+            return [], True
+        stream_id, _, seq = last_event_id.partition(":")
+        if stream_id != self.stream_id or not seq.isdigit():
+            return [], False
+
+        seq = int(seq)
+        first_seq = self._buffer[0].seq if self._buffer else self._last_seq + 1
+        if seq > self._last_seq or seq < first_seq - 1:
+            return [], False
+        return list(itertools.islice(self._buffer, seq - first_seq + 1, None)), True
+
+    def subscribe(self, hotel_id: Optional[int] = None, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        新建订阅（在事件循环中调用），先放入需要补发的事件
+        注册订阅与读取补发事件在同一把锁内完成，之间发布的事件不会遗漏也不会重复
+        """
+        subscription = Subscription(asyncio.get_running_loop(), hotel_id)
+        with self._lock:
+            backlog, complete = self._events_after(last_event_id)
+            self._subscribers.add(subscription)
+            reset_id = f"{self.stream_id}:{self._last_seq}"
+
+        if not complete:
+            # 无法续传：通知客户端重新加载预订列表，之后从当前位置继续
+            subscription.queue.put_nowait(BookingEvent(
+                self._last_seq, reset_id, "reset", None,
+                json.dumps({"type": "reset", "reason": "部分事件已过期，请重新加载预订列表"}, ensure_ascii=False)
+            ))
+        for event in backlog:
+            if subscription.matches(event):
+                subscription.queue.put_nowait(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def close_all(self):
+        """关闭所有订阅（应用关闭时调用，让 SSE 连接尽快结束）"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, None)
+            except RuntimeError:
+                pass
+
+# 全局事件中心实例
+booking_events = BookingEventBroker()
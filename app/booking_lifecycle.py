@@ -0,0 +1,142 @@
+# 预订状态自动流转
+# 定时按日期批量推进预订状态，并释放这些预订占用的库存：
+#   - 已确认、已到离店日期的预订 → completed（已完成）
+#   - 待确认、入住日期已过的预订 → no_show（未入住）
+#   - 待确认超过 PENDING_BOOKING_EXPIRE_MINUTES 分钟的预订 → cancelled（超时取消）
+# 由应用内调度器定时执行，也可单独运行：python -m app.booking_lifecycle
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from app.booking_events import booking_events
+from app.config import BOOKING_LIFECYCLE_BATCH_SIZE, PENDING_BOOKING_EXPIRE_MINUTES
+from app.inventory import NO_ROOM_TYPE, release_rooms_bulk, stay_dates
+from app.models import Booking
+from app.user_counters import record_bookings_cancelled_bulk
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_CANCEL_REASON = "超时未确认，系统自动取消"
+
+# 同一批预订在锁内状态不一致时最多重新选取的次数，超过后本轮跳过这批预订，留待下一轮处理
+MAX_BATCH_CONFLICTS = 3
+
+def _transition(db: Session, old_status: str, condition, values: dict, today: date, batch_size: int) -> int:
+    """
+    将满足 condition 的 old_status 预订分批更新为 values，返回处理的预订数
+    每批：锁定一批预订（跳过正被其他事务修改的行）→ 按ID和原状态条件更新 → 批量释放库存 → 提交 → 发布预订事件
+    """
+    new_status = values[Booking.status]
+    event_type = "booking.cancelled" if new_status == "cancelled" else "booking.updated"
+    total = 0
+    conflicts = 0
+    skipped_ids = set()
+    while True:
+        rows = db.query(
+            Booking.id,
+            Booking.booking_no,
+            Booking.user_id,
+            Booking.hotel_id,
+            Booking.room_type_id,
+            Booking.check_in_date,
+            Booking.check_out_date,
+            Booking.room_count,
+            Booking.final_price
+        ).filter(
+            Booking.status == old_status,
+            condition,
+            Booking.id.notin_(skipped_ids)
+        ).order_by(Booking.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not rows:
+            break
+
+        # 按原状态条件更新，在锁内再次确认状态：有预订已被其他事务（如用户取消）改变状态时
+        # 放弃本批并重新选取，避免重复释放同一预订的库存
+        updated = db.query(Booking).filter(
+            Booking.id.in_([row.id for row in rows]),
+            Booking.status == old_status
+        ).update(values, synchronize_session=False)
+        if updated < len(rows):
+            db.rollback()
+            conflicts += 1
+            if conflicts >= MAX_BATCH_CONFLICTS:
+                logger.warning(
+                    "预订状态流转 %s → %s 连续 %d 次遇到状态冲突，本轮跳过 %d 条预订",
+                    old_status, new_status, conflicts, len(rows)
+                )
+                skipped_ids.update(row.id for row in rows)
+                conflicts = 0
+            continue
+        conflicts = 0
+
+        # 过去的日期不会再被预订，只释放今天及以后的库存
+        releases = Counter()
+        for row in rows:
+            for stay_date in stay_dates(max(row.check_in_date, today), row.check_out_date):
+                releases[(row.hotel_id, row.room_type_id or NO_ROOM_TYPE, stay_date)] += row.room_count or 0
+        release_rooms_bulk(db, releases)
+
+        if new_status == "cancelled":
+            record_bookings_cancelled_bulk(db, Counter(row.user_id for row in rows))
+
+        db.commit()
+        # 前台页面据此刷新预订状态和空房
+        for row in rows:
+            booking_events.publish(event_type, SimpleNamespace(**row._asdict(), status=new_status))
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
+
+def advance_booking_statuses(
+    db: Session,
+    now: Optional[datetime] = None,
+    batch_size: int = BOOKING_LIFECYCLE_BATCH_SIZE
+) -> Dict[str, int]:
+    """
+    执行一轮状态流转，返回 {"completed": 完成数, "no_show": 未入住数, "expired": 超时取消数}
+    """
+    now = now or datetime.now()
+    today = now.date()
+    start = time.perf_counter()
+
+    counts = {
+        "completed": _transition(
+            db, "confirmed", Booking.check_out_date <= today,
+            {Booking.status: "completed"}, today, batch_size
+        ),
+        "no_show": _transition(
+            db, "pending", Booking.check_in_date < today,
+            {Booking.status: "no_show"}, today, batch_size
+        ),
+        "expired": _transition(
+            db, "pending", Booking.booking_time < now - timedelta(minutes=PENDING_BOOKING_EXPIRE_MINUTES),
+            {Booking.status: "cancelled", Booking.cancel_time: now, Booking.cancel_reason: EXPIRED_CANCEL_REASON},
+            today, batch_size
+        ),
+    }
+
+    logger.info(
+        "预订状态流转完成：已完成 %d，未入住 %d，超时取消 %d，耗时 %.1fms",
+        counts["completed"], counts["no_show"], counts["expired"], (time.perf_counter() - start) * 1000
+    )
+    return counts
+
+def run_lifecycle() -> Dict[str, int]:
+    """定时任务入口：使用独立会话执行一轮状态流转"""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        return advance_booking_statuses(session)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    # 单独运行：python -m app.booking_lifecycle
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    result = run_lifecycle()
+    print(f"已完成 {result['completed']}，未入住 {result['no_show']}，超时取消 {result['expired']}")
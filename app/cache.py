@@ -0,0 +1,124 @@
+# 进程内缓存
+# 带过期时间（TTL）和最近最少使用（LRU）淘汰的缓存，支持按标签精确失效，并统计命中率
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Set, Tuple
+
+# 缓存未命中时返回的哨兵对象（缓存值本身可能为 None）
+MISSING = object()
+
+class TTLCache:
+    """
+    TTL + LRU 缓存
+    每个条目可以附带若干标签，写操作按标签失效相关条目
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl_seconds: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # 键 -> (过期时间, 值, 标签)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[Hashable, ...]]]" = OrderedDict()
+        # 标签 -> 键集合
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """读取缓存，未命中或已过期时返回 MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            if entry[0] < time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """删除单个条目"""
+        with self._lock:
+            if self._pop(key):
+                self.invalidations += 1
+
+    def invalidate_tag(self, tag: Hashable):
+        """删除带有指定标签的全部条目"""
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                if self._pop(key):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+
+    def _pop(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率等统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+# 已创建的缓存（用于统计接口）
+_caches: Dict[str, TTLCache] = {}
+
+def create_cache(name: str, maxsize: int, ttl_seconds: float) -> TTLCache:
+    """创建并登记一个缓存"""
+    cache = TTLCache(name, maxsize, ttl_seconds)
+    _caches[name] = cache
+    return cache
+
+def get_cache_stats() -> list:
+    """获取所有缓存的统计信息"""
+    return [cache.stats() for cache in _caches.values()]
@@ -12,6 +12,53 @@ APP_NAME = "在线酒店预订系统"
 APP_VERSION = "1.0.0"
 DEBUG = True
 
+# 酒店搜索索引定期全量重建的间隔（秒），用于同步其他进程对酒店数据的修改
+SEARCH_INDEX_REFRESH_SECONDS = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "600"))
+
+# 酒店浏览次数写回数据库的间隔（秒）
+VIEW_COUNT_FLUSH_SECONDS = int(os.getenv("VIEW_COUNT_FLUSH_SECONDS", "10"))
+
+# 酒店列表/详情响应缓存
+HOTEL_CACHE_TTL_SECONDS = int(os.getenv("HOTEL_CACHE_TTL_SECONDS", "60"))
+HOTEL_CACHE_MAX_ENTRIES = int(os.getenv("HOTEL_CACHE_MAX_ENTRIES", "1000"))
+
+# 内存缓存检查数据库版本号的最短间隔（秒），其他进程的修改最多延迟这么久生效
+VERSION_CHECK_SECONDS = int(os.getenv("VERSION_CHECK_SECONDS", "5"))
+
+# 节假日日历缓存的最长有效期（秒），到期后即使版本号未变也重新加载
+HOLIDAY_CACHE_TTL_SECONDS = int(os.getenv("HOLIDAY_CACHE_TTL_SECONDS", "3600"))
+
+# 优惠券有效期索引的最长有效期（秒），到期后即使版本号未变也重新加载
+COUPON_INDEX_TTL_SECONDS = int(os.getenv("COUPON_INDEX_TTL_SECONDS", "600"))
+
+# 价格报价缓存（相同酒店、房型、日期和用户分群的报价在有效期内直接复用）
+PRICE_QUOTE_CACHE_TTL_SECONDS = int(os.getenv("PRICE_QUOTE_CACHE_TTL_SECONDS", "300"))
+PRICE_QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_QUOTE_CACHE_MAX_ENTRIES", "10000"))
+
+# 用户预订计数对账任务的执行间隔（秒）
+USER_COUNTER_RECONCILE_SECONDS = int(os.getenv("USER_COUNTER_RECONCILE_SECONDS", "86400"))
+
+# 预订幂等键的保留时间（秒）及过期键的清理间隔（秒）
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_KEY_PURGE_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_PURGE_SECONDS", "3600"))
+
+# 预订状态流转任务：执行间隔（秒）、待确认预订的超时时间（分钟）、每批处理的预订数
+BOOKING_LIFECYCLE_INTERVAL_SECONDS = int(os.getenv("BOOKING_LIFECYCLE_INTERVAL_SECONDS", "300"))
+PENDING_BOOKING_EXPIRE_MINUTES = int(os.getenv("PENDING_BOOKING_EXPIRE_MINUTES", "30"))
+BOOKING_LIFECYCLE_BATCH_SIZE = int(os.getenv("BOOKING_LIFECYCLE_BATCH_SIZE", "500"))
+
+# 预订归档：离店超过多少天的已完成、已取消、未入住预订移入归档表；任务执行间隔（秒）；每批迁移的预订数
+BOOKING_ARCHIVE_AFTER_DAYS = int(os.getenv("BOOKING_ARCHIVE_AFTER_DAYS", "365"))
+BOOKING_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("BOOKING_ARCHIVE_INTERVAL_SECONDS", "86400"))
+BOOKING_ARCHIVE_BATCH_SIZE = int(os.getenv("BOOKING_ARCHIVE_BATCH_SIZE", "1000"))
+
+# 预订事件推送（SSE）：补发用的环形缓冲区大小、单个连接允许积压的事件数、心跳间隔（秒）
+BOOKING_EVENT_BUFFER_SIZE = int(os.getenv("BOOKING_EVENT_BUFFER_SIZE", "1000"))
+BOOKING_EVENT_QUEUE_MAX = int(os.getenv("BOOKING_EVENT_QUEUE_MAX", "1000"))
+BOOKING_EVENT_HEARTBEAT_SECONDS = int(os.getenv("BOOKING_EVENT_HEARTBEAT_SECONDS", "15"))
+# 预订事件流令牌的有效期（秒）：EventSource 不能设置请求头，通过查询参数传递短期令牌，只用于建立连接
+BOOKING_STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("BOOKING_STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+
 # CORS配置
 ALLOWED_ORIGINS = [
     "http://localhost:8000",
@@ -0,0 +1,69 @@
+# 优惠券有效期索引
+# 将优惠券的有效期加载为区间索引，“今天有效的优惠券”在内存中查询，
+# 再按ID取回完整记录（使用数量等会变化的字段始终来自数据库）。
+# 优惠券创建、修改、删除时递增 coupons 版本号，各进程检测到版本变化后重建；
+# 索引另有最长有效期，兜底直接改库等未递增版本号的修改
+from datetime import date
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.config import COUPON_INDEX_TTL_SECONDS
+from app.interval_index import IntervalIndex
+from app.models import Coupon
+from app.versions import VersionedCache
+
+COUPONS_VERSION = "coupons"
+
+class CouponEntry:
+    """索引中保存的优惠券筛选字段"""
+
+    __slots__ = ("id", "hotel_id", "is_active", "user_level")
+
+    def __init__(self, id: int, hotel_id: Optional[int], is_active: bool, user_level: Optional[str]):
+        self.id = id
+        self.hotel_id = hotel_id
+        self.is_active = is_active
+        self.user_level = user_level
+
+class CouponIndex:
+    """优惠券有效期区间索引（只读快照）"""
+
+    def __init__(self, rows):
+        self._index = IntervalIndex(
+            (start_date, end_date, CouponEntry(id, hotel_id, bool(is_active), user_level))
+            for id, start_date, end_date, hotel_id, is_active, user_level in rows
+        )
+
+    def valid_on(
+        self,
+        day: date,
+        hotel_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        user_levels: Optional[List[str]] = None
+    ) -> List[int]:
+        """
+        指定日期在有效期内的优惠券ID（按ID排序）
+        hotel_id: 只保留该酒店专属或全部酒店通用的优惠券
+        """
+        ids = []
+        for entry in self._index.at(day):
+            if hotel_id and entry.hotel_id is not None and entry.hotel_id != hotel_id:
+                continue
+            if is_active is not None and entry.is_active != is_active:
+                continue
+            if user_levels is not None and entry.user_level not in user_levels:
+                continue
+            ids.append(entry.id)
+        return sorted(ids)
+
+def load_coupon_index(db: Session) -> CouponIndex:
+    """从数据库加载全部优惠券的有效期"""
+    return CouponIndex(db.query(
+        Coupon.id, Coupon.start_date, Coupon.end_date, Coupon.hotel_id, Coupon.is_active, Coupon.user_level
+    ).all())
+
+# 全局优惠券索引缓存
+coupon_index_cache = VersionedCache(COUPONS_VERSION, load_coupon_index, max_age_seconds=COUPON_INDEX_TTL_SECONDS)
+
+def get_coupon_index(db: Session) -> CouponIndex:
+    """获取优惠券有效期索引"""
+    return coupon_index_cache.get(db)
@@ -1,5 +1,9 @@
 # 数据库连接配置
+import random
+import time
+from typing import Callable, TypeVar
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import DATABASE_URL
@@ -29,3 +33,37 @@ def get_db():
         yield db
     finally:
         db.close()
+
+T = TypeVar("T")
+
+# 可重试的 MySQL 错误码：1213 死锁，1205 锁等待超时
+RETRYABLE_ERROR_CODES = (1213, 1205)
+
+def is_retryable_error(exc: OperationalError) -> bool:
+    """是否为死锁、锁等待超时等重试后可能成功的错误"""
+    orig = getattr(exc, "orig", None)
+    args = getattr(orig, "args", ())
+    if args and args[0] in RETRYABLE_ERROR_CODES:
+        return True
+    # SQLite（本地开发）写锁冲突
+    return "database is locked" in str(orig)
+
+def run_in_transaction(db, func: Callable[[], T], attempts: int = 3, backoff_seconds: float = 0.05) -> T:
+    """
+    执行 func 并提交事务；遇到死锁或锁等待超时时回滚并重试整个事务
+    func 中抛出的其他异常会回滚事务后原样抛出
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            result = func()
+            db.commit()
+            return result
+        except OperationalError as exc:
+            db.rollback()
+            if attempt >= attempts or not is_retryable_error(exc):
+                raise
+            # 随机退避，避免冲突的事务同时重试再次冲突
+            time.sleep(backoff_seconds * attempt * (1 + random.random()))
+        except Exception:
+            db.rollback()
+            raise
@@ -0,0 +1,164 @@
+# 酒店地理位置网格索引
+# 按经纬度把酒店划分到固定大小的网格中，“附近酒店”查询只需检查半径范围内的网格，
+# 不必计算全部酒店的距离
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import SEARCH_INDEX_REFRESH_SECONDS
+from app.models import Hotel
+
+# 地球平均半径（公里）
+EARTH_RADIUS_KM = 6371.0088
+
+# 每纬度对应的距离（公里）
+KM_PER_DEGREE = 111.32
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """计算两点之间的球面距离（公里）"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class GeoGridIndex:
+    """
+    经纬度网格索引
+    cell_degrees 为网格边长（度），默认 0.05 度（纬度方向约 5.5 公里）
+    """
+
+    def __init__(self, cell_degrees: float = 0.05):
+        self._lock = threading.RLock()
+        self.cell_degrees = cell_degrees
+        # 网格 -> {酒店ID: (纬度, 经度)}
+        self._cells: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = defaultdict(dict)
+        # 酒店ID -> 所在网格
+        self._locations: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def add(self, hotel_id: int, lat: float, lng: float):
+        """添加或移动一个位置"""
+        cell = self._cell(lat, lng)
+        with self._lock:
+            self._remove(hotel_id)
+            self._cells[cell][hotel_id] = (lat, lng)
+            self._locations[hotel_id] = cell
+
+    def remove(self, hotel_id: int):
+        """删除一个位置"""
+        with self._lock:
+            self._remove(hotel_id)
+
+    def _remove(self, hotel_id: int):
+        cell = self._locations.pop(hotel_id, None)
+        if cell is None:
+            return
+        members = self._cells.get(cell)
+        if members is not None:
+            members.pop(hotel_id, None)
+            if not members:
+                del self._cells[cell]
+
+    def query(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """
+        返回半径范围内的 (酒店ID, 距离公里) 列表，按距离升序排列
+        只遍历覆盖查询范围的网格，候选点再用 haversine 精确过滤
+        """
+        lat_delta = radius_km / KM_PER_DEGREE
+        # 高纬度地区经度方向的网格更窄，需要覆盖更多列
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + lat_delta, 90.0))), 1e-6)
+        lng_delta = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+
+        min_row, min_col = self._cell(lat - lat_delta, lng - lng_delta)
+        max_row, max_col = self._cell(lat + lat_delta, lng + lng_delta)
+
+        results = []
+        with self._lock:
+            # 网格数多于非空网格时改为遍历非空网格，避免大半径查询遍历大量空格子
+            span = (max_row - min_row + 1) * (max_col - min_col + 1)
+            if span > len(self._cells):
+                cells = [
+                    members for (row, col), members in self._cells.items()
+                    if min_row <= row <= max_row and min_col <= col <= max_col
+                ]
+            else:
+                cells = [
+                    self._cells[(row, col)]
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                    if (row, col) in self._cells
+                ]
+
+            for members in cells:
+                for hotel_id, (hotel_lat, hotel_lng) in members.items():
+                    distance = haversine_km(lat, lng, hotel_lat, hotel_lng)
+                    if distance <= radius_km:
+                        results.append((hotel_id, distance))
+
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+class HotelGeoIndex(GeoGridIndex):
+    """
+    进程内的酒店位置索引
+    首次查询时从数据库构建，之后由酒店的增删改接口增量维护，
+    并按 SEARCH_INDEX_REFRESH_SECONDS 定期全量重建以同步其他进程的修改
+    """
+
+    def __init__(self, cell_degrees: float = 0.05, refresh_seconds: int = SEARCH_INDEX_REFRESH_SECONDS):
+        super().__init__(cell_degrees)
+        self._refresh_seconds = refresh_seconds
+        self._built_at: Optional[float] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def ensure_built(self, db: Session):
+        """索引未构建或已过期时从数据库重建"""
+        if self._built_at is None or time.monotonic() - self._built_at > self._refresh_seconds:
+            self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        """从数据库全量重建索引（只读取坐标列）"""
+        rows = db.query(Hotel.id, Hotel.latitude, Hotel.longitude).filter(
+            Hotel.latitude.isnot(None),
+            Hotel.longitude.isnot(None)
+        ).all()
+
+        cells = defaultdict(dict)
+        locations = {}
+        for hotel_id, lat, lng in rows:
+            cell = self._cell(float(lat), float(lng))
+            cells[cell][hotel_id] = (float(lat), float(lng))
+            locations[hotel_id] = cell
+
+        with self._lock:
+            self._cells = cells
+            self._locations = locations
+            self._built_at = time.monotonic()
+
+    def add_hotel(self, hotel: Hotel):
+        """新增或更新一家酒店的位置（索引尚未构建时忽略，首次查询时会全量构建）"""
+        if not self.is_built:
+            return
+        if hotel.latitude is None or hotel.longitude is None:
+            self.remove(hotel.id)
+        else:
+            self.add(hotel.id, float(hotel.latitude), float(hotel.longitude))
+
+    def remove_hotel(self, hotel_id: int):
+        """从索引中删除一家酒店"""
+        self.remove(hotel_id)
+
+# 全局索引实例
+hotel_geo_index = HotelGeoIndex()
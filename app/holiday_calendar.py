@@ -0,0 +1,49 @@
+# 节假日日历缓存
+# 节假日表很小且几乎不变，全部加载为按日期序号排序的数组，
+# “入住期间是否包含节假日”“哪几晚是节假日”都在内存中二分查找完成，不再查询数据库
+from datetime import date
+from typing import List
+import numpy as np
+from sqlalchemy.orm import Session
+from app.config import HOLIDAY_CACHE_TTL_SECONDS
+from app.models import Holiday
+from app.versions import VersionedCache
+
+HOLIDAYS_VERSION = "holidays"
+
+class HolidayCalendar:
+    """节假日日历（只读快照）"""
+
+    def __init__(self, holiday_dates: List[date]):
+        self._ordinals = np.array(sorted({d.toordinal() for d in holiday_dates}), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def _range(self, start_date: date, end_date: date) -> np.ndarray:
+        left = np.searchsorted(self._ordinals, start_date.toordinal(), side="left")
+        right = np.searchsorted(self._ordinals, end_date.toordinal(), side="left")
+        return self._ordinals[left:right]
+
+    def is_holiday(self, day: date) -> bool:
+        """指定日期是否为节假日"""
+        return len(self._range(day, date.fromordinal(day.toordinal() + 1))) > 0
+
+    def has_holiday(self, start_date: date, end_date: date) -> bool:
+        """[start_date, end_date) 区间内是否包含节假日"""
+        return len(self._range(start_date, end_date)) > 0
+
+    def holidays_between(self, start_date: date, end_date: date) -> List[date]:
+        """[start_date, end_date) 区间内的节假日日期"""
+        return [date.fromordinal(int(ordinal)) for ordinal in self._range(start_date, end_date)]
+
+def load_holiday_calendar(db: Session) -> HolidayCalendar:
+    """从数据库加载全部节假日"""
+    return HolidayCalendar([row[0] for row in db.query(Holiday.holiday_date).all()])
+
+# 全局节假日日历缓存
+holiday_cache = VersionedCache(HOLIDAYS_VERSION, load_holiday_calendar, max_age_seconds=HOLIDAY_CACHE_TTL_SECONDS)
+
+def get_holiday_calendar(db: Session) -> HolidayCalendar:
+    """获取节假日日历"""
+    return holiday_cache.get(db)
@@ -0,0 +1,93 @@
+# 预订幂等键
+# 客户端在创建预订时携带 Idempotency-Key 请求头，网络不佳重试时直接返回首次创建的预订，
+# 不再重复检查库存、计算价格，也不会产生重复预订。
+# 每个键只保存请求内容摘要和预订ID，过期后由定时任务批量删除
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.config import IDEMPOTENCY_KEY_TTL_SECONDS
+from app.models import Booking, IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# 幂等键最大长度（与 idempotency_keys.idempotency_key 列一致）
+MAX_KEY_LENGTH = 64
+
+def validate_key(key: str) -> str:
+    """校验客户端提供的幂等键"""
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key 长度必须为1-{MAX_KEY_LENGTH}个字符")
+    return key
+
+def request_fingerprint(payload: dict) -> str:
+    """请求内容摘要，用于识别同一个键被用于不同的请求"""
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def find_booking(db: Session, user_id: int, key: str, fingerprint: str) -> Optional[Booking]:
+    """
+    查找该键已创建的预订；键不存在或已过期时返回 None
+    同一个键对应的请求内容不同时返回 422
+    """
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.idempotency_key == key
+    ).first()
+    if not record:
+        return None
+
+    booking = None
+    if record.expires_at > datetime.now():
+        if record.request_hash != fingerprint:
+            raise HTTPException(status_code=422, detail="该 Idempotency-Key 已用于其他预订请求")
+        booking = db.query(Booking).filter(Booking.id == record.booking_id).first()
+    if booking is None:
+        # 已过期（或预订已被删除）的键视为新键，删除后随新预订一起重新写入
+        db.delete(record)
+        db.flush()
+    return booking
+
+def remember_booking(db: Session, user_id: int, key: str, fingerprint: str, booking_id: int):
+    """记录幂等键对应的预订（不提交，与预订在同一事务中写入）"""
+    now = datetime.now()
+    db.add(IdempotencyKey(
+        user_id=user_id,
+        idempotency_key=key,
+        request_hash=fingerprint,
+        booking_id=booking_id,
+        created_at=now,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS)
+    ))
+
+def purge_expired_keys(db: Session, batch_size: int = 5000) -> int:
+    """分批删除过期的幂等键，返回删除的行数"""
+    now = datetime.now()
+    deleted = 0
+    while True:
+        ids = [row[0] for row in db.query(IdempotencyKey.id).filter(
+            IdempotencyKey.expires_at <= now
+        ).limit(batch_size)]
+        if not ids:
+            break
+        db.query(IdempotencyKey).filter(IdempotencyKey.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+    return deleted
+
+def run_purge() -> int:
+    """定时任务入口：使用独立会话清理过期的幂等键"""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        deleted = purge_expired_keys(session)
+        if deleted:
+            logger.info("清理过期幂等键 %d 个", deleted)
+        return deleted
+    finally:
+        session.close()
@@ -0,0 +1,89 @@
+# 区间索引（中心区间树）
+# 用于按日期区间生效的数据（季节价格规则、优惠券有效期等）：
+# “某天生效的条目”“与某区间有交集的条目”查询为 O(log n + k)，不再逐条比较
+from typing import Any, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K")  # 区间端点类型（日期、数字等可比较类型）
+V = TypeVar("V")
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        # 跨越中心点的区间，分别按起点升序、终点降序排列
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left = left
+        self.right = right
+
+class IntervalIndex(Generic[K, V]):
+    """
+    静态区间树，区间为闭区间 [start, end]
+    数据变化时整体重建（构建 O(n log n)）
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[K, K, V]]):
+        items = [(start, end, value) for start, end, value in intervals if start <= end]
+        self._size = len(items)
+        self._root = self._build(items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def _build(cls, items: List[Tuple[Any, Any, Any]]) -> Optional[_Node]:
+        if not items:
+            return None
+        endpoints = sorted(point for start, end, _ in items for point in (start, end))
+        center = endpoints[len(endpoints) // 2]
+
+        left, right, crossing = [], [], []
+        for item in items:
+            if item[1] < center:
+                left.append(item)
+            elif item[0] > center:
+                right.append(item)
+            else:
+                crossing.append(item)
+
+        return _Node(
+            center,
+            sorted(crossing, key=lambda item: item[0]),
+            sorted(crossing, key=lambda item: item[1], reverse=True),
+            cls._build(left),
+            cls._build(right),
+        )
+
+    def at(self, point: K) -> List[V]:
+        """包含 point 的全部区间的值"""
+        return self.overlapping(point, point)
+
+    def overlapping(self, start: K, end: K) -> List[V]:
+        """与闭区间 [start, end] 有交集的全部区间的值"""
+        result: List[V] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if end < node.center:
+                # 查询区间在中心点左侧：本节点区间都包含中心点，起点不晚于 end 即相交
+                for item in node.by_start:
+                    if item[0] > end:
+                        break
+                    result.append(item[2])
+                stack.append(node.left)
+            elif start > node.center:
+                # 查询区间在中心点右侧：终点不早于 start 即相交
+                for item in node.by_end:
+                    if item[1] < start:
+                        break
+                    result.append(item[2])
+                stack.append(node.right)
+            else:
+                # 查询区间包含中心点：本节点区间全部相交
+                result.extend(item[2] for item in node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        return result
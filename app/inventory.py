@@ -0,0 +1,386 @@
+# 房间库存台账
+# 按 (酒店, 房型, 日期) 记录每晚已占用的房间数，
+# 可用性检查只需按晚做索引查找，不再随预订历史增长而扫描 bookings 表。
+# 指定房型的预订按房型的房间总数单独计算库存；未指定房型的预订按酒店可用房间数、所有房型合计计算。
+# 每家酒店每晚另有一行合计台账（room_type_id = HOTEL_TOTAL），所有预订都同时累加合计行，
+# 合计行在同一条条件 UPDATE 中与酒店可用房间数比较，指定房型和未指定房型的预订都不会让酒店整体超卖
+import sys
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.models import Booking, Hotel, RoomInventory, RoomType
+
+# 占用库存的预订状态
+ACTIVE_BOOKING_STATUSES = ("pending", "confirmed")
+
+# 未指定房型的预订在台账中使用的房型ID
+NO_ROOM_TYPE = 0
+
+# 酒店每晚合计占用数在台账中使用的房型ID
+HOTEL_TOTAL = -1
+
+def stay_dates(check_in_date: date, check_out_date: date) -> List[date]:
+    """返回入住期间的每一晚（不含离店日期）"""
+    nights = (check_out_date - check_in_date).days
+    return [check_in_date + timedelta(days=i) for i in range(nights)]
+
+def get_booked_counts(
+    db: Session,
+    hotel_id: int,
+    check_in_date: date,
+    check_out_date: date,
+    room_type_id: Optional[int] = None
+) -> Dict[date, int]:
+    """
+    获取入住期间每晚已占用的房间数
+    指定 room_type_id 时只统计该房型，否则统计酒店所有房型合计
+    返回: {日期: 已占用房间数}，没有台账记录的日期视为0
+    """
+    rows = db.query(RoomInventory.stay_date, RoomInventory.booked_count).filter(
+        RoomInventory.hotel_id == hotel_id,
+        RoomInventory.room_type_id == (room_type_id or HOTEL_TOTAL),
+        RoomInventory.stay_date >= check_in_date,
+        RoomInventory.stay_date < check_out_date
+    ).all()
+
+    return {stay_date: int(count or 0) for stay_date, count in rows}
+
+def get_remaining_rooms(
+    db: Session,
+    hotel_id: int,
+    check_in_date: date,
+    check_out_date: date,
+    capacity: int,
+    room_type_id: Optional[int] = None
+) -> int:
+    """计算整个入住期间都可用的房间数（取每晚剩余数的最小值）"""
+    booked = get_booked_counts(db, hotel_id, check_in_date, check_out_date, room_type_id)
+    return (capacity or 0) - max(booked.values(), default=0)
+
+def get_remaining_rooms_by_room_type(
+    db: Session,
+    hotel_id: int,
+    check_in_date: date,
+    check_out_date: date
+) -> List[Tuple[RoomType, int]]:
+    """
+    一次查询获取酒店每个房型在整个入住期间都可用的房间数
+    返回: [(房型, 剩余房间数)]，按房型ID排序
+    """
+    booked = db.query(
+        RoomInventory.room_type_id.label("room_type_id"),
+        func.max(RoomInventory.booked_count).label("booked")
+    ).filter(
+        RoomInventory.hotel_id == hotel_id,
+        RoomInventory.stay_date >= check_in_date,
+        RoomInventory.stay_date < check_out_date
+    ).group_by(RoomInventory.room_type_id).subquery()
+
+    rows = db.query(RoomType, func.coalesce(booked.c.booked, 0)).outerjoin(
+        booked, booked.c.room_type_id == RoomType.id
+    ).filter(RoomType.hotel_id == hotel_id).order_by(RoomType.id).all()
+
+    return [(room_type, (room_type.total_count or 0) - int(max_booked)) for room_type, max_booked in rows]
+
+def get_capacity(db: Session, hotel_id: int, room_type_id: Optional[int] = None) -> int:
+    """
+    获取库存容量：指定房型时为该房型的房间总数，否则为酒店的可用房间数
+    房型不属于该酒店时视为容量为0
+    """
+    if room_type_id:
+        capacity = db.query(RoomType.total_count).filter(
+            RoomType.id == room_type_id,
+            RoomType.hotel_id == hotel_id
+        ).scalar()
+    else:
+        capacity = db.query(Hotel.available_rooms).filter(Hotel.id == hotel_id).scalar()
+    return capacity or 0
+
+def get_remaining_rooms_by_hotel(
+    db: Session,
+    hotels: List[Hotel],
+    check_in_date: date,
+    check_out_date: date,
+    hotel_ids
+) -> Dict[int, int]:
+    """
+    批量计算多家酒店在整个入住期间都可用的房间数
+    无论酒店数量多少都只执行一次聚合查询（读取各酒店的合计台账行）
+    hotel_ids: 产生这些酒店ID的子查询（由筛选酒店的查询生成），不把ID列表逐个绑定为参数
+    返回: {酒店ID: 剩余房间数}
+    """
+    if not hotels:
+        return {}
+
+    rows = db.query(RoomInventory.hotel_id, func.max(RoomInventory.booked_count)).filter(
+        RoomInventory.hotel_id.in_(hotel_ids),
+        RoomInventory.room_type_id == HOTEL_TOTAL,
+        RoomInventory.stay_date >= check_in_date,
+        RoomInventory.stay_date < check_out_date
+    ).group_by(RoomInventory.hotel_id).all()
+    max_booked = {hotel_id: int(booked or 0) for hotel_id, booked in rows}
+
+    return {
+        hotel.id: (hotel.available_rooms or 0) - max_booked.get(hotel.id, 0)
+        for hotel in hotels
+    }
+
+def check_availability(
+    db: Session,
+    hotel_id: int,
+    check_in_date: date,
+    check_out_date: date,
+    room_count: int,
+    capacity: int,
+    room_type_id: Optional[int] = None
+):
+    """
+    检查入住期间每晚是否都有足够房间，不足时抛出异常
+    指定房型时按该房型的库存检查，capacity 为房型房间总数
+    """
+    if (capacity or 0) < room_count:
+        raise HTTPException(status_code=400, detail="可用房间不足")
+
+    remaining = get_remaining_rooms(db, hotel_id, check_in_date, check_out_date, capacity, room_type_id)
+    if remaining < room_count:
+        raise HTTPException(status_code=400, detail="所选日期房间已被预订")
+
+def check_batch_availability(db: Session, stays: List[Tuple[int, int, Optional[int], date, date, int, int]]) -> Dict[int, str]:
+    """
+    批量预订的库存预检查：一次查询读出所有相关台账，按同一批次内的叠加占用逐晚检查
+    stays: [(序号, 酒店ID, 房型ID, 入住日期, 离店日期, 房间数, 容量)]
+    指定房型的预订同时检查房型库存和酒店合计库存（酒店可用房间数）
+    返回: {序号: 错误信息}，全部可用时为空字典
+    只用于提前给出逐项错误，真正的占用仍由 reserve_rooms 的条件更新保证
+    """
+    errors: Dict[int, str] = {}
+    if not stays:
+        return errors
+
+    start = min(stay[3] for stay in stays)
+    end = max(stay[4] for stay in stays)
+    hotel_ids = {stay[1] for stay in stays}
+    hotel_capacity = dict(db.query(Hotel.id, Hotel.available_rooms).filter(Hotel.id.in_(hotel_ids)).all())
+    rows = db.query(
+        RoomInventory.hotel_id, RoomInventory.room_type_id, RoomInventory.stay_date, RoomInventory.booked_count
+    ).filter(
+        RoomInventory.hotel_id.in_(hotel_ids),
+        RoomInventory.stay_date >= start,
+        RoomInventory.stay_date < end
+    ).all()
+
+    # 已占用数：指定房型的按 (酒店, 房型, 日期)，酒店合计按 (酒店, None, 日期)
+    booked = Counter()
+    for hotel_id, room_type_key, stay_date, booked_count in rows:
+        booked[(hotel_id, None if room_type_key == HOTEL_TOTAL else room_type_key, stay_date)] += booked_count
+
+    demand = Counter()
+    for index, hotel_id, room_type_id, check_in_date, check_out_date, room_count, capacity in stays:
+        if (capacity or 0) < room_count:
+            errors[index] = "可用房间不足"
+            continue
+        for stay_date in stay_dates(check_in_date, check_out_date):
+            demand[(hotel_id, None, stay_date)] += room_count
+            if room_type_id:
+                demand[(hotel_id, room_type_id, stay_date)] += room_count
+
+    for index, hotel_id, room_type_id, check_in_date, check_out_date, room_count, capacity in stays:
+        if index in errors:
+            continue
+        limits = [(None, hotel_capacity.get(hotel_id) or 0)]
+        if room_type_id:
+            limits.append((room_type_id, capacity))
+        if any(
+            booked[(hotel_id, key, stay_date)] + demand[(hotel_id, key, stay_date)] > limit
+            for stay_date in stay_dates(check_in_date, check_out_date)
+            for key, limit in limits
+        ):
+            errors[index] = "所选日期房间已被预订"
+    return errors
+
+def _ensure_inventory_rows(db: Session, hotel_id: int, room_type_key: int, check_in_date: date, check_out_date: date):
+    """补齐入住期间缺少的台账行（已存在的行忽略，并发插入同一行不会报错）"""
+    statement = insert(RoomInventory.__table__).prefix_with(
+        "IGNORE", dialect="mysql"
+    ).prefix_with(
+        "OR IGNORE", dialect="sqlite"
+    )
+    db.execute(statement, [
+        {"hotel_id": hotel_id, "room_type_id": room_type_key, "stay_date": stay_date, "booked_count": 0}
+        for stay_date in stay_dates(check_in_date, check_out_date)
+    ])
+
+def reserve_rooms(
+    db: Session,
+    hotel_id: int,
+    room_type_id: Optional[int],
+    check_in_date: date,
+    check_out_date: date,
+    room_count: int,
+    capacity: int
+):
+    """
+    原子地占用入住期间每晚的库存（不提交事务，由调用方统一提交）
+    先补齐缺少的台账行，再用条件 UPDATE 只在每晚 booked_count + room_count <= 容量时加占用数：
+    指定房型时房型行与房型房间总数（capacity）比较；所有预订的酒店合计行都与酒店可用房间数比较。
+    更新的行数少于晚数说明某晚已满，抛出异常，调用方回滚事务后已加的占用数一并撤销。
+    锁只加在该酒店入住期间的台账行上，不同酒店的预订互不阻塞
+    """
+    if (capacity or 0) < room_count:
+        raise HTTPException(status_code=400, detail="可用房间不足")
+
+    nights = (check_out_date - check_in_date).days
+    room_type_key = room_type_id or NO_ROOM_TYPE
+    if room_type_key != NO_ROOM_TYPE:
+        if _increment(db, hotel_id, room_type_key, check_in_date, check_out_date, room_count, capacity) < nights:
+            raise HTTPException(status_code=400, detail="所选日期房间已被预订")
+    else:
+        _increment(db, hotel_id, NO_ROOM_TYPE, check_in_date, check_out_date, room_count)
+
+    # 酒店合计行与酒店可用房间数在同一条 UPDATE 中比较，读取的是当前已提交的最新值
+    hotel_capacity = select(func.coalesce(Hotel.available_rooms, 0)).where(Hotel.id == hotel_id).scalar_subquery()
+    if _increment(db, hotel_id, HOTEL_TOTAL, check_in_date, check_out_date, room_count, hotel_capacity) < nights:
+        raise HTTPException(status_code=400, detail="所选日期房间已被预订")
+
+def _increment(
+    db: Session,
+    hotel_id: int,
+    room_type_key: int,
+    check_in_date: date,
+    check_out_date: date,
+    room_count: int,
+    capacity=None
+) -> int:
+    """补齐台账行后给入住期间每晚加占用数，capacity 不为 None 时只更新不会超过容量的行，返回更新的行数"""
+    _ensure_inventory_rows(db, hotel_id, room_type_key, check_in_date, check_out_date)
+    query = db.query(RoomInventory).filter(
+        RoomInventory.hotel_id == hotel_id,
+        RoomInventory.room_type_id == room_type_key,
+        RoomInventory.stay_date >= check_in_date,
+        RoomInventory.stay_date < check_out_date
+    )
+    if capacity is not None:
+        query = query.filter(RoomInventory.booked_count + room_count <= capacity)
+    return query.update(
+        {RoomInventory.booked_count: RoomInventory.booked_count + room_count},
+        synchronize_session=False
+    )
+
+def release_rooms(
+    db: Session,
+    hotel_id: int,
+    room_type_id: Optional[int],
+    check_in_date: date,
+    check_out_date: date,
+    room_count: int
+):
+    """
+    释放入住期间每晚的库存（不提交事务，由调用方统一提交），房型行和酒店合计行同时扣减
+    """
+    db.query(RoomInventory).filter(
+        RoomInventory.hotel_id == hotel_id,
+        RoomInventory.room_type_id.in_([room_type_id or NO_ROOM_TYPE, HOTEL_TOTAL]),
+        RoomInventory.stay_date >= check_in_date,
+        RoomInventory.stay_date < check_out_date,
+        RoomInventory.booked_count >= room_count
+    ).update(
+        {RoomInventory.booked_count: RoomInventory.booked_count - room_count},
+        synchronize_session=False
+    )
+
+def release_rooms_bulk(db: Session, releases: Dict[Tuple[int, int, date], int]):
+    """
+    批量释放库存（不提交事务）：一条 executemany UPDATE 完成，酒店合计行随之扣减
+    releases: {(酒店ID, 台账房型ID, 日期): 释放的房间数}
+    """
+    if not releases:
+        return
+    releases = Counter(releases)
+    for (hotel_id, room_type_key, stay_date), count in list(releases.items()):
+        releases[(hotel_id, HOTEL_TOTAL, stay_date)] += count
+    inventory = RoomInventory.__table__
+    statement = update(inventory).where(
+        inventory.c.hotel_id == bindparam("b_hotel_id"),
+        inventory.c.room_type_id == bindparam("b_room_type_id"),
+        inventory.c.stay_date == bindparam("b_stay_date")
+    ).values(
+        booked_count=case(
+            (inventory.c.booked_count > bindparam("b_count"), inventory.c.booked_count - bindparam("b_count")),
+            else_=0
+        )
+    )
+    db.execute(statement, [
+        {"b_hotel_id": hotel_id, "b_room_type_id": room_type_key, "b_stay_date": stay_date, "b_count": count}
+        for (hotel_id, room_type_key, stay_date), count in releases.items()
+    ])
+
+def apply_status_change(db: Session, booking: Booking, new_status: str):
+    """
+    预订状态变化时同步库存：
+    离开占用状态（取消、完成等）时释放库存，重新进入占用状态时再次检查并占用
+    """
+    was_active = booking.status in ACTIVE_BOOKING_STATUSES
+    is_active = new_status in ACTIVE_BOOKING_STATUSES
+
+    if was_active and not is_active:
+        release_rooms(
+            db, booking.hotel_id, booking.room_type_id,
+            booking.check_in_date, booking.check_out_date, booking.room_count
+        )
+    elif is_active and not was_active:
+        reserve_rooms(
+            db, booking.hotel_id, booking.room_type_id,
+            booking.check_in_date, booking.check_out_date, booking.room_count,
+            get_capacity(db, booking.hotel_id, booking.room_type_id)
+        )
+
+def rebuild_inventory(db: Session, since: Optional[date] = None, batch_size: int = 1000) -> int:
+    """
+    根据 bookings 表重建库存台账（用于首次上线回填或数据修复）
+    只统计离店日期晚于 since 的有效预订，返回写入的台账行数
+    """
+    since = since or date.today()
+    counts = Counter()
+
+    bookings = db.query(
+        Booking.hotel_id,
+        Booking.room_type_id,
+        Booking.check_in_date,
+        Booking.check_out_date,
+        Booking.room_count
+    ).filter(
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        Booking.check_out_date > since
+    ).yield_per(batch_size)
+
+    for hotel_id, room_type_id, check_in_date, check_out_date, room_count in bookings:
+        for stay_date in stay_dates(max(check_in_date, since), check_out_date):
+            counts[(hotel_id, room_type_id or NO_ROOM_TYPE, stay_date)] += room_count or 0
+            counts[(hotel_id, HOTEL_TOTAL, stay_date)] += room_count or 0
+
+    db.query(RoomInventory).filter(RoomInventory.stay_date >= since).delete(synchronize_session=False)
+
+    rows = [
+        {"hotel_id": hotel_id, "room_type_id": room_type_id, "stay_date": stay_date, "booked_count": count}
+        for (hotel_id, room_type_id, stay_date), count in counts.items()
+    ]
+    for i in range(0, len(rows), batch_size):
+        db.bulk_insert_mappings(RoomInventory, rows[i:i + batch_size])
+
+    db.commit()
+    return len(rows)
+
+if __name__ == "__main__":
+    # 回填命令：python -m app.inventory [起始日期YYYY-MM-DD]
+    from app.database import SessionLocal
+
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    session = SessionLocal()
+    try:
+        written = rebuild_inventory(session, since=since)
+        print(f"库存台账重建完成，共写入 {written} 条记录")
+    finally:
+        session.close()
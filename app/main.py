@@ -1,6 +1,7 @@
 # FastAPI应用主入口
 import sys
 import os
+import logging
 from pathlib import Path
 
 # 如果直接运行此文件，将项目根目录添加到Python路径
@@ -17,8 +18,22 @@ from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from app.config import APP_NAME, APP_VERSION, ALLOWED_ORIGINS
-from app.routers import hotels, bookings, favorites, statistics, pricing, cities, room_types, reviews, coupons, auth
+from app.config import (
+    APP_NAME, APP_VERSION, ALLOWED_ORIGINS, VIEW_COUNT_FLUSH_SECONDS, USER_COUNTER_RECONCILE_SECONDS,
+    IDEMPOTENCY_KEY_PURGE_SECONDS, BOOKING_LIFECYCLE_INTERVAL_SECONDS, BOOKING_ARCHIVE_INTERVAL_SECONDS
+)
+from app.database import SessionLocal
+from app.holiday_calendar import holiday_cache
+from app.scheduler import scheduler
+from app.view_counter import hotel_view_counter
+from app.user_counters import run_reconciliation
+from app.idempotency import run_purge as purge_idempotency_keys
+from app.booking_lifecycle import run_lifecycle
+from app.booking_archive import run_archive
+from app.booking_events import booking_events
+from app.routers import hotels, bookings, favorites, statistics, pricing, cities, room_types, reviews, coupons, auth, holidays
+
+logger = logging.getLogger(__name__)
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -34,6 +49,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # 游标分页的下一页游标
 )
 
 # 注册路由
@@ -47,6 +63,7 @@ app.include_router(reviews.router)
 app.include_router(coupons.router)
 app.include_router(statistics.router)
 app.include_router(pricing.router)
+app.include_router(holidays.router)
 
 # 挂载静态文件目录（用于前端页面）
 try:
@@ -57,6 +74,33 @@ except:
     os.makedirs("static", exist_ok=True)
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# 后台定时任务
+@app.on_event("startup")
+def start_background_tasks():
+    # 预加载节假日日历，避免第一次报价时加载
+    db = SessionLocal()
+    try:
+        holiday_cache.get(db)
+    except Exception:
+        logger.exception("预加载节假日日历失败")
+    finally:
+        db.close()
+    
+    scheduler.add("flush_hotel_views", VIEW_COUNT_FLUSH_SECONDS, hotel_view_counter.flush)
+    scheduler.add("reconcile_user_counters", USER_COUNTER_RECONCILE_SECONDS, run_reconciliation)
+    scheduler.add("purge_idempotency_keys", IDEMPOTENCY_KEY_PURGE_SECONDS, purge_idempotency_keys)
+    scheduler.add("advance_booking_statuses", BOOKING_LIFECYCLE_INTERVAL_SECONDS, run_lifecycle)
+    scheduler.add("archive_bookings", BOOKING_ARCHIVE_INTERVAL_SECONDS, run_archive)
+    scheduler.start()
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    scheduler.stop()
+    # 结束所有预订事件流连接
+    booking_events.close_all()
+    # 关闭前写回剩余的浏览次数
+    hotel_view_counter.flush()
+
 # 根路径
 @app.get("/")
 async def root():
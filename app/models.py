@@ -1,5 +1,5 @@
 # 数据库模型定义
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, Enum, Date, Time, TIMESTAMP, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Enum, Date, Time, TIMESTAMP, ForeignKey, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -111,6 +111,8 @@ class User(Base):
     role = Column(String(20), default="user", comment="角色")
     status = Column(String(20), default="active", comment="账户状态")
     last_login_time = Column(TIMESTAMP, nullable=True, comment="最后登录时间")
+    booking_count = Column(Integer, nullable=False, default=0, server_default="0", comment="有效预订数（不含已取消）")
+    first_booking_at = Column(TIMESTAMP, nullable=True, comment="首次预订时间")
     created_at = Column(TIMESTAMP, server_default=func.now(), comment="创建时间")
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), comment="更新时间")
     
@@ -123,6 +125,10 @@ class User(Base):
 # 酒店模型
 class Hotel(Base):
     __tablename__ = "hotels"
+    __table_args__ = (
+        # 酒店列表的默认排序（推荐、评分、ID），游标分页按该索引定位
+        Index("idx_recommended_rating_id", "is_recommended", "rating", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, comment="酒店ID")
     name = Column(String(200), nullable=False, index=True, comment="酒店名称")
@@ -133,7 +139,7 @@ class Hotel(Base):
     base_price = Column(DECIMAL(10, 2), nullable=False, default=0.00, index=True, comment="基础价格")
     nearby_attractions = Column(Text, comment="附近景点信息（JSON格式）")
     images = Column(Text, comment="酒店图片（JSON格式）")
-    rating = Column(DECIMAL(3, 2), default=0.00, index=True, comment="评分")
+    rating = Column(DECIMAL(3, 2), nullable=False, default=0.00, server_default="0.00", index=True, comment="评分")
     review_count = Column(Integer, default=0, comment="评论数量")
     star_level = Column(Integer, default=3, index=True, comment="星级（1-5星）")
     total_rooms = Column(Integer, default=0, comment="总房间数")
@@ -146,7 +152,7 @@ class Hotel(Base):
     facilities = Column(Text, comment="酒店设施（JSON格式）")
     parking_info = Column(String(200), comment="停车信息")
     wifi_info = Column(String(200), comment="WiFi信息")
-    is_recommended = Column(Boolean, default=False, index=True, comment="是否推荐")
+    is_recommended = Column(Boolean, nullable=False, default=False, server_default="0", index=True, comment="是否推荐")
     view_count = Column(Integer, default=0, comment="浏览次数")
     created_at = Column(TIMESTAMP, server_default=func.now(), comment="创建时间")
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), comment="更新时间")
@@ -205,7 +211,7 @@ class Booking(Base):
     payment_method = Column(String(20), comment="支付方式")
     payment_status = Column(String(20), default="unpaid", index=True, comment="支付状态")
     status = Column(String(20), default="pending", index=True, comment="预订状态")
-    booking_time = Column(TIMESTAMP, server_default=func.now(), index=True, comment="预订时间")
+    booking_time = Column(TIMESTAMP, nullable=False, server_default=func.now(), index=True, comment="预订时间")
     confirm_time = Column(TIMESTAMP, nullable=True, comment="确认时间")
     cancel_time = Column(TIMESTAMP, nullable=True, comment="取消时间")
     cancel_reason = Column(String(500), comment="取消原因")
@@ -221,11 +227,15 @@ class Booking(Base):
 # 收藏模型
 class Favorite(Base):
     __tablename__ = "favorites"
+    __table_args__ = (
+        # 用户收藏列表按收藏时间、ID倒序，游标分页按该索引定位
+        Index("idx_user_created_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, comment="收藏ID")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True, comment="用户ID")
     hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False, index=True, comment="酒店ID")
-    created_at = Column(TIMESTAMP, server_default=func.now(), comment="收藏时间")
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), comment="收藏时间")
     
     # 关系
     user = relationship("User", back_populates="favorites")
@@ -273,7 +283,7 @@ class Review(Base):
     reply_content = Column(Text, comment="商家回复内容")
     reply_time = Column(TIMESTAMP, nullable=True, comment="回复时间")
     status = Column(String(20), default="pending", index=True, comment="审核状态")
-    created_at = Column(TIMESTAMP, server_default=func.now(), index=True, comment="创建时间")
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), index=True, comment="创建时间")
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), comment="更新时间")
     
     # 关系
@@ -335,3 +345,72 @@ class Holiday(Base):
     holiday_date = Column(Date, nullable=False, unique=True, index=True, comment="节假日日期")
     is_national = Column(Boolean, default=True, comment="是否为国家法定节假日")
     created_at = Column(TIMESTAMP, server_default=func.now(), comment="创建时间")
+
+# 房间库存台账模型（按晚记录每个房型及酒店合计已占用的房间数）
+class RoomInventory(Base):
+    __tablename__ = "room_inventory"
+    __table_args__ = (
+        UniqueConstraint("hotel_id", "room_type_id", "stay_date", name="uk_hotel_room_type_date"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, comment="台账ID")
+    hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False, comment="酒店ID")
+    room_type_id = Column(Integer, nullable=False, default=0, comment="房间类型ID（0表示未指定房型，-1表示酒店合计）")
+    stay_date = Column(Date, nullable=False, index=True, comment="入住日期（按晚）")
+    booked_count = Column(Integer, nullable=False, default=0, comment="已占用房间数")
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+# 缓存版本号模型（写操作递增版本号，各进程据此判断内存缓存是否需要重建）
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(50), primary_key=True, comment="缓存名称")
+    version = Column(Integer, nullable=False, default=0, comment="版本号")
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+
+# 预订幂等键模型（客户端重试同一请求时返回首次创建的预订，只保存请求摘要和预订ID）
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uk_user_idempotency_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True, comment="ID")
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, comment="用户ID")
+    idempotency_key = Column(String(64), nullable=False, comment="客户端提供的幂等键")
+    request_hash = Column(String(64), nullable=False, comment="请求内容摘要（SHA-256）")
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False, comment="创建的预订ID")
+    created_at = Column(TIMESTAMP, server_default=func.now(), comment="创建时间")
+    expires_at = Column(TIMESTAMP, nullable=False, index=True, comment="过期时间")
+
+# 预订归档模型（结构与预订相同，保存离店已久的已完成、已取消、未入住预订，保留原预订ID）
+class BookingArchive(Base):
+    __tablename__ = "bookings_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False, comment="预订ID（与原预订相同）")
+    booking_no = Column(String(50), unique=True, nullable=False, comment="预订编号")
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True, comment="用户ID")
+    hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False, index=True, comment="酒店ID")
+    room_type_id = Column(Integer, ForeignKey("room_types.id", ondelete="SET NULL"), comment="房间类型ID")
+    check_in_date = Column(Date, nullable=False, index=True, comment="入住日期")
+    check_out_date = Column(Date, nullable=False, comment="离店日期")
+    nights = Column(Integer, nullable=False, comment="入住天数")
+    room_count = Column(Integer, nullable=False, default=1, comment="房间数量")
+    guest_name = Column(String(50), comment="入住人姓名")
+    guest_phone = Column(String(20), comment="入住人电话")
+    base_price = Column(DECIMAL(10, 2), nullable=False, comment="基础价格")
+    discount_rate = Column(DECIMAL(5, 2), default=0.00, comment="折扣率")
+    coupon_discount = Column(DECIMAL(10, 2), default=0.00, comment="优惠券折扣金额")
+    final_price = Column(DECIMAL(10, 2), nullable=False, comment="最终支付价格")
+    payment_method = Column(String(20), comment="支付方式")
+    payment_status = Column(String(20), default="unpaid", comment="支付状态")
+    status = Column(String(20), comment="预订状态")
+    booking_time = Column(TIMESTAMP, nullable=False, index=True, comment="预订时间")
+    confirm_time = Column(TIMESTAMP, nullable=True, comment="确认时间")
+    cancel_time = Column(TIMESTAMP, nullable=True, comment="取消时间")
+    cancel_reason = Column(String(500), comment="取消原因")
+    notes = Column(Text, comment="备注信息")
+    archived_at = Column(TIMESTAMP, server_default=func.now(), comment="归档时间")
+    
+    # 关系
+    hotel = relationship("Hotel")
@@ -0,0 +1,157 @@
+# 游标（keyset）分页工具
+# 用上一页最后一行的排序键生成不透明游标，下一页通过 WHERE (排序键) < (游标值) 直接定位，
+# 避免 OFFSET 在深翻页时逐行跳过的开销
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, literal, or_
+
+# 下一页游标的响应头
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 在 Python 中过滤行时每批读取的行数
+FILTERED_SCAN_BATCH_SIZE = 500
+
+def _encode_value(value: Any):
+    """将排序键的值转换为可JSON序列化的带类型标记的形式"""
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+def _decode_value(value: Any):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """将排序键的值编码为URL安全的游标字符串"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, key_count: int) -> List[Any]:
+    """解析游标字符串，格式不正确时返回400错误"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if not isinstance(values, list) or len(values) != key_count:
+            raise ValueError("游标长度不匹配")
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+def _after_condition(keys: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+    """
+    生成“位于游标之后”的条件：
+    (k1 之后) OR (k1 相等 AND k2 之后) OR ...，降序列取小于，升序列取大于
+    """
+    conditions = []
+    for i, (column, descending) in enumerate(keys):
+        equal_prefix = [keys[j][0] == values[j] for j in range(i)]
+        # 使用 literal 绑定参数，布尔值也可以参与大小比较
+        value = literal(values[i], type_=column.type)
+        after = column < value if descending else column > value
+        conditions.append(and_(*equal_prefix, after))
+    return or_(*conditions)
+
+def _key_values(row, keys: Sequence[Tuple[Any, bool]]) -> List[Any]:
+    return [getattr(row, column.key) for column, _ in keys]
+
+def _filtered_rows(query, keys: Sequence[Tuple[Any, bool]], count: int, skip: int, row_filter: Callable[[Any], bool]) -> list:
+    """
+    按排序键分批读取，保留满足 row_filter 的行，直到凑满 skip + count 行或读完
+    每批从上一批最后一行之后继续，不使用 OFFSET
+    """
+    rows = []
+    batch_query = query
+    while True:
+        batch = batch_query.limit(FILTERED_SCAN_BATCH_SIZE).all()
+        rows.extend(row for row in batch if row_filter(row))
+        if len(rows) >= skip + count or len(batch) < FILTERED_SCAN_BATCH_SIZE:
+            return rows[skip:skip + count]
+        batch_query = query.filter(_after_condition(keys, _key_values(batch[-1], keys)))
+
+def keyset_paginate(
+    query,
+    keys: Sequence[Tuple[Any, bool]],
+    response: Response,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    row_filter: Optional[Callable[[Any], bool]] = None
+) -> list:
+    """
+    按排序键分页查询
+    keys: [(列, 是否降序)]，最后一列必须唯一（通常为ID），且各列必须为 NOT NULL
+    （游标条件不会匹配 NULL，为空的行会被跳过）；应有与 keys 顺序一致的组合索引，翻页时才能按索引定位
+    有 cursor 时从游标位置继续；否则兼容旧的 skip 偏移方式。
+    row_filter: 无法用 SQL 表达的附加条件（如很大的ID集合），在 Python 中按批过滤
+    还有下一页时通过 X-Next-Cursor 响应头返回游标
+    """
+    if cursor:
+        query = query.filter(_after_condition(keys, decode_cursor(cursor, len(keys))))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+    if row_filter is not None:
+        rows = _filtered_rows(query, keys, limit + 1, 0 if cursor else skip, row_filter)
+    else:
+        if skip and not cursor:
+            query = query.offset(skip)
+        rows = query.limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(_key_values(last, keys))
+
+    return rows
+
+def keyset_paginate_merged(
+    sources: Sequence[Tuple[Any, Sequence[Tuple[Any, bool]]]],
+    response: Response,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0
+) -> list:
+    """
+    多个结构和排序键相同的查询（如 bookings 与 bookings_archive）合并分页
+    sources: [(查询, keys)]，keys 的列名和方向必须一致；只有一个查询时等同于 keyset_paginate。
+    每个查询各自按索引取游标之后的前 skip + limit + 1 行，在 Python 中按排序键归并，
+    结果与对合并后的整体分页相同，游标格式与 keyset_paginate 一致
+    """
+    if len(sources) == 1:
+        query, keys = sources[0]
+        return keyset_paginate(query, keys, response, limit, cursor=cursor, skip=skip)
+
+    values = decode_cursor(cursor, len(sources[0][1])) if cursor else None
+    offset = 0 if cursor else skip
+    rows = []
+    for query, keys in sources:
+        if values is not None:
+            query = query.filter(_after_condition(keys, values))
+        query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+        rows.extend(query.limit(offset + limit + 1).all())
+
+    # 从最后一个排序键开始依次稳定排序，得到与 ORDER BY 相同的顺序
+    keys = sources[0][1]
+    for i in reversed(range(len(keys))):
+        column, descending = keys[i]
+        rows.sort(key=lambda row: getattr(row, column.key), reverse=descending)
+    rows = rows[offset:]
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(_key_values(rows[-1], keys))
+
+    return rows
@@ -0,0 +1,235 @@
+# 价格规则引擎
+# 将启用的价格规则预编译为按酒店、按规则类型分组的内存结构，计算报价时不再查询规则表；
+# 规则修改时递增 price_rules 版本号，各进程检测到版本变化后重新编译。
+# 报价按晚计算：把整段入住日期表示为日期序号数组，周末、节假日、季节、连住等规则以数组运算作用于每一晚
+import bisect
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.cache import create_cache
+from app.config import PRICE_QUOTE_CACHE_MAX_ENTRIES, PRICE_QUOTE_CACHE_TTL_SECONDS
+from app.interval_index import IntervalIndex
+from app.models import PriceRule
+from app.versions import VersionedCache
+
+PRICE_RULES_VERSION = "price_rules"
+
+# 支持计算的规则类型（custom 类型规则不参与自动计算）
+RULE_TYPES = ("season", "weekend", "holiday", "new_user", "long_stay")
+
+# 日期序号（date.toordinal）对7取余后加上该偏移即为 weekday()（0=周一）
+_ORDINAL_WEEKDAY_OFFSET = 6
+
+def normalize_rule_type(rule_type) -> str:
+    """将 rule_type 统一转换为字符串（兼容数据库中的字符串值和枚举对象）"""
+    if isinstance(rule_type, str):
+        return rule_type
+    if hasattr(rule_type, "value"):
+        return rule_type.value
+    return str(rule_type).lower()
+
+class CompiledRule:
+    """编译后的价格规则（与数据库会话无关的只读快照）"""
+
+    __slots__ = ("id", "name", "rule_type", "hotel_id", "start_date", "end_date",
+                 "day_of_week", "min_nights", "discount_rate")
+
+    def __init__(self, rule: PriceRule):
+        self.id = rule.id
+        self.name = rule.rule_name
+        self.rule_type = normalize_rule_type(rule.rule_type)
+        self.hotel_id = rule.hotel_id
+        self.start_date = rule.start_date
+        self.end_date = rule.end_date
+        self.day_of_week = rule.day_of_week
+        self.min_nights = rule.min_nights
+        self.discount_rate = float(rule.discount_rate or 0)
+
+class HotelRules:
+    """
+    某个酒店适用的规则（酒店专属规则 + 全局规则），按类型分组
+    季节规则建立区间索引；连住规则按最少入住天数排序，查询时二分定位
+    """
+
+    def __init__(self, rules: List[CompiledRule], global_seasons: Optional[IntervalIndex] = None):
+        rules = sorted(rules, key=lambda r: r.id)
+        self.by_type: Dict[str, List[CompiledRule]] = {rule_type: [] for rule_type in RULE_TYPES}
+        for rule in rules:
+            if rule.rule_type in self.by_type:
+                self.by_type[rule.rule_type].append(rule)
+
+        # 季节规则：只保留日期范围完整的规则，建立区间索引；
+        # 传入全局规则的索引时只为酒店专属规则建索引，全局季节规则不必为每个酒店重复构建
+        self.global_seasons = global_seasons
+        self.seasons = IntervalIndex(
+            (r.start_date, r.end_date, r) for r in self.by_type["season"]
+            if r.start_date and r.end_date and (global_seasons is None or r.hotel_id is not None)
+        )
+        self.long_stays = sorted(
+            (r for r in self.by_type["long_stay"] if r.min_nights),
+            key=lambda r: r.min_nights
+        )
+        self._long_stay_nights = [r.min_nights for r in self.long_stays]
+
+    def seasons_overlapping(self, first_day: date, last_day: date) -> List[CompiledRule]:
+        """与日期区间 [first_day, last_day] 有交集的季节规则"""
+        rules = self.seasons.overlapping(first_day, last_day)
+        if self.global_seasons is not None:
+            rules.extend(self.global_seasons.overlapping(first_day, last_day))
+        return rules
+
+    def long_stays_for(self, nights: int) -> List[CompiledRule]:
+        """满足连住天数的连住规则"""
+        return self.long_stays[:bisect.bisect_right(self._long_stay_nights, nights)]
+
+class RuleBook:
+    """全部启用规则的编译结果，按酒店缓存合并后的规则"""
+
+    def __init__(self, rules: List[CompiledRule]):
+        self._global: List[CompiledRule] = []
+        self._by_hotel: Dict[int, List[CompiledRule]] = {}
+        for rule in rules:
+            if rule.hotel_id is None:
+                self._global.append(rule)
+            else:
+                self._by_hotel.setdefault(rule.hotel_id, []).append(rule)
+        self._global_rules = HotelRules(self._global)
+        self._hotel_rules: Dict[int, HotelRules] = {}
+
+    def for_hotel(self, hotel_id: int) -> HotelRules:
+        """获取酒店适用的规则；没有专属规则的酒店共用全局规则"""
+        hotel_rules = self._hotel_rules.get(hotel_id)
+        if hotel_rules is None:
+            own = self._by_hotel.get(hotel_id)
+            hotel_rules = HotelRules(self._global + own, self._global_rules.seasons) if own else self._global_rules
+            self._hotel_rules[hotel_id] = hotel_rules
+        return hotel_rules
+
+def load_rule_book(db: Session) -> RuleBook:
+    """从数据库加载并编译全部启用的价格规则"""
+    rules = db.query(PriceRule).filter(PriceRule.is_active == True).all()
+    return RuleBook([CompiledRule(rule) for rule in rules])
+
+# 全局规则缓存
+rule_cache = VersionedCache(PRICE_RULES_VERSION, load_rule_book)
+
+def get_hotel_rules(db: Session, hotel_id: int) -> HotelRules:
+    """获取酒店适用的编译后规则"""
+    return rule_cache.get(db).for_hotel(hotel_id)
+
+# 酒店和房型基础价格的版本号：修改基础价格时在同一事务中递增，只用于组成报价缓存键
+BASE_PRICES_VERSION = "base_prices"
+base_price_version = VersionedCache(BASE_PRICES_VERSION, lambda db: True)
+
+# 报价结果缓存
+# 键中包含规则、节假日和基础价格版本号，其中任何一项变化后（包括其他进程的修改）旧报价自然不再命中；
+# 条目带 ("hotel", 酒店ID) 标签，本进程修改酒店或房型后按标签立即失效。缓存的报价视为只读
+price_quote_cache = create_cache("price_quotes", PRICE_QUOTE_CACHE_MAX_ENTRIES, PRICE_QUOTE_CACHE_TTL_SECONDS)
+
+def invalidate_hotel_quotes(hotel_id: int):
+    """使某个酒店的全部缓存报价失效（本进程），并在下次报价时重新读取基础价格版本号"""
+    price_quote_cache.invalidate_tag(("hotel", hotel_id))
+    base_price_version.invalidate()
+
+class NightlyQuote:
+    """按晚计算的报价结果"""
+
+    def __init__(self, start_date: date, base_price: float, discounts: np.ndarray, rule_nights: List[Tuple[CompiledRule, int]]):
+        self.start_date = start_date
+        self.base_price = base_price
+        # 每晚的折扣率（百分比）和价格（元，保留两位小数，不低于0）
+        self.discounts = discounts
+        self.prices = np.maximum(np.round(base_price * (1 - discounts / 100.0), 2), 0.0)
+        # 应用的规则及其作用的晚数，按规则ID排序
+        self.rule_nights = rule_nights
+
+    @property
+    def applied_rules(self) -> List[str]:
+        return [rule.name for rule, _ in self.rule_nights]
+
+    @property
+    def nights(self) -> int:
+        return len(self.prices)
+
+    @property
+    def total_price(self) -> float:
+        return round(float(self.prices.sum()), 2)
+
+    @property
+    def average_price(self) -> float:
+        """平均每晚价格"""
+        return round(self.total_price / self.nights, 2) if self.nights else 0.0
+
+    @property
+    def average_discount(self) -> float:
+        """平均每晚折扣率"""
+        return round(float(self.discounts.mean()), 2) if self.nights else 0.0
+
+    def nightly(self) -> List[dict]:
+        """每晚的日期、折扣率和价格"""
+        start = self.start_date.toordinal()
+        return [
+            {"date": date.fromordinal(start + i), "discount_rate": round(float(discount), 2), "price": float(price)}
+            for i, (discount, price) in enumerate(zip(self.discounts.tolist(), self.prices.tolist()))
+        ]
+
+def quote_nights(
+    hotel_rules: HotelRules,
+    base_price: float,
+    start_date: date,
+    nights: int,
+    holiday_dates: Iterable[date],
+    is_new_user: bool,
+    stay_nights: Optional[int] = None
+) -> NightlyQuote:
+    """
+    计算从 start_date 起连续 nights 晚的每晚价格
+    holiday_dates: 区间内的节假日；stay_nights: 连住规则判断所用的入住晚数，默认等于 nights
+    （价格日历按单晚展示时传1）
+    规则叠加方式与原逻辑一致：同一晚所有适用规则的折扣率相加
+    """
+    if nights <= 0:
+        return NightlyQuote(start_date, base_price, np.zeros(0), [])
+
+    first = start_date.toordinal()
+    days = np.arange(first, first + nights, dtype=np.int64)
+    weekdays = (days + _ORDINAL_WEEKDAY_OFFSET) % 7 + 1  # 1=周一, 7=周日
+    discounts = np.zeros(nights, dtype=np.float64)
+    applied: List[Tuple[CompiledRule, int]] = []
+
+    def apply(rule: CompiledRule, mask):
+        if mask is True:
+            discounts[:] += rule.discount_rate
+            applied.append((rule, nights))
+            return
+        count = int(np.count_nonzero(mask))
+        if count:
+            discounts[mask] += rule.discount_rate
+            applied.append((rule, count))
+
+    # 周末规则：指定星期几，或未指定时周五至周日
+    for rule in hotel_rules.by_type["weekend"]:
+        apply(rule, weekdays == rule.day_of_week if rule.day_of_week else weekdays >= 5)
+
+    # 节假日规则：只作用于节假日当晚
+    holiday_ordinals = np.fromiter((d.toordinal() for d in holiday_dates), dtype=np.int64)
+    if holiday_ordinals.size and hotel_rules.by_type["holiday"]:
+        holiday_mask = np.isin(days, holiday_ordinals)
+        for rule in hotel_rules.by_type["holiday"]:
+            apply(rule, holiday_mask)
+
+    # 季节规则：只作用于季节区间内的晚上
+    last_day = date.fromordinal(first + nights - 1)
+    for rule in hotel_rules.seasons_overlapping(start_date, last_day):
+        apply(rule, (days >= rule.start_date.toordinal()) & (days <= rule.end_date.toordinal()))
+
+    # 新用户、连住规则：作用于整段入住
+    if is_new_user:
+        for rule in hotel_rules.by_type["new_user"]:
+            apply(rule, True)
+    for rule in hotel_rules.long_stays_for(nights if stay_nights is None else stay_nights):
+        apply(rule, True)
+
+    applied.sort(key=lambda item: item[0].id)
+    return NightlyQuote(start_date, base_price, discounts, applied)
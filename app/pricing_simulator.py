@@ -0,0 +1,256 @@
+# 价格规则离线模拟
+# 用一组候选价格规则重新计算历史预订的价格，对比实际成交额，评估规则上线后的收入影响。
+# 按酒店拆分到进程池并行计算，每个进程流式读取预订、只保留汇总结果，内存占用与预订量无关。
+#
+# 用法: python -m app.pricing_simulator rules.json [--since 2025-01-01] [--until 2025-12-31]
+#                                                  [--workers 4] [--hotel-id 1 --hotel-id 2] [--output report.json]
+# rules.json 为价格规则列表，字段与创建价格规则接口相同，例如:
+#   [{"rule_name": "周末加价", "rule_type": "weekend", "discount_rate": -10}]
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+from app.models import PriceRule, User
+from app.schemas import PriceRuleCreate
+from app.pricing_engine import CompiledRule, RuleBook, quote_nights
+from app.holiday_calendar import HolidayCalendar, load_holiday_calendar
+from app.booking_archive import booking_tables_for_range
+
+# 参与模拟的预订状态（已取消的预订没有成交额）
+SIMULATED_STATUSES = ("pending", "confirmed", "completed", "no_show")
+
+# 每批从数据库读取的预订数
+STREAM_BATCH_SIZE = 2000
+
+def load_rule_file(path: str) -> List[dict]:
+    """读取候选规则文件，按创建价格规则的模式校验"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("规则文件必须是规则对象的列表")
+    return [PriceRuleCreate(**item).model_dump(mode="json") for item in data]
+
+def compile_rule_book(rules: Sequence[dict]) -> RuleBook:
+    """编译候选规则（规则ID按文件中的顺序编号，决定规则的显示顺序）"""
+    compiled = []
+    for i, data in enumerate(rules, start=1):
+        if not data.get("is_active", True):
+            continue
+        rule = PriceRule(**{
+            **data,
+            "start_date": date.fromisoformat(data["start_date"]) if data.get("start_date") else None,
+            "end_date": date.fromisoformat(data["end_date"]) if data.get("end_date") else None,
+            "discount_rate": Decimal(str(data["discount_rate"])),
+        })
+        rule.id = i
+        compiled.append(CompiledRule(rule))
+    return RuleBook(compiled)
+
+def _empty_rule_stats(rule_name: str) -> dict:
+    return {"rule_name": rule_name, "bookings": 0, "room_nights": 0, "discount_amount": 0.0}
+
+# ========== 工作进程 ==========
+
+_worker_rule_book: Optional[RuleBook] = None
+_worker_holidays: Optional[HolidayCalendar] = None
+
+def _init_worker(rules: List[dict]):
+    """工作进程初始化：编译规则、加载节假日（每个进程只做一次）"""
+    global _worker_rule_book, _worker_holidays
+    from app.database import SessionLocal, engine
+
+    # fork 出的子进程不能复用父进程的连接
+    engine.dispose(close=False)
+    _worker_rule_book = compile_rule_book(rules)
+    session = SessionLocal()
+    try:
+        _worker_holidays = load_holiday_calendar(session)
+    finally:
+        session.close()
+
+def simulate_hotel(hotel_id: int, since: Optional[date] = None, until: Optional[date] = None) -> dict:
+    """
+    重新计算某个酒店的历史预订价格，返回汇总结果
+    新用户按“该预订是用户的首次预订”判断；基础价格使用预订时记录的基础价格
+    """
+    from app.database import SessionLocal
+
+    hotel_rules = _worker_rule_book.for_hotel(hotel_id)
+    result = {
+        "hotel_id": hotel_id,
+        "bookings": 0,
+        "room_nights": 0,
+        "actual_revenue": 0.0,
+        "simulated_revenue": 0.0,
+        "base_revenue": 0.0,
+        "rules": {},
+    }
+
+    session = SessionLocal()
+    try:
+        # 历史区间涉及已归档的预订时同时读取归档表，每张表分别按日期范围流式读取
+        for table in booking_tables_for_range(session, since):
+            query = session.query(
+                table.check_in_date,
+                table.check_out_date,
+                table.room_count,
+                table.base_price,
+                table.final_price,
+                table.booking_time,
+                User.first_booking_at
+            ).outerjoin(User, User.id == table.user_id).filter(
+                table.hotel_id == hotel_id,
+                table.status.in_(SIMULATED_STATUSES)
+            )
+            if since:
+                query = query.filter(table.check_in_date >= since)
+            if until:
+                query = query.filter(table.check_in_date <= until)
+
+            for check_in, check_out, room_count, base_price, final_price, booking_time, first_booking_at in \
+                    query.yield_per(STREAM_BATCH_SIZE):
+                nights = (check_out - check_in).days
+                room_count = room_count or 1
+                base = float(base_price or 0)
+                is_new_user = first_booking_at is None or (booking_time is not None and booking_time <= first_booking_at)
+                quote = quote_nights(
+                    hotel_rules, base, check_in, nights,
+                    _worker_holidays.holidays_between(check_in, check_out),
+                    is_new_user
+                )
+
+                result["bookings"] += 1
+                result["room_nights"] += nights * room_count
+                result["actual_revenue"] += float(final_price or 0)
+                result["simulated_revenue"] += quote.total_price * room_count
+                result["base_revenue"] += base * nights * room_count
+                # 按规则ID汇总（名称可能重复），名称随结果带出用于显示
+                for rule, rule_nights in quote.rule_nights:
+                    stats = result["rules"].get(rule.id)
+                    if stats is None:
+                        stats = result["rules"][rule.id] = _empty_rule_stats(rule.name)
+                    stats["bookings"] += 1
+                    stats["room_nights"] += rule_nights * room_count
+                    stats["discount_amount"] += base * rule.discount_rate / 100.0 * rule_nights * room_count
+    finally:
+        session.close()
+
+    return result
+
+def _simulate_hotel_args(args):
+    return simulate_hotel(*args)
+
+# ========== 主进程 ==========
+
+def _hotels_with_bookings(since: Optional[date], until: Optional[date]) -> List[int]:
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        hotel_ids = set()
+        for table in booking_tables_for_range(session, since):
+            query = session.query(table.hotel_id).filter(table.status.in_(SIMULATED_STATUSES))
+            if since:
+                query = query.filter(table.check_in_date >= since)
+            if until:
+                query = query.filter(table.check_in_date <= until)
+            hotel_ids.update(row[0] for row in query.distinct())
+        return sorted(hotel_ids)
+    finally:
+        session.close()
+
+def run_simulation(
+    rules: List[dict],
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    hotel_ids: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None
+) -> dict:
+    """
+    执行模拟，返回 {"hotels": [...], "rules": [...], "total": {...}}
+    每个酒店的结果到达后立即并入汇总，主进程只保存每个酒店一行汇总
+    """
+    start = time.perf_counter()
+    hotel_ids = list(hotel_ids) if hotel_ids else _hotels_with_bookings(since, until)
+    workers = workers or os.cpu_count() or 1
+
+    hotels = []
+    rules_total: Dict[int, dict] = {}
+    total = {"bookings": 0, "room_nights": 0, "actual_revenue": 0.0, "simulated_revenue": 0.0, "base_revenue": 0.0}
+
+    tasks = [(hotel_id, since, until) for hotel_id in hotel_ids]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rules,)) as executor:
+        for result in executor.map(_simulate_hotel_args, tasks, chunksize=chunksize):
+            if not result["bookings"]:
+                continue
+            for key in total:
+                total[key] += result[key]
+            for rule_id, stats in result.pop("rules").items():
+                if rule_id not in rules_total:
+                    rules_total[rule_id] = _empty_rule_stats(stats["rule_name"])
+                for key in ("bookings", "room_nights", "discount_amount"):
+                    rules_total[rule_id][key] += stats[key]
+            result["revenue_diff"] = result["simulated_revenue"] - result["actual_revenue"]
+            hotels.append(result)
+
+    total["revenue_diff"] = total["simulated_revenue"] - total["actual_revenue"]
+    total["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+    return {
+        "hotels": sorted(hotels, key=lambda h: h["revenue_diff"]),
+        "rules": [{"rule_id": rule_id, **rules_total[rule_id]} for rule_id in sorted(rules_total)],
+        "total": total,
+    }
+
+def _round_report(value):
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _round_report(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_round_report(v) for v in value]
+    return value
+
+def print_report(report: dict):
+    total = report["total"]
+    print(f"模拟预订 {total['bookings']} 条，间夜 {total['room_nights']}，耗时 {total['elapsed_seconds']}s")
+    print(f"实际成交额 {total['actual_revenue']:.2f}，模拟成交额 {total['simulated_revenue']:.2f}，"
+          f"差额 {total['revenue_diff']:+.2f}")
+
+    print("\n按酒店：")
+    print(f"{'酒店ID':>8} {'预订数':>8} {'实际成交额':>14} {'模拟成交额':>14} {'差额':>12}")
+    for hotel in report["hotels"]:
+        print(f"{hotel['hotel_id']:>8} {hotel['bookings']:>8} {hotel['actual_revenue']:>14.2f} "
+              f"{hotel['simulated_revenue']:>14.2f} {hotel['revenue_diff']:>+12.2f}")
+
+    print("\n按规则（折扣额为正表示让利，为负表示加价）：")
+    print(f"{'ID':>4} {'规则':<20} {'命中预订':>8} {'命中间夜':>8} {'折扣额':>14}")
+    for rule in report["rules"]:
+        print(f"{rule['rule_id']:>4} {rule['rule_name']:<20} {rule['bookings']:>8} {rule['room_nights']:>8} "
+              f"{rule['discount_amount']:>14.2f}")
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="用候选价格规则重新计算历史预订，评估收入影响")
+    parser.add_argument("rules", help="候选规则JSON文件")
+    parser.add_argument("--since", type=date.fromisoformat, help="入住日期起（YYYY-MM-DD）")
+    parser.add_argument("--until", type=date.fromisoformat, help="入住日期止（YYYY-MM-DD）")
+    parser.add_argument("--hotel-id", type=int, action="append", dest="hotel_ids", help="只模拟指定酒店，可重复")
+    parser.add_argument("--workers", type=int, help="进程数，默认为CPU核数")
+    parser.add_argument("--output", help="将完整报告写入JSON文件")
+    args = parser.parse_args(argv)
+
+    rules = load_rule_file(args.rules)
+    report = _round_report(run_simulation(rules, args.since, args.until, args.hotel_ids, args.workers))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
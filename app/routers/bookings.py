@@ -1,27 +1,51 @@
 # 预订相关路由
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, and_, or_
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from app.database import get_db
-from app.models import Booking, Hotel, User, BookingStatus
-from app.schemas import BookingCreate, BookingUpdate, BookingResponseUpdated
-from app.routers.pricing import calculate_price
-from app.auth import get_current_user_optional
+from app.database import get_db, run_in_transaction
+from app.models import Booking, Hotel, RoomType, User, BookingStatus
+from app.schemas import (
+    BookingCreate, BookingUpdate, BookingResponseUpdated,
+    BatchBookingRequest, BatchBookingItemError, BatchBookingResponse
+)
+from app.routers.pricing import calculate_price, get_user_segment
+from app.inventory import NO_ROOM_TYPE, reserve_rooms, apply_status_change, check_batch_availability
+from app.holiday_calendar import get_holiday_calendar
+from app.pricing_engine import quote_nights, rule_cache
+from app.user_counters import record_booking_created, apply_booking_status_change
+from app.auth import get_current_user_optional, require_admin, require_stream_admin, create_stream_token
+from app.booking_archive import booking_tables_for_range, find_archived_booking
+from app.booking_events import booking_events
+from app.config import BOOKING_EVENT_HEARTBEAT_SECONDS, BOOKING_STREAM_TOKEN_EXPIRE_SECONDS
+from app import idempotency
+from app.pagination import keyset_paginate_merged
+import asyncio
 import uuid
 
 router = APIRouter(prefix="/api/bookings", tags=["预订管理"])
 
+# 批量预订单次最多的预订项数
+BATCH_BOOKING_MAX_ITEMS = 50
+
+def generate_booking_no(booking_time: datetime) -> str:
+    """生成预订编号"""
+    return f"BK{booking_time.strftime('%Y%m%d')}{str(uuid.uuid4())[:5].upper()}"
+
 @router.post("/", response_model=BookingResponseUpdated, summary="创建预订")
 def create_booking(
     booking: BookingCreate, 
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="幂等键，重试时携带相同的值不会重复创建预订"),
     current_user: User = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
     """
     创建酒店预订（用户ID从JWT token获取）
+    携带 Idempotency-Key 请求头时，相同键的重试请求直接返回首次创建的预订
     """
     # 必须登录才能创建预订
     if not current_user:
@@ -29,6 +53,15 @@ def create_booking(
     
     user_id = current_user.id  # 使用token中的用户ID
     
+    # 重试请求：直接返回该键已创建的预订
+    fingerprint = None
+    if idempotency_key is not None:
+        idempotency_key = idempotency.validate_key(idempotency_key)
+        fingerprint = idempotency.request_fingerprint(booking.model_dump(mode="json"))
+        existing = idempotency.find_booking(db, user_id, idempotency_key, fingerprint)
+        if existing:
+            return existing
+    
     # 验证日期
     if booking.check_out_date <= booking.check_in_date:
         raise HTTPException(status_code=400, detail="离店日期必须晚于入住日期")
@@ -44,66 +77,242 @@ def create_booking(
     if not hotel:
         raise HTTPException(status_code=404, detail="酒店不存在")
     
-    # 检查房间可用性（简化版：检查可用房间数）
-    if hotel.available_rooms < booking.room_count:
-        raise HTTPException(status_code=400, detail="可用房间不足")
-    
-    # 检查日期冲突（简化版：检查该日期段是否有足够房间被预订）
-    conflicting_bookings = db.query(Booking).filter(
-        and_(
-            Booking.hotel_id == booking.hotel_id,
-            Booking.status.in_(["pending", "confirmed"]),
-            or_(
-                and_(Booking.check_in_date <= booking.check_in_date, Booking.check_out_date > booking.check_in_date),
-                and_(Booking.check_in_date < booking.check_out_date, Booking.check_out_date >= booking.check_out_date),
-                and_(Booking.check_in_date >= booking.check_in_date, Booking.check_out_date <= booking.check_out_date)
-            )
-        )
-    ).all()
+    # 指定房型时按房型的房间总数计算库存，否则按酒店可用房间数
+    capacity = hotel.available_rooms
+    if booking.room_type_id:
+        room_type = db.query(RoomType).filter(
+            RoomType.id == booking.room_type_id,
+            RoomType.hotel_id == booking.hotel_id
+        ).first()
+        if not room_type:
+            raise HTTPException(status_code=404, detail="房间类型不存在")
+        capacity = room_type.total_count
     
-    total_conflicting_rooms = sum(b.room_count for b in conflicting_bookings)
-    if hotel.available_rooms - total_conflicting_rooms < booking.room_count:
-        raise HTTPException(status_code=400, detail="所选日期房间已被预订")
-    
-    # 计算价格
+    # 计算价格（与用户刚看到的报价相同时直接复用缓存结果）
     price_info = calculate_price(
         hotel_id=booking.hotel_id,
         check_in_date=booking.check_in_date,
         check_out_date=booking.check_out_date,
         user_id=user_id,
-        db=db
+        db=db,
+        room_type_id=booking.room_type_id,
+        user=current_user
     )
     
-    # 生成预订编号
-    booking_no = f"BK{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:5].upper()}"
-    
-    # 创建预订
-    db_booking = Booking(
-        booking_no=booking_no,
-        user_id=user_id,
-        hotel_id=booking.hotel_id,
-        check_in_date=booking.check_in_date,
-        check_out_date=booking.check_out_date,
-        nights=nights,
-        room_count=booking.room_count,
-        base_price=price_info["base_price"],
-        discount_rate=price_info["discount_rate"],
-        final_price=price_info["final_price"] * booking.room_count * nights,
-        status="confirmed",
-        confirm_time=datetime.now(),
-        notes=booking.notes
-    )
+    def create():
+        # 原子占用库存：条件更新台账行，某晚已满时抛出异常并回滚
+        reserve_rooms(
+            db,
+            hotel_id=booking.hotel_id,
+            room_type_id=booking.room_type_id,
+            check_in_date=booking.check_in_date,
+            check_out_date=booking.check_out_date,
+            room_count=booking.room_count,
+            capacity=capacity
+        )
+        
+        # 生成预订编号
+        booking_time = datetime.now().replace(microsecond=0)
+        booking_no = generate_booking_no(booking_time)
+        
+        # 创建预订
+        db_booking = Booking(
+            booking_no=booking_no,
+            user_id=user_id,
+            hotel_id=booking.hotel_id,
+            room_type_id=booking.room_type_id,
+            check_in_date=booking.check_in_date,
+            check_out_date=booking.check_out_date,
+            nights=nights,
+            room_count=booking.room_count,
+            base_price=price_info["base_price"],
+            discount_rate=price_info["discount_rate"],
+            final_price=price_info["total_price"] * booking.room_count,
+            status="confirmed",
+            booking_time=booking_time,
+            confirm_time=datetime.now(),
+            notes=booking.notes
+        )
+        db.add(db_booking)
+        
+        # 更新用户预订计数
+        record_booking_created(db, user_id, booking_time)
+        
+        # 记录幂等键
+        if idempotency_key is not None:
+            db.flush()
+            idempotency.remember_booking(db, user_id, idempotency_key, fingerprint, db_booking.id)
+        return db_booking
     
-    db.add(db_booking)
-    db.commit()
+    # 库存、预订记录、用户计数和幂等键在同一事务中提交，遇到死锁时整体重试
+    try:
+        db_booking = run_in_transaction(db, create)
+    except IntegrityError:
+        # 相同键的并发请求已先一步创建预订（本事务已回滚），返回该预订
+        existing = None
+        if idempotency_key is not None:
+            existing = idempotency.find_booking(db, user_id, idempotency_key, fingerprint)
+        if not existing:
+            raise
+        return existing
     db.refresh(db_booking)
+    booking_events.publish("booking.created", db_booking)
     return db_booking
 
+def _reject_batch(items: List[BookingCreate], errors: Dict[int, str]):
+    """拒绝整个批量预订，返回每个出错预订项的错误"""
+    raise HTTPException(status_code=400, detail={
+        "message": "批量预订失败，所有预订均未创建",
+        "errors": [
+            BatchBookingItemError(
+                index=index,
+                hotel_id=items[index].hotel_id,
+                room_type_id=items[index].room_type_id,
+                error=error
+            ).model_dump()
+            for index, error in sorted(errors.items())
+        ]
+    })
+
+@router.post("/batch", response_model=BatchBookingResponse, summary="批量创建预订")
+def create_bookings_batch(
+    request: BatchBookingRequest,
+    current_user: User = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    一次创建多个预订（可跨酒店、房型和日期），用于旅行社等团体预订
+    所有预订在同一事务中创建，全部成功或全部失败；失败时返回每个出错预订项的错误。
+    酒店、房型和库存各只查询一次，价格规则和节假日来自内存
+    """
+    if not current_user:
+        raise HTTPException(status_code=401, detail="请先登录")
+    
+    items = request.items
+    if len(items) > BATCH_BOOKING_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"单次最多创建{BATCH_BOOKING_MAX_ITEMS}个预订")
+    
+    user_id = current_user.id
+    today = date.today()
+    errors: Dict[int, str] = {}
+    for index, item in enumerate(items):
+        if item.check_out_date <= item.check_in_date:
+            errors[index] = "离店日期必须晚于入住日期"
+        elif item.check_in_date < today:
+            errors[index] = "入住日期不能是过去日期"
+    
+    # 一次查询所有酒店和房型
+    hotel_ids = {item.hotel_id for item in items}
+    room_type_ids = {item.room_type_id for item in items if item.room_type_id}
+    hotels = {hotel.id: hotel for hotel in db.query(Hotel).filter(Hotel.id.in_(hotel_ids))}
+    room_types = {
+        room_type.id: room_type
+        for room_type in db.query(RoomType).filter(RoomType.id.in_(room_type_ids))
+    } if room_type_ids else {}
+    
+    # stays: [(序号, 酒店ID, 房型ID, 入住日期, 离店日期, 房间数, 容量, 基础价格)]
+    stays = []
+    for index, item in enumerate(items):
+        if index in errors:
+            continue
+        hotel = hotels.get(item.hotel_id)
+        if not hotel:
+            errors[index] = "酒店不存在"
+            continue
+        capacity, base_price = hotel.available_rooms, hotel.base_price
+        if item.room_type_id:
+            room_type = room_types.get(item.room_type_id)
+            if not room_type or room_type.hotel_id != item.hotel_id:
+                errors[index] = "房间类型不存在"
+                continue
+            capacity, base_price = room_type.total_count, room_type.base_price
+        stays.append((
+            index, item.hotel_id, item.room_type_id, item.check_in_date, item.check_out_date,
+            item.room_count, capacity, base_price
+        ))
+    
+    # 一次查询检查所有预订项的库存（同一批次内相互叠加）
+    errors.update(check_batch_availability(db, [stay[:7] for stay in stays]))
+    if errors:
+        _reject_batch(items, errors)
+    
+    # 逐项计价：规则和节假日只取一次；与逐个下单一致，新用户优惠只用于第一个预订
+    rule_book = rule_cache.get(db)
+    holiday_calendar = get_holiday_calendar(db)
+    new_user, _ = get_user_segment(db, user=current_user)
+    quotes = {}
+    for index, hotel_id, _, check_in_date, check_out_date, _, _, base_price in stays:
+        quotes[index] = quote_nights(
+            rule_book.for_hotel(hotel_id),
+            float(base_price),
+            check_in_date,
+            (check_out_date - check_in_date).days,
+            holiday_calendar.holidays_between(check_in_date, check_out_date),
+            new_user and not quotes
+        )
+    
+    def create():
+        # 按 (酒店, 房型, 入住日期) 的固定顺序占用库存，并发的批量预订按相同顺序加锁，不会相互死锁
+        for index, hotel_id, room_type_id, check_in_date, check_out_date, room_count, capacity, _ in sorted(
+            stays, key=lambda stay: (stay[1], stay[2] or NO_ROOM_TYPE, stay[3])
+        ):
+            try:
+                reserve_rooms(db, hotel_id, room_type_id, check_in_date, check_out_date, room_count, capacity)
+            except HTTPException as exc:
+                # 预检查之后被其他预订抢先占用
+                _reject_batch(items, {index: exc.detail})
+        
+        booking_time = datetime.now().replace(microsecond=0)
+        created = []
+        for index, hotel_id, room_type_id, check_in_date, check_out_date, room_count, _, _ in stays:
+            quote = quotes[index]
+            created.append(Booking(
+                booking_no=generate_booking_no(booking_time),
+                user_id=user_id,
+                hotel_id=hotel_id,
+                room_type_id=room_type_id,
+                check_in_date=check_in_date,
+                check_out_date=check_out_date,
+                nights=quote.nights,
+                room_count=room_count,
+                base_price=Decimal(str(quote.base_price)),
+                discount_rate=Decimal(str(quote.average_discount)),
+                final_price=Decimal(str(quote.total_price)) * room_count,
+                status="confirmed",
+                booking_time=booking_time,
+                confirm_time=datetime.now(),
+                notes=items[index].notes
+            ))
+        db.add_all(created)
+        record_booking_created(db, user_id, booking_time, count=len(created))
+        db.flush()
+        return [booking.id for booking in created]
+    
+    # 所有预订一次提交，遇到死锁时整体重试
+    booking_ids = run_in_transaction(db, create)
+    
+    # 按请求顺序返回，酒店及城市信息一起 JOIN 加载
+    loaded = {
+        booking.id: booking
+        for booking in db.query(Booking).options(
+            joinedload(Booking.hotel).joinedload(Hotel.city)
+        ).filter(Booking.id.in_(booking_ids))
+    }
+    bookings = [loaded[booking_id] for booking_id in booking_ids]
+    for booking in bookings:
+        booking_events.publish("booking.created", booking)
+    return {
+        "bookings": bookings,
+        "total_price": sum((booking.final_price for booking in bookings), Decimal("0"))
+    }
+
 @router.get("/", response_model=List[BookingResponseUpdated], summary="获取预订列表")
 def get_bookings(
+    response: Response,
     hotel_id: Optional[int] = Query(None, description="酒店ID"),
     status: Optional[str] = Query(None, description="预订状态"),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过记录数（已弃用，请使用cursor）"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
     limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
@@ -111,41 +320,99 @@ def get_bookings(
     """
     获取预订列表，支持按酒店、状态筛选
     普通用户只能查看自己的预订，管理员可以查看所有
+    包含已归档的预订：预订表和归档表分别按预订时间分页查询，再合并为一页
     """
-    query = db.query(Booking)
-    
     # 必须登录才能查看预订列表
     if not current_user:
         raise HTTPException(status_code=401, detail="请先登录")
     
-    # 如果是普通用户，只能查看自己的预订；管理员可以查看所有
-    if current_user.role != "admin":
-        query = query.filter(Booking.user_id == current_user.id)
-    if hotel_id:
-        query = query.filter(Booking.hotel_id == hotel_id)
-    if status:
-        query = query.filter(Booking.status == status)
+    sources = []
+    for table in booking_tables_for_range(db):
+        # 响应中包含酒店及其城市信息，一起 JOIN 加载，避免逐条查询
+        query = db.query(table).options(joinedload(table.hotel).joinedload(Hotel.city))
+        
+        # 如果是普通用户，只能查看自己的预订；管理员可以查看所有
+        if current_user.role != "admin":
+            query = query.filter(table.user_id == current_user.id)
+        if hotel_id:
+            query = query.filter(table.hotel_id == hotel_id)
+        if status:
+            query = query.filter(table.status == status)
+        sources.append((query, [(table.booking_time, True), (table.id, True)]))
     
-    bookings = query.order_by(Booking.booking_time.desc()).offset(skip).limit(limit).all()
+    bookings = keyset_paginate_merged(
+        sources,
+        response=response,
+        limit=limit,
+        cursor=cursor,
+        skip=skip
+    )
     return bookings
 
+@router.post("/stream/token", summary="获取预订事件流令牌")
+def get_stream_token(current_user: User = Depends(require_admin)):
+    """
+    签发短期的事件流令牌（需要管理员权限）
+    浏览器的 EventSource 不能设置 Authorization 请求头，通过 /stream?token=... 传递该令牌；
+    令牌只在建立连接时校验，过期后重连需要重新获取
+    """
+    return {"token": create_stream_token(current_user), "expires_in": BOOKING_STREAM_TOKEN_EXPIRE_SECONDS}
+
+@router.get("/stream", summary="预订事件流（SSE）")
+async def stream_booking_events(
+    hotel_id: Optional[int] = Query(None, description="酒店ID（不传则接收所有酒店的事件）"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", description="断线重连时最后收到的事件ID"),
+    last_event_id_param: Optional[str] = Query(None, alias="last_event_id", description="最后收到的事件ID（重新获取令牌后新建连接时使用）"),
+    current_user: User = Depends(require_stream_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    以 Server-Sent Events 推送预订的创建、取消、修改和归档事件（需要管理员权限），供前台和管理页面实时刷新
+    事件类型：booking.created / booking.cancelled / booking.updated / booking.archived，
+    状态自动流转（完成、未入住、超时取消）同样发布 booking.updated / booking.cancelled；
+    携带 Last-Event-ID 重连时补发错过的事件，无法补发时先发送 reset 事件，客户端应重新加载预订列表。
+    浏览器 EventSource 通过 token 查询参数认证（见 /stream/token），其他客户端也可以使用 Authorization 请求头
+    """
+    # 认证完成后立即归还数据库连接，长连接期间不占用连接池
+    db.close()
+    subscription = booking_events.subscribe(hotel_id, last_event_id or last_event_id_param)
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=BOOKING_EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # 心跳，防止代理因连接空闲而断开
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event.encode()
+        finally:
+            booking_events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{booking_id}", response_model=BookingResponseUpdated, summary="获取预订详情")
 def get_booking(booking_id: int, db: Session = Depends(get_db)):
     """
-    根据ID获取预订详情（包含酒店信息）
+    根据ID获取预订详情（包含酒店信息），预订表中没有时查询归档表
     """
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    # 酒店及城市信息一起 JOIN 加载
+    booking = db.query(Booking).options(
+        joinedload(Booking.hotel).joinedload(Hotel.city)
+    ).filter(Booking.id == booking_id).first()
+    if not booking:
+        booking = find_archived_booking(db, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="预订不存在")
     
-    # 加载酒店信息
-    if booking.hotel_id:
-        booking.hotel = db.query(Hotel).filter(Hotel.id == booking.hotel_id).first()
-        # 加载城市信息
-        if booking.hotel and booking.hotel.city_id:
-            from app.models import City
-            booking.hotel.city = db.query(City).filter(City.id == booking.hotel.city_id).first()
-    
     return booking
 
 @router.put("/{booking_id}/cancel", response_model=BookingResponseUpdated, summary="取消预订")
@@ -153,20 +420,29 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
     """
     取消预订
     """
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="预订不存在")
+    def cancel():
+        # 锁定预订行后再检查状态，并发的取消（或自动流转）不会重复释放同一预订的库存
+        booking = db.query(Booking).filter(Booking.id == booking_id).with_for_update().first()
+        if not booking:
+            raise HTTPException(status_code=404, detail="预订不存在")
+        
+        if booking.status == "cancelled":
+            raise HTTPException(status_code=400, detail="预订已取消")
+        
+        if booking.status == "completed":
+            raise HTTPException(status_code=400, detail="已完成预订不能取消")
+        
+        # 释放库存，更新用户预订计数
+        apply_status_change(db, booking, "cancelled")
+        apply_booking_status_change(db, booking, "cancelled")
+        
+        booking.status = "cancelled"
+        booking.cancel_time = datetime.now()
+        return booking
     
-    if booking.status == "cancelled":
-        raise HTTPException(status_code=400, detail="预订已取消")
-    
-    if booking.status == "completed":
-        raise HTTPException(status_code=400, detail="已完成预订不能取消")
-    
-    booking.status = "cancelled"
-    booking.cancel_time = datetime.now()
-    db.commit()
+    booking = run_in_transaction(db, cancel)
     db.refresh(booking)
+    booking_events.publish("booking.cancelled", booking)
     return booking
 
 @router.put("/{booking_id}", response_model=BookingResponseUpdated, summary="更新预订信息")
@@ -174,14 +450,24 @@ def update_booking(booking_id: int, booking_update: BookingUpdate, db: Session =
     """
     更新预订信息（主要用于管理员修改状态）
     """
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="预订不存在")
-    
     update_data = booking_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(booking, field, value)
     
-    db.commit()
+    def update():
+        # 锁定预订行，按锁定后读到的状态同步库存，避免与并发的取消重复释放
+        booking = db.query(Booking).filter(Booking.id == booking_id).with_for_update().first()
+        if not booking:
+            raise HTTPException(status_code=404, detail="预订不存在")
+        
+        # 状态变化时同步库存台账和用户预订计数
+        if "status" in update_data and update_data["status"] != booking.status:
+            apply_status_change(db, booking, update_data["status"])
+            apply_booking_status_change(db, booking, update_data["status"])
+        
+        for field, value in update_data.items():
+            setattr(booking, field, value)
+        return booking
+    
+    booking = run_in_transaction(db, update)
     db.refresh(booking)
+    booking_events.publish("booking.updated", booking)
     return booking
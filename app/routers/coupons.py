@@ -1,15 +1,23 @@
 # 优惠券相关路由
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import date
 from app.database import get_db
 from app.models import Coupon, UserCoupon, User, Booking
 from app.schemas import CouponCreate, CouponUpdate, CouponResponse, UserCouponResponse
 from app.auth import get_current_user_optional
+from app.coupon_index import COUPONS_VERSION, coupon_index_cache, get_coupon_index
+from app.versions import bump_version
 
 router = APIRouter(prefix="/api/coupons", tags=["优惠券管理"])
 
+def _load_coupons(db: Session, coupon_ids: List[int]) -> List[Coupon]:
+    """按ID批量取回优惠券（保持ID顺序）"""
+    if not coupon_ids:
+        return []
+    return db.query(Coupon).filter(Coupon.id.in_(coupon_ids)).order_by(Coupon.id).all()
+
 @router.get("/", response_model=List[CouponResponse], summary="获取优惠券列表")
 def get_coupons(
     hotel_id: Optional[int] = Query(None, description="酒店ID"),
@@ -18,21 +26,10 @@ def get_coupons(
 ):
     """
     获取优惠券列表（管理员功能）
+    有效期和筛选条件在内存中的区间索引上匹配，再按ID取回优惠券
     """
-    query = db.query(Coupon)
-    
-    if hotel_id:
-        query = query.filter(
-            (Coupon.hotel_id == hotel_id) | (Coupon.hotel_id.is_(None))
-        )
-    if is_active is not None:
-        query = query.filter(Coupon.is_active == is_active)
-    
-    coupons = query.filter(
-        Coupon.start_date <= date.today(),
-        Coupon.end_date >= date.today()
-    ).all()
-    return coupons
+    coupon_ids = get_coupon_index(db).valid_on(date.today(), hotel_id=hotel_id, is_active=is_active)
+    return _load_coupons(db, coupon_ids)
 
 @router.get("/available", response_model=List[CouponResponse], summary="获取可用优惠券列表")
 def get_available_coupons(
@@ -50,25 +47,14 @@ def get_available_coupons(
     user = current_user
     user_id = current_user.id  # 使用token中的用户ID
     
-    query = db.query(Coupon).filter(
-        Coupon.is_active == True,
-        Coupon.start_date <= date.today(),
-        Coupon.end_date >= date.today()
+    # 在有效期索引上筛选适用酒店和用户等级
+    coupon_ids = get_coupon_index(db).valid_on(
+        date.today(),
+        hotel_id=hotel_id,
+        is_active=True,
+        user_levels=["all", user.vip_level] if user.vip_level else None
     )
-    
-    # 筛选适用酒店
-    if hotel_id:
-        query = query.filter(
-            (Coupon.hotel_id == hotel_id) | (Coupon.hotel_id.is_(None))
-        )
-    
-    # 筛选适用用户等级
-    if user.vip_level:
-        vip_levels = ["all", user.vip_level]
-        query = query.filter(Coupon.user_level.in_(vip_levels))
-    
-    coupons = query.all()
-    return coupons
+    return _load_coupons(db, coupon_ids)
 
 @router.get("/my", response_model=List[UserCouponResponse], summary="获取我的优惠券")
 def get_my_coupons(
@@ -83,17 +69,15 @@ def get_my_coupons(
     if not current_user:
         raise HTTPException(status_code=401, detail="请先登录")
     
-    query = db.query(UserCoupon).filter(UserCoupon.user_id == current_user.id)  # 使用token中的用户ID
+    # 优惠券详情随用户优惠券一起 JOIN 加载，避免逐个查询
+    query = db.query(UserCoupon).options(joinedload(UserCoupon.coupon)).filter(
+        UserCoupon.user_id == current_user.id  # 使用token中的用户ID
+    )
     
     if status:
         query = query.filter(UserCoupon.status == status)
     
     user_coupons = query.order_by(UserCoupon.obtained_time.desc()).all()
-    
-    # 加载优惠券详情
-    for uc in user_coupons:
-        uc.coupon = db.query(Coupon).filter(Coupon.id == uc.coupon_id).first()
-    
     return user_coupons
 
 @router.post("/", response_model=CouponResponse, summary="创建优惠券")
@@ -108,10 +92,46 @@ def create_coupon(coupon: CouponCreate, db: Session = Depends(get_db)):
     
     db_coupon = Coupon(**coupon.dict())
     db.add(db_coupon)
+    bump_version(db, COUPONS_VERSION)
+    db.commit()
+    coupon_index_cache.invalidate()
+    db.refresh(db_coupon)
+    return db_coupon
+
+@router.put("/{coupon_id}", response_model=CouponResponse, summary="更新优惠券")
+def update_coupon(coupon_id: int, coupon_update: CouponUpdate, db: Session = Depends(get_db)):
+    """
+    更新优惠券（管理员功能）
+    """
+    db_coupon = db.query(Coupon).filter(Coupon.id == coupon_id).first()
+    if not db_coupon:
+        raise HTTPException(status_code=404, detail="优惠券不存在")
+    
+    for field, value in coupon_update.dict(exclude_unset=True).items():
+        setattr(db_coupon, field, value)
+    
+    # 有效期、启用状态可能变化，递增版本号使各进程的有效期索引重建
+    bump_version(db, COUPONS_VERSION)
     db.commit()
+    coupon_index_cache.invalidate()
     db.refresh(db_coupon)
     return db_coupon
 
+@router.delete("/{coupon_id}", summary="删除优惠券")
+def delete_coupon(coupon_id: int, db: Session = Depends(get_db)):
+    """
+    删除优惠券（管理员功能）
+    """
+    db_coupon = db.query(Coupon).filter(Coupon.id == coupon_id).first()
+    if not db_coupon:
+        raise HTTPException(status_code=404, detail="优惠券不存在")
+    
+    db.delete(db_coupon)
+    bump_version(db, COUPONS_VERSION)
+    db.commit()
+    coupon_index_cache.invalidate()
+    return {"message": "优惠券删除成功"}
+
 @router.post("/obtain/{coupon_id}", response_model=UserCouponResponse, summary="领取优惠券")
 def obtain_coupon(
     coupon_id: int,
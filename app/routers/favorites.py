@@ -1,11 +1,12 @@
 # 收藏相关路由
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 from app.database import get_db
 from app.models import Favorite, Hotel, User
 from app.schemas import FavoriteCreate, FavoriteResponse, HotelResponse
 from app.auth import get_current_user_optional
+from app.pagination import keyset_paginate
 
 router = APIRouter(prefix="/api/favorites", tags=["收藏管理"])
 
@@ -97,7 +98,9 @@ def remove_favorite_by_hotel(
 
 @router.get("/", response_model=List[FavoriteResponse], summary="获取收藏列表")
 def get_favorites(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过记录数（已弃用，请使用cursor）"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
     limit: int = Query(100, ge=1, le=100),
     current_user: User = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
@@ -109,13 +112,20 @@ def get_favorites(
     if not current_user:
         raise HTTPException(status_code=401, detail="请先登录")
     
-    favorites = db.query(Favorite).filter(
+    # 酒店信息随收藏一起 JOIN 加载，避免逐个查询
+    query = db.query(Favorite).options(joinedload(Favorite.hotel)).filter(
         Favorite.user_id == current_user.id  # 使用token中的用户ID
-    ).offset(skip).limit(limit).all()
-    
-    # 加载酒店信息
-    for favorite in favorites:
-        favorite.hotel = db.query(Hotel).filter(Hotel.id == favorite.hotel_id).first()
+    )
+    
+    # 按收藏时间倒序，游标分页
+    favorites = keyset_paginate(
+        query,
+        keys=[(Favorite.created_at, True), (Favorite.id, True)],
+        response=response,
+        limit=limit,
+        cursor=cursor,
+        skip=skip
+    )
     
     return favorites
 
@@ -0,0 +1,96 @@
+# 节假日管理路由
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import extract
+from typing import List
+from app.database import get_db
+from app.models import Holiday, User
+from app.schemas import HolidayCreate, HolidayUpdate, HolidayResponse
+from app.auth import require_admin
+from app.holiday_calendar import HOLIDAYS_VERSION, holiday_cache
+from app.versions import bump_version
+
+router = APIRouter(prefix="/api/holidays", tags=["节假日管理"])
+
+def _commit_holiday_change(db: Session):
+    """提交节假日修改，并使各进程的节假日日历失效"""
+    bump_version(db, HOLIDAYS_VERSION)
+    db.commit()
+    holiday_cache.invalidate()
+
+def _check_date_unique(db: Session, holiday_date, exclude_id: int = None):
+    query = db.query(Holiday).filter(Holiday.holiday_date == holiday_date)
+    if exclude_id:
+        query = query.filter(Holiday.id != exclude_id)
+    if query.first():
+        raise HTTPException(status_code=400, detail="该日期已存在节假日")
+
+@router.get("/", response_model=List[HolidayResponse], summary="获取节假日列表")
+def get_holidays(
+    year: int = Query(None, description="年份"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取节假日列表，可按年份筛选
+    """
+    query = db.query(Holiday)
+    if year:
+        query = query.filter(extract("year", Holiday.holiday_date) == year)
+    return query.order_by(Holiday.holiday_date.asc()).all()
+
+@router.post("/", response_model=HolidayResponse, summary="创建节假日")
+def create_holiday(
+    holiday: HolidayCreate,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    创建节假日（管理员功能）
+    """
+    _check_date_unique(db, holiday.holiday_date)
+    db_holiday = Holiday(**holiday.dict())
+    db.add(db_holiday)
+    _commit_holiday_change(db)
+    db.refresh(db_holiday)
+    return db_holiday
+
+@router.put("/{holiday_id}", response_model=HolidayResponse, summary="更新节假日")
+def update_holiday(
+    holiday_id: int,
+    holiday_update: HolidayUpdate,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    更新节假日（管理员功能）
+    """
+    db_holiday = db.query(Holiday).filter(Holiday.id == holiday_id).first()
+    if not db_holiday:
+        raise HTTPException(status_code=404, detail="节假日不存在")
+
+    update_data = holiday_update.dict(exclude_unset=True)
+    if update_data.get("holiday_date"):
+        _check_date_unique(db, update_data["holiday_date"], exclude_id=holiday_id)
+    for field, value in update_data.items():
+        setattr(db_holiday, field, value)
+
+    _commit_holiday_change(db)
+    db.refresh(db_holiday)
+    return db_holiday
+
+@router.delete("/{holiday_id}", summary="删除节假日")
+def delete_holiday(
+    holiday_id: int,
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    删除节假日（管理员功能）
+    """
+    db_holiday = db.query(Holiday).filter(Holiday.id == holiday_id).first()
+    if not db_holiday:
+        raise HTTPException(status_code=404, detail="节假日不存在")
+
+    db.delete(db_holiday)
+    _commit_holiday_change(db)
+    return {"message": "节假日删除成功"}
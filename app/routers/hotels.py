@@ -1,69 +1,421 @@
 # 酒店相关路由
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Set, Tuple, Union
+from datetime import date
+from collections import Counter
 from app.database import get_db
 from app.models import Hotel, City
-from app.schemas import HotelCreate, HotelUpdate, HotelResponseUpdated
-import json
+from app.schemas import (
+    HotelCreate, HotelUpdate, HotelResponseUpdated, HotelAvailabilityResponse, HotelNearbyResponse,
+    HotelListWithFacetsResponse
+)
+from app.inventory import get_remaining_rooms_by_hotel
+from app.search_index import hotel_search_index
+from app.tag_index import hotel_tag_index, parse_json_list
+from app.geo_index import hotel_geo_index
+from app.pagination import keyset_paginate, decode_cursor, encode_cursor, NEXT_CURSOR_HEADER
+from app.cache import create_cache, MISSING
+from app.config import HOTEL_CACHE_MAX_ENTRIES, HOTEL_CACHE_TTL_SECONDS
+from app.view_counter import hotel_view_counter
+from app.pricing_engine import BASE_PRICES_VERSION, invalidate_hotel_quotes
+from app.versions import bump_version
 
 router = APIRouter(prefix="/api/hotels", tags=["酒店管理"])
 
-@router.get("/", response_model=List[HotelResponseUpdated], summary="获取酒店列表")
+# 酒店列表和详情的响应缓存（缓存已序列化的JSON，命中时跳过查询和序列化）
+# 列表条目带有 "hotel_list" 标签，详情和列表条目都带有所含酒店的 ("hotel", id) 标签
+hotel_response_cache = create_cache("hotel_responses", HOTEL_CACHE_MAX_ENTRIES, HOTEL_CACHE_TTL_SECONDS)
+
+def invalidate_hotel_cache(hotel_id: Optional[int] = None, lists: bool = False):
+    """
+    使酒店响应缓存失效
+    hotel_id: 失效该酒店的详情及包含该酒店的列表页
+    lists: 失效全部列表页（酒店新增、删除或筛选字段变化时列表成员可能改变）
+    """
+    if hotel_id is not None:
+        hotel_response_cache.invalidate_tag(("hotel", hotel_id))
+        # 酒店或房型的基础价格可能变化
+        invalidate_hotel_quotes(hotel_id)
+    if lists:
+        hotel_response_cache.invalidate_tag("hotel_list")
+
+# 价格分面的区间（左闭右开，None 表示无上限）
+PRICE_BUCKETS = [(0, 200), (200, 400), (400, 600), (600, 1000), (1000, None)]
+
+def compute_hotel_facets(query, hotel_ids: Optional[Set[int]] = None) -> dict:
+    """
+    一次遍历筛选结果，统计星级、价格区间、城市和标签的数量
+    只查询计数需要的列，标签从内存标签索引读取；hotel_ids 为未能写入 SQL 的ID筛选，在遍历时过滤
+    """
+    rows = query.outerjoin(City, Hotel.city_id == City.id).with_entities(
+        Hotel.id, Hotel.star_level, Hotel.base_price, Hotel.city_id, City.name
+    ).order_by(None).all()
+    if hotel_ids is not None:
+        rows = [row for row in rows if row[0] in hotel_ids]
+    
+    hotel_tag_index.ensure_built(query.session)
+    star_counts = Counter()
+    price_counts = Counter()
+    city_counts = Counter()
+    city_names = {}
+    tag_counts = Counter()
+    
+    for hotel_id, star_level, base_price, city_id, city_name in rows:
+        star_counts[star_level] += 1
+        price = float(base_price or 0)
+        for i, (low, high) in enumerate(PRICE_BUCKETS):
+            if price >= low and (high is None or price < high):
+                price_counts[i] += 1
+                break
+        if city_id is not None:
+            city_counts[city_id] += 1
+            city_names[city_id] = city_name
+        tag_counts.update(hotel_tag_index.get_tags(hotel_id) or [])
+    
+    return {
+        "total": len(rows),
+        "star_level": [
+            {"value": star_level, "count": count}
+            for star_level, count in sorted(star_counts.items(), key=lambda item: -(item[0] or 0))
+        ],
+        "price": [
+            {
+                "label": f"{low}-{high}" if high is not None else f"{low}+",
+                "min": low,
+                "max": high,
+                "count": price_counts.get(i, 0)
+            }
+            for i, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        "city": [
+            {"city_id": city_id, "name": city_names[city_id], "count": count}
+            for city_id, count in city_counts.most_common()
+        ],
+        "tag": [{"value": tag, "count": count} for tag, count in tag_counts.most_common()],
+    }
+
+def _rank_page(query, ranked_ids: List[int], response: Response, limit: int, cursor: Optional[str], skip: int) -> List[Hotel]:
+    """
+    关键词搜索的分页：按相关度顺序每次取 MAX_SQL_ID_FILTER 个ID查询（应用其余筛选条件），
+    在 Python 中按相关度排列，凑满一页即停止；游标为本页最后一家酒店在相关度列表中的位置
+    """
+    if cursor:
+        position = decode_cursor(cursor, 1)[0]
+        if not isinstance(position, int) or position < 0:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        start, offset = position + 1, 0
+    else:
+        start, offset = 0, skip
+    
+    hotels, positions = [], []
+    for chunk_start in range(start, len(ranked_ids), MAX_SQL_ID_FILTER):
+        chunk = ranked_ids[chunk_start:chunk_start + MAX_SQL_ID_FILTER]
+        found = {hotel.id: hotel for hotel in query.filter(Hotel.id.in_(chunk)).all()}
+        for i, hotel_id in enumerate(chunk):
+            if hotel_id in found:
+                hotels.append(found[hotel_id])
+                positions.append(chunk_start + i)
+        if len(hotels) > offset + limit:
+            break
+    
+    hotels, positions = hotels[offset:], positions[offset:]
+    if len(hotels) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([positions[limit - 1]])
+    return hotels[:limit]
+
+def _serialize_hotel(hotel: Hotel) -> dict:
+    return HotelResponseUpdated.model_validate(hotel).model_dump(mode="json")
+
+# 内存索引筛选出的酒店ID不超过该数量时写成 SQL 的 IN 条件，否则在 Python 中与查询结果取交集，
+# 避免常见标签绑定数万个参数（超出 SQLite 参数上限、生成过大的 MySQL 语句）
+MAX_SQL_ID_FILTER = 500
+
+def restrict_to_ids(query, hotel_ids: Optional[Set[int]]) -> Tuple[object, Optional[Set[int]]]:
+    """
+    将查询限制在 hotel_ids 内（None 表示不限制）
+    返回 (查询, 需要在 Python 中过滤的ID集合)，ID数量较少时直接写入 SQL，第二项为 None
+    """
+    if hotel_ids is None:
+        return query, None
+    if len(hotel_ids) <= MAX_SQL_ID_FILTER:
+        return query.filter(Hotel.id.in_(hotel_ids)), None
+    return query, hotel_ids
+
+def apply_hotel_filters(
+    query,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    tags: Optional[List[str]] = None,
+    facilities: Optional[List[str]] = None,
+    match: str = "all",
+    star_level: Optional[int] = None,
+    min_rating: Optional[float] = None,
+    hotel_ids: Optional[Set[int]] = None
+) -> Tuple[object, Optional[Set[int]]]:
+    """
+    应用酒店列表的通用筛选条件（价格、标签、设施、星级、评分）
+    标签和设施通过内存索引做集合运算，match 为 all 时需全部满足，any 时满足任一即可；
+    hotel_ids 为调用方已有的ID范围（如名称搜索结果），与标签、设施的匹配结果取交集。
+    返回 (查询, 需要在 Python 中过滤的ID集合)，见 restrict_to_ids
+    """
+    # 价格范围筛选
+    if min_price is not None:
+        query = query.filter(Hotel.base_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Hotel.base_price <= max_price)
+    
+    # 标签、设施筛选
+    if tags or facilities:
+        hotel_tag_index.ensure_built(query.session)
+        matched_ids = hotel_tag_index.match(tags, facilities, match_all=(match == "all"))
+        if matched_ids is not None:
+            hotel_ids = matched_ids if hotel_ids is None else hotel_ids & matched_ids
+    
+    # 星级筛选
+    if star_level:
+        query = query.filter(Hotel.star_level == star_level)
+    
+    # 评分筛选
+    if min_rating is not None:
+        query = query.filter(Hotel.rating >= min_rating)
+    
+    return restrict_to_ids(query, hotel_ids)
+
+def _sync_hotel_indexes(hotel: Hotel):
+    """酒店新增或修改后同步更新内存索引"""
+    hotel_search_index.add_hotel(hotel)
+    hotel_tag_index.add_hotel(hotel)
+    hotel_geo_index.add_hotel(hotel)
+
+def _remove_from_hotel_indexes(hotel_id: int):
+    """酒店删除后从内存索引中移除"""
+    hotel_search_index.remove_hotel(hotel_id)
+    hotel_tag_index.remove_hotel(hotel_id)
+    hotel_geo_index.remove_hotel(hotel_id)
+
+@router.get(
+    "/",
+    response_model=Union[List[HotelResponseUpdated], HotelListWithFacetsResponse],
+    summary="获取酒店列表"
+)
 def get_hotels(
-    skip: int = Query(0, ge=0, description="跳过记录数"),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过记录数（已弃用，请使用cursor）"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
     limit: int = Query(100, ge=1, le=100, description="返回记录数"),
     name: Optional[str] = Query(None, description="酒店名称（模糊搜索）"),
+    keyword: Optional[str] = Query(None, description="关键词搜索（名称/地址/标签/城市，按相关度排序）"),
     city_id: Optional[int] = Query(None, description="城市ID"),
     min_price: Optional[float] = Query(None, ge=0, description="最低价格"),
     max_price: Optional[float] = Query(None, ge=0, description="最高价格"),
-    tag: Optional[str] = Query(None, description="标签筛选"),
+    tag: Optional[List[str]] = Query(None, description="标签筛选（可传多个）"),
+    facility: Optional[List[str]] = Query(None, description="设施筛选（可传多个）"),
+    match: str = Query("all", pattern="^(all|any)$", description="多个标签/设施的匹配方式：all-全部满足，any-满足任一"),
     star_level: Optional[int] = Query(None, ge=1, le=5, description="星级筛选"),
     min_rating: Optional[float] = Query(None, ge=0, le=5, description="最低评分"),
     is_recommended: Optional[bool] = Query(None, description="是否推荐"),
+    facets: bool = Query(False, description="是否同时返回筛选项计数（为 true 时返回 {items, facets}）"),
     db: Session = Depends(get_db)
 ):
     """
     获取酒店列表，支持分页和筛选
+    默认按推荐、评分排序并使用游标分页；关键词搜索按相关度排序，游标为相关度列表中的位置
+    facets=true 时额外返回当前筛选结果中各星级、价格区间、城市、标签的数量
     """
+    # 以规范化后的查询参数作为缓存键
+    cache_key = (
+        "list", skip, cursor, limit, name, keyword, city_id, min_price, max_price,
+        tuple(sorted(tag or [])), tuple(sorted(facility or [])), match,
+        star_level, min_rating, is_recommended, facets
+    )
+    cached = hotel_response_cache.get(cache_key)
+    if cached is not MISSING:
+        body, headers = cached
+        return JSONResponse(content=body, headers=headers)
+    
     query = db.query(Hotel)
+    ranked_ids = None
+    name_ids = None
     
-    # 名称模糊搜索
+    # 名称模糊搜索（优先使用倒排索引，关键词过短时回退到 LIKE）；作为筛选条件时取全部匹配，不截断
     if name:
-        query = query.filter(Hotel.name.like(f"%{name}%"))
+        hotel_search_index.ensure_built(db)
+        name_ids = hotel_search_index.search(name, fields=("name",), limit=None)
+        if name_ids is None:
+            query = query.filter(Hotel.name.like(f"%{name}%"))
+        else:
+            name_ids = set(name_ids)
+    
+    # 关键词全文搜索（名称、地址、标签、城市）
+    if keyword:
+        hotel_search_index.ensure_built(db)
+        ranked_ids = hotel_search_index.search(keyword)
+        if ranked_ids is None:
+            query = query.filter(Hotel.name.like(f"%{keyword}%") | Hotel.address.like(f"%{keyword}%"))
     
     # 城市筛选
     if city_id:
         query = query.filter(Hotel.city_id == city_id)
     
-    # 价格范围筛选
-    if min_price is not None:
-        query = query.filter(Hotel.base_price >= min_price)
-    if max_price is not None:
-        query = query.filter(Hotel.base_price <= max_price)
-    
-    # 标签筛选
-    if tag:
-        query = query.filter(Hotel.tags.like(f"%{tag}%"))
-    
-    # 星级筛选
-    if star_level:
-        query = query.filter(Hotel.star_level == star_level)
+    # 价格、标签、星级、评分筛选；名称和标签匹配的ID较多时不写入 SQL，由 id_filter 在 Python 中过滤
+    query, id_filter = apply_hotel_filters(
+        query,
+        min_price=min_price,
+        max_price=max_price,
+        tags=tag,
+        facilities=facility,
+        match=match,
+        star_level=star_level,
+        min_rating=min_rating,
+        hotel_ids=name_ids
+    )
     
-    # 评分筛选
-    if min_rating is not None:
-        query = query.filter(Hotel.rating >= min_rating)
+    # 关键词结果已按相关度截断，先与其他ID筛选取交集（ID列表不整体写入 SQL，见下方分批查询）
+    if ranked_ids is not None and id_filter is not None:
+        ranked_ids = [hotel_id for hotel_id in ranked_ids if hotel_id in id_filter]
+        id_filter = None
     
     # 推荐筛选
     if is_recommended is not None:
         query = query.filter(Hotel.is_recommended == is_recommended)
     
-    hotels = query.order_by(Hotel.is_recommended.desc(), Hotel.rating.desc()).offset(skip).limit(limit).all()
+    # 分面计数基于完整筛选结果（不受分页影响）
+    facet_counts = None
+    if facets:
+        if ranked_ids is not None:
+            facet_counts = compute_hotel_facets(*restrict_to_ids(query, set(ranked_ids)))
+        else:
+            facet_counts = compute_hotel_facets(query, id_filter)
+    
+    # 城市为多对一关系，随酒店一起 JOIN 加载，避免逐个查询
+    query = query.options(joinedload(Hotel.city))
+    
+    # 关键词搜索按相关度排序，否则按推荐、评分排序并使用游标分页
+    if ranked_ids is not None:
+        hotels = _rank_page(query, ranked_ids, response, limit, cursor, skip)
+    else:
+        hotels = keyset_paginate(
+            query,
+            keys=[(Hotel.is_recommended, True), (Hotel.rating, True), (Hotel.id, True)],
+            response=response,
+            limit=limit,
+            cursor=cursor,
+            skip=skip,
+            row_filter=(lambda hotel: hotel.id in id_filter) if id_filter is not None else None
+        )
+    
+    body = [_serialize_hotel(hotel) for hotel in hotels]
+    if facets:
+        body = {"items": body, "facets": facet_counts}
+    headers = {}
+    if NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    hotel_response_cache.set(
+        cache_key,
+        (body, headers),
+        tags=["hotel_list"] + [("hotel", hotel.id) for hotel in hotels]
+    )
+    return JSONResponse(content=body, headers=headers)
+
+@router.get("/availability", response_model=List[HotelAvailabilityResponse], summary="批量查询城市内可订酒店")
+def get_hotels_availability(
+    city_id: int = Query(..., description="城市ID"),
+    check_in: date = Query(..., description="入住日期"),
+    check_out: date = Query(..., description="离店日期"),
+    rooms: int = Query(1, ge=1, description="需要的房间数"),
+    min_price: Optional[float] = Query(None, ge=0, description="最低价格"),
+    max_price: Optional[float] = Query(None, ge=0, description="最高价格"),
+    tag: Optional[List[str]] = Query(None, description="标签筛选（可传多个）"),
+    facility: Optional[List[str]] = Query(None, description="设施筛选（可传多个）"),
+    match: str = Query("all", pattern="^(all|any)$", description="多个标签/设施的匹配方式：all-全部满足，any-满足任一"),
+    star_level: Optional[int] = Query(None, ge=1, le=5, description="星级筛选"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5, description="最低评分"),
+    db: Session = Depends(get_db)
+):
+    """
+    返回城市内在整个入住期间都有足够空房的酒店及剩余房间数
+    无论匹配多少家酒店，都只执行两次查询（酒店列表 + 库存聚合）
+    """
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="离店日期必须晚于入住日期")
+    
+    query = db.query(Hotel).filter(Hotel.city_id == city_id)
+    query, id_filter = apply_hotel_filters(
+        query,
+        min_price=min_price,
+        max_price=max_price,
+        tags=tag,
+        facilities=facility,
+        match=match,
+        star_level=star_level,
+        min_rating=min_rating
+    )
+    hotels = query.options(joinedload(Hotel.city)).order_by(Hotel.is_recommended.desc(), Hotel.rating.desc()).all()
+    if id_filter is not None:
+        hotels = [hotel for hotel in hotels if hotel.id in id_filter]
+    
+    # 库存按同一筛选条件的子查询过滤，不绑定酒店ID列表
+    remaining_by_hotel = get_remaining_rooms_by_hotel(
+        db, hotels, check_in, check_out, query.with_entities(Hotel.id).scalar_subquery()
+    )
+    
+    available_hotels = []
+    for hotel in hotels:
+        remaining = remaining_by_hotel.get(hotel.id, 0)
+        if remaining >= rooms:
+            hotel.remaining_rooms = remaining
+            available_hotels.append(hotel)
+    
+    return available_hotels
+
+@router.get("/nearby", response_model=List[HotelNearbyResponse], summary="查询附近酒店")
+def get_nearby_hotels(
+    lat: float = Query(..., ge=-90, le=90, description="纬度"),
+    lng: float = Query(..., ge=-180, le=180, description="经度"),
+    radius_km: float = Query(5, gt=0, le=100, description="搜索半径（公里）"),
+    limit: int = Query(20, ge=1, le=100, description="返回记录数"),
+    min_price: Optional[float] = Query(None, ge=0, description="最低价格"),
+    max_price: Optional[float] = Query(None, ge=0, description="最高价格"),
+    tag: Optional[List[str]] = Query(None, description="标签筛选（可传多个）"),
+    facility: Optional[List[str]] = Query(None, description="设施筛选（可传多个）"),
+    match: str = Query("all", pattern="^(all|any)$", description="多个标签/设施的匹配方式：all-全部满足，any-满足任一"),
+    star_level: Optional[int] = Query(None, ge=1, le=5, description="星级筛选"),
+    min_rating: Optional[float] = Query(None, ge=0, le=5, description="最低评分"),
+    db: Session = Depends(get_db)
+):
+    """
+    按距离由近到远返回半径范围内的酒店
+    通过网格索引只检查覆盖范围内的候选酒店，再与价格、星级、评分等条件组合筛选
+    """
+    hotel_geo_index.ensure_built(db)
+    candidates = hotel_geo_index.query(lat, lng, radius_km)
+    if not candidates:
+        return []
+    
+    distances = dict(candidates)
+    hotels = []
+    # 候选酒店已按距离排序，由近到远分批查询，凑满 limit 家即停止（每批的ID数不超过 SQL IN 的上限）
+    for start in range(0, len(candidates), MAX_SQL_ID_FILTER):
+        query, _ = apply_hotel_filters(
+            db.query(Hotel).options(joinedload(Hotel.city)),
+            min_price=min_price,
+            max_price=max_price,
+            tags=tag,
+            facilities=facility,
+            match=match,
+            star_level=star_level,
+            min_rating=min_rating,
+            hotel_ids={hotel_id for hotel_id, _ in candidates[start:start + MAX_SQL_ID_FILTER]}
+        )
+        hotels.extend(query.all())
+        if len(hotels) >= limit:
+            break
+    hotels = sorted(hotels, key=lambda hotel: (distances[hotel.id], hotel.id))[:limit]
     
-    # 加载城市信息
     for hotel in hotels:
-        if hotel.city_id:
-            hotel.city = db.query(City).filter(City.id == hotel.city_id).first()
+        hotel.distance_km = round(distances[hotel.id], 3)
     
     return hotels
 
@@ -72,19 +424,19 @@ def get_hotel(hotel_id: int, db: Session = Depends(get_db)):
     """
     根据ID获取酒店详情
     """
-    hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
-    if not hotel:
-        raise HTTPException(status_code=404, detail="酒店不存在")
-    
-    # 增加浏览次数
-    hotel.view_count = (hotel.view_count or 0) + 1
-    db.commit()
+    cache_key = ("detail", hotel_id)
+    body = hotel_response_cache.get(cache_key)
+    if body is MISSING:
+        hotel = db.query(Hotel).options(joinedload(Hotel.city)).filter(Hotel.id == hotel_id).first()
+        if not hotel:
+            raise HTTPException(status_code=404, detail="酒店不存在")
+        body = _serialize_hotel(hotel)
+        hotel_response_cache.set(cache_key, body, tags=[("hotel", hotel_id)])
     
-    # 加载城市信息
-    if hotel.city_id:
-        hotel.city = db.query(City).filter(City.id == hotel.city_id).first()
+    # 增加浏览次数（先记入内存缓冲，由定时任务批量写回，详情查询本身只读）
+    hotel_view_counter.increment(hotel_id)
     
-    return hotel
+    return JSONResponse(content=body)
 
 @router.post("/", response_model=HotelResponseUpdated, summary="创建酒店")
 def create_hotel(hotel: HotelCreate, db: Session = Depends(get_db)):
@@ -100,6 +452,10 @@ def create_hotel(hotel: HotelCreate, db: Session = Depends(get_db)):
     db.add(db_hotel)
     db.commit()
     db.refresh(db_hotel)
+    
+    # 增量更新搜索、标签和位置索引，并使缓存失效
+    _sync_hotel_indexes(db_hotel)
+    invalidate_hotel_cache(db_hotel.id, lists=True)
     return db_hotel
 
 @router.put("/{hotel_id}", response_model=HotelResponseUpdated, summary="更新酒店信息")
@@ -116,8 +472,15 @@ def update_hotel(hotel_id: int, hotel_update: HotelUpdate, db: Session = Depends
     for field, value in update_data.items():
         setattr(db_hotel, field, value)
     
+    # 基础价格变化时递增版本号，各进程的缓存报价随之失效
+    if "base_price" in update_data:
+        bump_version(db, BASE_PRICES_VERSION)
     db.commit()
     db.refresh(db_hotel)
+    
+    # 增量更新搜索、标签和位置索引，并使缓存失效
+    _sync_hotel_indexes(db_hotel)
+    invalidate_hotel_cache(db_hotel.id, lists=True)
     return db_hotel
 
 @router.delete("/{hotel_id}", summary="删除酒店")
@@ -130,21 +493,26 @@ def delete_hotel(hotel_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="酒店不存在")
     
     db.delete(db_hotel)
+    bump_version(db, BASE_PRICES_VERSION)
     db.commit()
+    
+    # 从搜索、标签和位置索引中移除，并使缓存失效
+    _remove_from_hotel_indexes(hotel_id)
+    invalidate_hotel_cache(hotel_id, lists=True)
     return {"message": "酒店删除成功"}
 
 @router.get("/{hotel_id}/tags", summary="获取酒店标签列表")
 def get_hotel_tags(hotel_id: int, db: Session = Depends(get_db)):
     """
-    获取酒店标签列表（解析JSON）
+    获取酒店标签列表（从标签索引读取已解析的结果）
     """
-    hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
-    if not hotel:
-        raise HTTPException(status_code=404, detail="酒店不存在")
-    
-    try:
-        tags = json.loads(hotel.tags) if hotel.tags else []
-    except:
-        tags = []
+    hotel_tag_index.ensure_built(db)
+    tags = hotel_tag_index.get_tags(hotel_id)
+    if tags is None:
+        # 索引中没有时（如其他进程刚创建的酒店）回退到数据库
+        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+        if not hotel:
+            raise HTTPException(status_code=404, detail="酒店不存在")
+        tags = parse_json_list(hotel.tags)
     
     return {"tags": tags}
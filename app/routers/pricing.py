@@ -1,130 +1,113 @@
 # 价格管理和促销策略路由
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
-from typing import List, Dict
-from datetime import date, datetime
+from typing import List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from app.database import get_db
-from app.models import PriceRule, Hotel, Booking, User, PriceRuleType, Holiday
-from app.schemas import PriceRuleCreate, PriceRuleUpdate, PriceRuleResponse, PriceCalculationRequest, PriceCalculationResponse
+from app.models import PriceRule, Hotel, Booking, User, PriceRuleType, RoomType
+from app.schemas import (
+    PriceRuleCreate, PriceRuleUpdate, PriceRuleResponse, PriceCalculationRequest, PriceCalculationResponse,
+    PriceCalendarResponse, PriceQuoteItem, BatchPriceRequest, BatchPriceQuote, BatchPriceResponse
+)
 from app.auth import get_current_user_optional
+from app.cache import MISSING
+from app.holiday_calendar import get_holiday_calendar, holiday_cache
+from app.pricing_engine import (
+    PRICE_RULES_VERSION, get_hotel_rules, quote_nights, rule_cache, price_quote_cache, base_price_version
+)
+from app.versions import bump_version
 
 router = APIRouter(prefix="/api/pricing", tags=["价格管理"])
 
+def get_holiday_dates(db: Session, start_date: date, end_date: date) -> List[date]:
+    """获取 [start_date, end_date) 区间内的节假日日期（来自内存中的节假日日历）"""
+    return get_holiday_calendar(db).holidays_between(start_date, end_date)
+
+def get_user_segment(db: Session, user_id: int = None, user: User = None) -> Tuple[bool, Optional[str]]:
+    """
+    获取影响报价的用户分群：(是否新用户, 会员等级)
+    已加载用户对象时直接读取，否则按 user_id 查询一次
+    """
+    if user is None and user_id:
+        user = db.query(User.booking_count, User.vip_level).filter(User.id == user_id).first()
+    if user is None:
+        return False, None
+    return not user.booking_count, user.vip_level
+
 def calculate_price(
     hotel_id: int,
     check_in_date: date,
     check_out_date: date,
     user_id: int = None,
-    db: Session = None
+    db: Session = None,
+    room_type_id: int = None,
+    user: User = None
 ) -> Dict:
     """
-    计算预订价格（考虑所有价格规则）
+    计算预订价格（考虑所有价格规则，逐晚计算）
+    指定 room_type_id 时按房型基础价格计算；相同输入的报价从报价缓存中直接返回，
+    缓存键包含规则、节假日和基础价格的版本号，价格数据修改后不会返回旧报价
     返回: {
         "base_price": 基础价格,
-        "discount_rate": 总折扣率,
-        "final_price": 最终价格,
+        "discount_rate": 平均每晚折扣率,
+        "final_price": 平均每晚价格,
+        "total_price": 整段入住的总价（单间）,
+        "nightly_prices": 每晚的日期、折扣率和价格,
         "applied_rules": 应用的规则列表
     }
     """
-    # 获取酒店基础价格
-    hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
-    if not hotel:
-        raise HTTPException(status_code=404, detail="酒店不存在")
+    new_user, vip_level = get_user_segment(db, user_id, user)
+    
+    # 先确保规则、节假日和基础价格是最新版本，再用版本号组成缓存键
+    rule_book = rule_cache.get(db)
+    holiday_calendar = get_holiday_calendar(db)
+    base_price_version.get(db)
+    cache_key = (
+        hotel_id, room_type_id, check_in_date, check_out_date, new_user, vip_level,
+        rule_cache.version, holiday_cache.version, base_price_version.version
+    )
+    cached = price_quote_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+    
+    # 获取酒店（或房型）基础价格
+    if room_type_id:
+        base_price = db.query(RoomType.base_price).filter(
+            RoomType.id == room_type_id,
+            RoomType.hotel_id == hotel_id
+        ).scalar()
+        if base_price is None:
+            raise HTTPException(status_code=404, detail="房型不存在")
+    else:
+        base_price = db.query(Hotel.base_price).filter(Hotel.id == hotel_id).scalar()
+        if base_price is None:
+            raise HTTPException(status_code=404, detail="酒店不存在")
     
-    base_price = float(hotel.base_price)
     nights = (check_out_date - check_in_date).days
-    total_discount = 0.0
-    applied_rules = []
-    
-    # 获取所有启用的价格规则
-    rules = db.query(PriceRule).filter(
-        PriceRule.is_active == True,
-        or_(
-            PriceRule.hotel_id == hotel_id,
-            PriceRule.hotel_id.is_(None)
-        )
-    ).all()
-    
-    # 检查节假日
-    holidays = db.query(Holiday).filter(
-        Holiday.holiday_date >= check_in_date,
-        Holiday.holiday_date < check_out_date
-    ).all()
-    is_holiday_period = len(holidays) > 0
-    
-    # 检查是否为新用户
-    is_new_user = False
-    if user_id:
-        user_bookings = db.query(Booking).filter(Booking.user_id == user_id).count()
-        is_new_user = user_bookings == 0
-    
-    # 应用各种规则
-    for rule in rules:
-        rule_applied = False
-        
-        # 将 rule_type 转换为字符串进行比较（兼容数据库中的字符串值）
-        # 如果 rule_type 是枚举对象，获取其值；如果是字符串，直接使用
-        if isinstance(rule.rule_type, str):
-            rule_type_str = rule.rule_type
-        elif hasattr(rule.rule_type, 'value'):
-            rule_type_str = rule.rule_type.value
-        else:
-            rule_type_str = str(rule.rule_type).lower()
-        
-        if rule_type_str == "weekend":
-            # 周末规则：检查入住日期和离店日期是否包含周末
-            check_in_weekday = check_in_date.weekday() + 1  # 1=周一, 7=周日
-            if rule.day_of_week and check_in_weekday == rule.day_of_week:
-                total_discount += float(rule.discount_rate)
-                applied_rules.append(rule.rule_name)
-                rule_applied = True
-            elif not rule.day_of_week and check_in_weekday >= 5:  # 周六或周日
-                total_discount += float(rule.discount_rate)
-                applied_rules.append(rule.rule_name)
-                rule_applied = True
-        
-        elif rule_type_str == "holiday":
-            # 节假日规则
-            if is_holiday_period:
-                total_discount += float(rule.discount_rate)
-                applied_rules.append(rule.rule_name)
-                rule_applied = True
-        
-        elif rule_type_str == "season":
-            # 季节性规则
-            if rule.start_date and rule.end_date:
-                if rule.start_date <= check_in_date <= rule.end_date:
-                    total_discount += float(rule.discount_rate)
-                    applied_rules.append(rule.rule_name)
-                    rule_applied = True
-        
-        elif rule_type_str == "new_user":
-            # 新用户规则
-            if is_new_user:
-                total_discount += float(rule.discount_rate)
-                applied_rules.append(rule.rule_name)
-                rule_applied = True
-        
-        elif rule_type_str == "long_stay":
-            # 连住优惠
-            if rule.min_nights and nights >= rule.min_nights:
-                total_discount += float(rule.discount_rate)
-                applied_rules.append(rule.rule_name)
-                rule_applied = True
-    
-    # 计算最终价格（折扣率可以是负数表示涨价）
-    final_price = base_price * (1 - total_discount / 100.0)
-    if final_price < 0:
-        final_price = 0
-    
-    return {
-        "base_price": Decimal(str(base_price)),
-        "discount_rate": Decimal(str(total_discount)),
-        "final_price": Decimal(str(final_price)),
-        "applied_rules": applied_rules
+    
+    # 逐晚应用各种规则（规则和节假日都在内存中，不查询数据库）
+    quote = quote_nights(
+        rule_book.for_hotel(hotel_id),
+        float(base_price),
+        check_in_date,
+        nights,
+        holiday_calendar.holidays_between(check_in_date, check_out_date),
+        new_user
+    )
+    
+    result = {
+        "base_price": Decimal(str(quote.base_price)),
+        "discount_rate": Decimal(str(quote.average_discount)),
+        "final_price": Decimal(str(quote.average_price)),
+        "total_price": Decimal(str(quote.total_price)),
+        "nightly_prices": quote.nightly(),
+        "applied_rules": quote.applied_rules
     }
+    price_quote_cache.set(cache_key, result, tags=[("hotel", hotel_id)])
+    return result
 
 @router.post("/calculate", response_model=PriceCalculationResponse, summary="计算预订价格")
 def calculate_booking_price(
@@ -143,10 +126,126 @@ def calculate_booking_price(
         check_in_date=request.check_in_date,
         check_out_date=request.check_out_date,
         user_id=user_id,
-        db=db
+        db=db,
+        room_type_id=request.room_type_id,
+        user=current_user
     )
     return PriceCalculationResponse(**result)
 
+# 批量报价单次最多的报价数
+BATCH_QUOTE_MAX_ITEMS = 100
+
+@router.post("/batch", response_model=BatchPriceResponse, summary="批量计算价格")
+def calculate_batch_prices(
+    request: BatchPriceRequest,
+    current_user: User = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    同一日期区间内批量计算多个酒店（或酒店房型）的价格，用于搜索结果页
+    酒店、房型各一次查询，节假日和新用户判断只做一次，价格规则来自内存
+    """
+    if request.check_out_date <= request.check_in_date:
+        raise HTTPException(status_code=400, detail="离店日期必须晚于入住日期")
+    
+    items = [PriceQuoteItem(hotel_id=hotel_id) for hotel_id in request.hotel_ids] + list(request.items)
+    if len(items) > BATCH_QUOTE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"单次最多计算{BATCH_QUOTE_MAX_ITEMS}个价格")
+    
+    hotel_ids = {item.hotel_id for item in items}
+    room_type_ids = {item.room_type_id for item in items if item.room_type_id}
+    base_prices = dict(
+        db.query(Hotel.id, Hotel.base_price).filter(Hotel.id.in_(hotel_ids)).all()
+    ) if hotel_ids else {}
+    room_types = {
+        row.id: row for row in db.query(RoomType.id, RoomType.hotel_id, RoomType.base_price)
+        .filter(RoomType.id.in_(room_type_ids)).all()
+    } if room_type_ids else {}
+    
+    nights = (request.check_out_date - request.check_in_date).days
+    holidays = get_holiday_dates(db, request.check_in_date, request.check_out_date)
+    # 用户分群对所有报价相同，循环前取一次（已登录时直接读取用户对象，不再查询）
+    user_id = current_user.id if current_user else request.user_id
+    new_user, _ = get_user_segment(db, user_id, current_user)
+    
+    quotes = []
+    for item in items:
+        if item.hotel_id not in base_prices:
+            quotes.append(BatchPriceQuote(hotel_id=item.hotel_id, room_type_id=item.room_type_id, error="酒店不存在"))
+            continue
+        base_price = base_prices[item.hotel_id]
+        if item.room_type_id:
+            room_type = room_types.get(item.room_type_id)
+            if not room_type or room_type.hotel_id != item.hotel_id:
+                quotes.append(BatchPriceQuote(hotel_id=item.hotel_id, room_type_id=item.room_type_id, error="房型不存在"))
+                continue
+            base_price = room_type.base_price
+        
+        quote = quote_nights(
+            get_hotel_rules(db, item.hotel_id),
+            float(base_price),
+            request.check_in_date,
+            nights,
+            holidays,
+            new_user
+        )
+        quotes.append(BatchPriceQuote(
+            hotel_id=item.hotel_id,
+            room_type_id=item.room_type_id,
+            base_price=Decimal(str(quote.base_price)),
+            discount_rate=Decimal(str(quote.average_discount)),
+            final_price=Decimal(str(quote.average_price)),
+            total_price=Decimal(str(quote.total_price)),
+            applied_rules=quote.applied_rules
+        ))
+    
+    return BatchPriceResponse(
+        check_in_date=request.check_in_date,
+        check_out_date=request.check_out_date,
+        nights=nights,
+        quotes=quotes
+    )
+
+@router.get("/calendar", response_model=PriceCalendarResponse, summary="获取酒店价格日历")
+def get_price_calendar(
+    hotel_id: int,
+    from_date: date = Query(None, alias="from", description="开始日期，默认今天"),
+    days: int = Query(90, ge=1, le=365, description="天数"),
+    current_user: User = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    获取酒店从指定日期开始每晚的价格（用于日期选择器）
+    每晚按单晚入住计算，不含连住优惠
+    """
+    hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+    if not hotel:
+        raise HTTPException(status_code=404, detail="酒店不存在")
+    
+    start_date = from_date or date.today()
+    end_date = start_date + timedelta(days=days)
+    quote = quote_nights(
+        get_hotel_rules(db, hotel_id),
+        float(hotel.base_price),
+        start_date,
+        days,
+        get_holiday_dates(db, start_date, end_date),
+        get_user_segment(db, user=current_user)[0],
+        stay_nights=1
+    )
+    
+    # 直接返回JSON，跳过逐项的响应模型校验（365天时校验耗时远超价格计算本身）
+    prices = quote.nightly()
+    for item in prices:
+        item["date"] = item["date"].isoformat()
+    return JSONResponse({
+        "hotel_id": hotel_id,
+        "base_price": str(hotel.base_price),
+        "from_date": start_date.isoformat(),
+        "days": days,
+        "prices": prices
+    })
+
 @router.get("/rules", response_model=List[PriceRuleResponse], summary="获取价格规则列表")
 def get_price_rules(
     hotel_id: int = None,
@@ -179,7 +278,9 @@ def create_price_rule(rule: PriceRuleCreate, db: Session = Depends(get_db)):
     """
     db_rule = PriceRule(**rule.dict())
     db.add(db_rule)
+    bump_version(db, PRICE_RULES_VERSION)
     db.commit()
+    rule_cache.invalidate()
     db.refresh(db_rule)
     return db_rule
 
@@ -196,7 +297,9 @@ def update_price_rule(rule_id: int, rule_update: PriceRuleUpdate, db: Session =
     for field, value in update_data.items():
         setattr(db_rule, field, value)
     
+    bump_version(db, PRICE_RULES_VERSION)
     db.commit()
+    rule_cache.invalidate()
     db.refresh(db_rule)
     return db_rule
 
@@ -210,5 +313,7 @@ def delete_price_rule(rule_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="价格规则不存在")
     
     db.delete(db_rule)
+    bump_version(db, PRICE_RULES_VERSION)
     db.commit()
+    rule_cache.invalidate()
     return {"message": "价格规则删除成功"}
@@ -1,20 +1,24 @@
 # 评论相关路由
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
 from app.models import Review, Hotel, User, Booking
 from app.schemas import ReviewCreate, ReviewResponse
 from app.auth import get_current_user_optional
+from app.pagination import keyset_paginate
+from app.routers.hotels import invalidate_hotel_cache
 
 router = APIRouter(prefix="/api/reviews", tags=["评论管理"])
 
 @router.get("/", response_model=List[ReviewResponse], summary="获取评论列表")
 def get_reviews(
+    response: Response,
     hotel_id: Optional[int] = Query(None, description="酒店ID"),
     user_id: Optional[int] = Query(None, description="用户ID"),
     status: Optional[str] = Query(None, description="审核状态"),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过记录数（已弃用，请使用cursor）"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
     limit: int = Query(100, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
@@ -30,7 +34,14 @@ def get_reviews(
     if status:
         query = query.filter(Review.status == status)
     
-    reviews = query.order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+    reviews = keyset_paginate(
+        query,
+        keys=[(Review.created_at, True), (Review.id, True)],
+        response=response,
+        limit=limit,
+        cursor=cursor,
+        skip=skip
+    )
     return reviews
 
 @router.get("/hotel/{hotel_id}", response_model=List[ReviewResponse], summary="获取酒店的评论列表")
@@ -105,6 +116,9 @@ def create_review(
     
     db.commit()
     db.refresh(db_review)
+    
+    # 评论数（及评分）已变化，按评分筛选、排序的列表页也可能变化，一并失效
+    invalidate_hotel_cache(hotel.id, lists=True)
     return db_review
 
 @router.get("/{review_id}", response_model=ReviewResponse, summary="获取评论详情")
@@ -1,10 +1,18 @@
 # 房间类型相关路由
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
-from app.database import get_db
-from app.models import RoomType, Hotel
-from app.schemas import RoomTypeCreate, RoomTypeUpdate, RoomTypeResponse
+from datetime import date
+from decimal import Decimal
+from app.database import get_db, run_in_transaction
+from app.models import RoomType, Hotel, User, Booking, RoomInventory
+from app.schemas import RoomTypeCreate, RoomTypeUpdate, RoomTypeResponse, RoomTypeAvailabilityResponse
+from app.auth import get_current_user_optional
+from app.inventory import ACTIVE_BOOKING_STATUSES, get_remaining_rooms_by_room_type
+from app.pricing_engine import BASE_PRICES_VERSION, get_hotel_rules, quote_nights
+from app.routers.hotels import invalidate_hotel_cache
+from app.routers.pricing import get_holiday_dates, get_user_segment
+from app.versions import bump_version
 
 router = APIRouter(prefix="/api/room-types", tags=["房间类型管理"])
 
@@ -21,6 +29,41 @@ def get_room_types_by_hotel(hotel_id: int, db: Session = Depends(get_db)):
     room_types = db.query(RoomType).filter(RoomType.hotel_id == hotel_id).all()
     return room_types
 
+@router.get("/hotel/{hotel_id}/availability", response_model=List[RoomTypeAvailabilityResponse], summary="获取酒店各房型的价格和剩余房间")
+def get_room_type_availability(
+    hotel_id: int,
+    check_in_date: date = Query(..., description="入住日期"),
+    check_out_date: date = Query(..., description="离店日期"),
+    current_user: User = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    获取指定酒店每个房型在入住期间的价格和剩余房间数
+    房型和库存一次查询取回，价格由内存中的规则逐晚计算
+    """
+    if check_out_date <= check_in_date:
+        raise HTTPException(status_code=400, detail="离店日期必须晚于入住日期")
+    
+    rows = get_remaining_rooms_by_room_type(db, hotel_id, check_in_date, check_out_date)
+    if not rows and not db.query(Hotel.id).filter(Hotel.id == hotel_id).first():
+        raise HTTPException(status_code=404, detail="酒店不存在")
+    
+    nights = (check_out_date - check_in_date).days
+    hotel_rules = get_hotel_rules(db, hotel_id)
+    holidays = get_holiday_dates(db, check_in_date, check_out_date)
+    new_user, _ = get_user_segment(db, user=current_user)
+    
+    result = []
+    for room_type, remaining in rows:
+        quote = quote_nights(hotel_rules, float(room_type.base_price), check_in_date, nights, holidays, new_user)
+        room_type.remaining_count = max(remaining, 0)
+        room_type.discount_rate = Decimal(str(quote.average_discount))
+        room_type.final_price = Decimal(str(quote.average_price))
+        room_type.total_price = Decimal(str(quote.total_price))
+        room_type.applied_rules = quote.applied_rules
+        result.append(room_type)
+    return result
+
 @router.get("/{room_type_id}", response_model=RoomTypeResponse, summary="获取房间类型详情")
 def get_room_type(room_type_id: int, db: Session = Depends(get_db)):
     """
@@ -45,6 +88,8 @@ def create_room_type(room_type: RoomTypeCreate, db: Session = Depends(get_db)):
     db.add(db_room_type)
     db.commit()
     db.refresh(db_room_type)
+    
+    invalidate_hotel_cache(db_room_type.hotel_id)
     return db_room_type
 
 @router.put("/{room_type_id}", response_model=RoomTypeResponse, summary="更新房间类型")
@@ -60,19 +105,45 @@ def update_room_type(room_type_id: int, room_type_update: RoomTypeUpdate, db: Se
     for field, value in update_data.items():
         setattr(db_room_type, field, value)
     
+    # 基础价格变化时递增版本号，各进程的缓存报价随之失效
+    if "base_price" in update_data:
+        bump_version(db, BASE_PRICES_VERSION)
     db.commit()
     db.refresh(db_room_type)
+    
+    invalidate_hotel_cache(db_room_type.hotel_id)
     return db_room_type
 
 @router.delete("/{room_type_id}", summary="删除房间类型")
 def delete_room_type(room_type_id: int, db: Session = Depends(get_db)):
     """
     删除房间类型（管理员功能）
+    存在有效预订时拒绝删除：预订的房型会被置空，之后取消时会从“未指定房型”的台账释放库存
     """
-    db_room_type = db.query(RoomType).filter(RoomType.id == room_type_id).first()
-    if not db_room_type:
-        raise HTTPException(status_code=404, detail="房间类型不存在")
+    def delete():
+        # 锁定房型行，并发创建的预订（外键检查）需等待本事务结束
+        db_room_type = db.query(RoomType).filter(RoomType.id == room_type_id).with_for_update().first()
+        if not db_room_type:
+            raise HTTPException(status_code=404, detail="房间类型不存在")
+        
+        active_booking = db.query(Booking.id).filter(
+            Booking.room_type_id == room_type_id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).first()
+        if active_booking:
+            raise HTTPException(status_code=400, detail="该房间类型存在有效预订，不能删除")
+        
+        # 房型的库存台账行随房型一起删除
+        db.query(RoomInventory).filter(
+            RoomInventory.hotel_id == db_room_type.hotel_id,
+            RoomInventory.room_type_id == room_type_id
+        ).delete(synchronize_session=False)
+        hotel_id = db_room_type.hotel_id
+        db.delete(db_room_type)
+        bump_version(db, BASE_PRICES_VERSION)
+        return hotel_id
     
-    db.delete(db_room_type)
-    db.commit()
+    hotel_id = run_in_transaction(db, delete)
+    
+    invalidate_hotel_cache(hotel_id)
     return {"message": "房间类型删除成功"}
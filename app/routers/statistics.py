@@ -1,13 +1,16 @@
 # 统计分析路由
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_
+from sqlalchemy import func, extract, and_, case, or_
 from typing import List, Dict
 from datetime import date, datetime, timedelta
 from decimal import Decimal
+from collections import Counter
 from app.database import get_db
-from app.models import Booking, Hotel, User, BookingStatus
+from app.models import Hotel, User, BookingStatus
 from app.schemas import StatisticsResponse
+from app.cache import get_cache_stats
+from app.booking_archive import booking_tables_for_range
 import pandas as pd
 
 router = APIRouter(prefix="/api/statistics", tags=["统计分析"])
@@ -20,32 +23,38 @@ def get_statistics_overview(
     db: Session = Depends(get_db)
 ):
     """
-    获取预订统计概览
+    获取预订统计概览（日期范围涉及已归档的预订时同时统计归档表，每张表分别聚合后相加）
     """
-    query = db.query(Booking)
-    
-    if start_date:
-        query = query.filter(Booking.check_in_date >= start_date)
-    if end_date:
-        query = query.filter(Booking.check_in_date <= end_date)
-    if hotel_id:
-        query = query.filter(Booking.hotel_id == hotel_id)
-    
-    # 总预订数
-    total_bookings = query.count()
-    
-    # 总营收
-    total_revenue = query.filter(
-        Booking.status.in_(["confirmed", "completed"])
-    ).with_entities(func.sum(Booking.final_price)).scalar() or Decimal(0)
-    
-    # 按状态统计
-    bookings_by_status = db.query(
-        Booking.status,
-        func.count(Booking.id).label('count')
-    ).group_by(Booking.status).all()
-    
-    status_stats = [{"status": status, "count": count} for status, count in bookings_by_status]
+    total_bookings = 0
+    total_revenue = Decimal(0)
+    for table in booking_tables_for_range(db, start_date):
+        query = db.query(table)
+        
+        if start_date:
+            query = query.filter(table.check_in_date >= start_date)
+        if end_date:
+            query = query.filter(table.check_in_date <= end_date)
+        if hotel_id:
+            query = query.filter(table.hotel_id == hotel_id)
+        
+        # 总预订数
+        total_bookings += query.count()
+        
+        # 总营收
+        total_revenue += query.filter(
+            table.status.in_(["confirmed", "completed"])
+        ).with_entities(func.sum(table.final_price)).scalar() or Decimal(0)
+    
+    # 按状态统计（不限日期，包含已归档的预订）
+    status_counts = Counter()
+    for table in booking_tables_for_range(db):
+        for status, count in db.query(
+            table.status,
+            func.count(table.id).label('count')
+        ).group_by(table.status):
+            status_counts[status] += count
+    
+    status_stats = [{"status": status, "count": count} for status, count in status_counts.items()]
     
     return {
         "total_bookings": total_bookings,
@@ -64,15 +73,17 @@ def get_statistics_by_date(
     """
     按日期统计预订量（用于生成趋势图）
     """
-    query = db.query(Booking).filter(
-        Booking.check_in_date >= start_date,
-        Booking.check_in_date <= end_date
-    )
-    
-    if hotel_id:
-        query = query.filter(Booking.hotel_id == hotel_id)
-    
-    bookings = query.all()
+    bookings = []
+    for table in booking_tables_for_range(db, start_date):
+        query = db.query(table).filter(
+            table.check_in_date >= start_date,
+            table.check_in_date <= end_date
+        )
+        
+        if hotel_id:
+            query = query.filter(table.hotel_id == hotel_id)
+        
+        bookings.extend(query.all())
     
     if not bookings:
         return {"dates": [], "counts": [], "revenues": []}
@@ -113,31 +124,35 @@ def get_statistics_by_hotel(
 ):
     """
     按酒店统计预订量和营收
+    每张预订表分别按酒店聚合，合并后取前N个酒店
     """
-    query = db.query(
-        Hotel.id,
-        Hotel.name,
-        func.count(Booking.id).label('booking_count'),
-        func.sum(Booking.final_price).label('total_revenue')
-    ).join(Booking, Hotel.id == Booking.hotel_id)
-    
-    if start_date:
-        query = query.filter(Booking.check_in_date >= start_date)
-    if end_date:
-        query = query.filter(Booking.check_in_date <= end_date)
-    
-    query = query.filter(
-        Booking.status.in_(["confirmed", "completed"])
-    ).group_by(Hotel.id, Hotel.name).order_by(func.count(Booking.id).desc()).limit(limit)
+    booking_counts = Counter()
+    revenues = Counter()
+    for table in booking_tables_for_range(db, start_date):
+        query = db.query(
+            table.hotel_id,
+            func.count(table.id).label('booking_count'),
+            func.sum(table.final_price).label('total_revenue')
+        ).filter(table.status.in_(["confirmed", "completed"]))
+        
+        if start_date:
+            query = query.filter(table.check_in_date >= start_date)
+        if end_date:
+            query = query.filter(table.check_in_date <= end_date)
+        
+        for r in query.group_by(table.hotel_id):
+            booking_counts[r.hotel_id] += r.booking_count
+            revenues[r.hotel_id] += r.total_revenue or Decimal(0)
     
-    results = query.all()
+    top_hotel_ids = sorted(booking_counts, key=lambda hotel_id: (-booking_counts[hotel_id], hotel_id))[:limit]
+    hotel_names = dict(db.query(Hotel.id, Hotel.name).filter(Hotel.id.in_(top_hotel_ids)).all()) if top_hotel_ids else {}
     
     return [{
-        "hotel_id": r.id,
-        "hotel_name": r.name,
-        "booking_count": r.booking_count,
-        "total_revenue": float(r.total_revenue or 0)
-    } for r in results]
+        "hotel_id": hotel_id,
+        "hotel_name": hotel_names[hotel_id],
+        "booking_count": booking_counts[hotel_id],
+        "total_revenue": float(revenues[hotel_id])
+    } for hotel_id in top_hotel_ids if hotel_id in hotel_names]
 
 @router.get("/by-user-type", summary="按用户类型统计")
 def get_statistics_by_user_type(
@@ -147,49 +162,42 @@ def get_statistics_by_user_type(
 ):
     """
     按用户类型统计（新用户 vs 老用户）
+    入住日期与用户首次预订日期相同的预订计为新用户预订；
+    首次预订时间取自用户表冗余字段，每张预订表一次聚合查询
     """
-    query = db.query(Booking).filter(
-        Booking.status.in_(["confirmed", "completed"])
-    )
-    
-    if start_date:
-        query = query.filter(Booking.check_in_date >= start_date)
-    if end_date:
-        query = query.filter(Booking.check_in_date <= end_date)
-    
-    bookings = query.all()
-    
-    # 判断每个用户是否为新用户
     new_user_count = 0
     old_user_count = 0
     new_user_revenue = Decimal(0)
     old_user_revenue = Decimal(0)
     
-    user_first_booking = {}
-    
-    for booking in bookings:
-        user_id = booking.user_id
-        booking_date = booking.check_in_date
+    for table in booking_tables_for_range(db, start_date):
+        is_new_user = case(
+            (or_(
+                User.first_booking_at.is_(None),
+                func.date(User.first_booking_at) == table.check_in_date
+            ), 1),
+            else_=0
+        )
+        query = db.query(
+            is_new_user.label("is_new_user"),
+            func.count(table.id).label("booking_count"),
+            func.sum(table.final_price).label("revenue")
+        ).select_from(table).join(User, User.id == table.user_id).filter(
+            table.status.in_(["confirmed", "completed"])
+        )
         
-        if user_id not in user_first_booking:
-            # 查找该用户的首次预订
-            first_booking = db.query(Booking).filter(
-                Booking.user_id == user_id
-            ).order_by(Booking.booking_time.asc()).first()
-            
-            if first_booking:
-                user_first_booking[user_id] = first_booking.booking_time.date()
-            else:
-                user_first_booking[user_id] = booking_date
-        
-        is_new_user = user_first_booking[user_id] == booking_date
+        if start_date:
+            query = query.filter(table.check_in_date >= start_date)
+        if end_date:
+            query = query.filter(table.check_in_date <= end_date)
         
-        if is_new_user:
-            new_user_count += 1
-            new_user_revenue += booking.final_price
-        else:
-            old_user_count += 1
-            old_user_revenue += booking.final_price
+        for row in query.group_by(is_new_user).all():
+            if row.is_new_user:
+                new_user_count += row.booking_count
+                new_user_revenue += row.revenue or Decimal(0)
+            else:
+                old_user_count += row.booking_count
+                old_user_revenue += row.revenue or Decimal(0)
     
     return {
         "new_users": {
@@ -201,3 +209,10 @@ def get_statistics_by_user_type(
             "revenue": float(old_user_revenue)
         }
     }
+
+@router.get("/cache", summary="获取缓存命中统计")
+def get_cache_statistics():
+    """
+    获取各进程内缓存的容量、命中率和淘汰次数（仅统计当前进程）
+    """
+    return {"caches": get_cache_stats()}
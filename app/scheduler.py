@@ -0,0 +1,67 @@
+# 进程内定时任务调度
+# 每个任务在独立的后台线程中按固定间隔执行，应用启动时开始、关闭时停止
+import logging
+import threading
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """按固定间隔重复执行的后台任务"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], object]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"task-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """执行一次任务，异常只记录日志，不中断调度"""
+        try:
+            self.func()
+        except Exception:
+            logger.exception("定时任务 %s 执行失败", self.name)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            self.run_once()
+
+class Scheduler:
+    """管理一组定时任务"""
+
+    def __init__(self):
+        self._tasks: Dict[str, PeriodicTask] = {}
+        self._running = False
+
+    def add(self, name: str, interval_seconds: float, func: Callable[[], object]):
+        """注册任务；调度器已启动时立即开始执行"""
+        task = PeriodicTask(name, interval_seconds, func)
+        self._tasks[name] = task
+        if self._running:
+            task.start()
+
+    def start(self):
+        self._running = True
+        for task in self._tasks.values():
+            task.start()
+
+    def stop(self):
+        self._running = False
+        for task in self._tasks.values():
+            task.stop()
+
+# 全局调度器实例
+scheduler = Scheduler()
@@ -1,7 +1,7 @@
 # Pydantic模式定义（用于请求和响应验证）
 from __future__ import annotations
 from pydantic import BaseModel, Field, field_serializer
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import date, datetime, time
 from decimal import Decimal
 
@@ -37,7 +37,7 @@ class HotelBase(BaseModel):
     base_price: Decimal = Field(..., ge=0, description="基础价格")
     nearby_attractions: Optional[str] = None  # JSON字符串
     images: Optional[str] = None  # JSON字符串
-    rating: Optional[Decimal] = Field(default=0.00, ge=0, le=5)
+    rating: Decimal = Field(default=0.00, ge=0, le=5)
     total_rooms: Optional[int] = Field(default=0, ge=0)
     available_rooms: Optional[int] = Field(default=0, ge=0)
 
@@ -68,6 +68,7 @@ class HotelResponse(HotelBase):
 
 class BookingBase(BaseModel):
     hotel_id: int = Field(..., description="酒店ID")
+    room_type_id: Optional[int] = Field(None, description="房间类型ID（不指定时按酒店整体库存和基础价格）")
     check_in_date: date = Field(..., description="入住日期")
     check_out_date: date = Field(..., description="离店日期")
     room_count: int = Field(default=1, ge=1, description="房间数量")
@@ -146,6 +147,28 @@ class PriceRuleResponse(PriceRuleBase):
     class Config:
         from_attributes = True
 
+# ========== 节假日相关模式 ==========
+
+class HolidayBase(BaseModel):
+    holiday_name: str = Field(..., max_length=100, description="节假日名称")
+    holiday_date: date
+    is_national: bool = True
+
+class HolidayCreate(HolidayBase):
+    pass
+
+class HolidayUpdate(BaseModel):
+    holiday_name: Optional[str] = Field(None, max_length=100)
+    holiday_date: Optional[date] = None
+    is_national: Optional[bool] = None
+
+class HolidayResponse(HolidayBase):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # ========== 统计相关模式 ==========
 
 class StatisticsResponse(BaseModel):
@@ -157,16 +180,58 @@ class StatisticsResponse(BaseModel):
 
 class PriceCalculationRequest(BaseModel):
     hotel_id: int
+    room_type_id: Optional[int] = None  # 指定房型时按房型基础价格计算
     check_in_date: date
     check_out_date: date
     user_id: Optional[int] = None  # 用于判断是否为新用户
 
+class NightlyPrice(BaseModel):
+    date: date
+    discount_rate: Decimal  # 当晚的折扣率
+    price: Decimal  # 当晚价格
+
 class PriceCalculationResponse(BaseModel):
     base_price: Decimal
-    discount_rate: Decimal
-    final_price: Decimal
+    discount_rate: Decimal  # 平均每晚折扣率
+    final_price: Decimal  # 平均每晚价格
+    total_price: Decimal  # 整段入住总价（单间）
+    nightly_prices: List[NightlyPrice] = []  # 每晚价格明细
     applied_rules: List[str]  # 应用的规则名称列表
 
+class PriceQuoteItem(BaseModel):
+    hotel_id: int
+    room_type_id: Optional[int] = None  # 指定房型时按房型基础价格报价
+
+class BatchPriceRequest(BaseModel):
+    check_in_date: date
+    check_out_date: date
+    hotel_ids: List[int] = []  # 按酒店基础价格报价
+    items: List[PriceQuoteItem] = []  # 按（酒店，房型）报价
+    user_id: Optional[int] = None  # 用于判断是否为新用户
+
+class BatchPriceQuote(BaseModel):
+    hotel_id: int
+    room_type_id: Optional[int] = None
+    base_price: Optional[Decimal] = None
+    discount_rate: Optional[Decimal] = None
+    final_price: Optional[Decimal] = None  # 平均每晚价格
+    total_price: Optional[Decimal] = None  # 整段入住总价（单间）
+    applied_rules: List[str] = []
+    error: Optional[str] = None  # 酒店或房型不存在时的错误信息
+
+class BatchPriceResponse(BaseModel):
+    check_in_date: date
+    check_out_date: date
+    nights: int
+    quotes: List[BatchPriceQuote]
+
+class PriceCalendarResponse(BaseModel):
+    hotel_id: int
+    base_price: Decimal
+    from_date: date
+    days: int
+    prices: List[NightlyPrice]
+
 # ========== 城市相关模式 ==========
 
 class CityBase(BaseModel):
@@ -220,6 +285,13 @@ class RoomTypeResponse(RoomTypeBase):
     class Config:
         from_attributes = True
 
+class RoomTypeAvailabilityResponse(RoomTypeResponse):
+    remaining_count: int  # 整个入住期间都可预订的房间数
+    discount_rate: Decimal  # 平均每晚折扣率
+    final_price: Decimal  # 平均每晚价格
+    total_price: Decimal  # 整段入住总价（单间）
+    applied_rules: List[str] = []
+
 # ========== 评论相关模式 ==========
 
 class ReviewBase(BaseModel):
@@ -350,6 +422,38 @@ class HotelResponseUpdated(HotelBase):
     class Config:
         from_attributes = True
 
+class HotelAvailabilityResponse(HotelResponseUpdated):
+    remaining_rooms: int = 0  # 整个入住期间都可用的房间数
+
+class HotelNearbyResponse(HotelResponseUpdated):
+    distance_km: float  # 与查询位置的距离（公里）
+
+class FacetCount(BaseModel):
+    value: Optional[Union[int, str]] = None  # 星级或标签
+    count: int
+
+class PriceFacetCount(BaseModel):
+    label: str  # 价格区间，如 "200-400"、"1000+"
+    min: int
+    max: Optional[int] = None  # None 表示无上限
+    count: int
+
+class CityFacetCount(BaseModel):
+    city_id: int
+    name: Optional[str] = None
+    count: int
+
+class HotelFacets(BaseModel):
+    total: int  # 筛选结果总数（不受分页影响）
+    star_level: List[FacetCount]
+    price: List[PriceFacetCount]
+    city: List[CityFacetCount]
+    tag: List[FacetCount]
+
+class HotelListWithFacetsResponse(BaseModel):
+    items: List[HotelResponseUpdated]
+    facets: HotelFacets
+
 class BookingResponseUpdated(BookingBase):
     id: int
     booking_no: str
@@ -373,3 +477,16 @@ class BookingResponseUpdated(BookingBase):
     
     class Config:
         from_attributes = True
+
+class BatchBookingRequest(BaseModel):
+    items: List[BookingCreate] = Field(..., min_length=1, description="预订项（全部成功或全部失败）")
+
+class BatchBookingItemError(BaseModel):
+    index: int  # 预订项在请求中的序号（从0开始）
+    hotel_id: int
+    room_type_id: Optional[int] = None
+    error: str
+
+class BatchBookingResponse(BaseModel):
+    bookings: List[BookingResponseUpdated]
+    total_price: Decimal  # 所有预订的总价
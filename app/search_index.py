@@ -0,0 +1,166 @@
+# 酒店搜索倒排索引
+# 对酒店名称、地址、标签和城市名建立二元组（bigram）倒排索引，
+# 替代 LIKE '%关键词%' 的全表扫描，并按相关度返回排序结果
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session, joinedload
+from app.config import SEARCH_INDEX_REFRESH_SECONDS
+from app.models import Hotel
+from app.tag_index import parse_json_list
+
+# 各字段的相关度权重
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "city": 2.0,
+    "address": 1.0,
+}
+
+# 分词时作为分隔符的字符（保留中文、字母和数字）
+_SEPARATOR = re.compile(r"[^0-9a-z\u4e00-\u9fff]+")
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """
+    将文本切分为二元组集合
+    先按标点、空格分段，再在每段内取相邻两个字符，避免跨词组合
+    """
+    if not text:
+        return set()
+
+    grams = set()
+    for segment in _SEPARATOR.split(text.lower()):
+        for i in range(len(segment) - 1):
+            grams.add(segment[i:i + 2])
+    return grams
+
+def _hotel_fields(hotel: Hotel) -> Dict[str, Set[str]]:
+    """提取酒店各字段的二元组"""
+    tag_grams = set()
+    for tag in parse_json_list(hotel.tags):
+        tag_grams |= tokenize(tag)
+
+    return {
+        "name": tokenize(hotel.name),
+        "address": tokenize(hotel.address),
+        "tags": tag_grams,
+        "city": tokenize(hotel.city.name if hotel.city else None),
+    }
+
+class HotelSearchIndex:
+    """
+    进程内的酒店倒排索引
+    首次查询时从数据库构建，之后由酒店的增删改接口增量维护，
+    并按 SEARCH_INDEX_REFRESH_SECONDS 定期全量重建以同步其他进程的修改
+    """
+
+    def __init__(self, refresh_seconds: int = SEARCH_INDEX_REFRESH_SECONDS):
+        self._lock = threading.RLock()
+        self._refresh_seconds = refresh_seconds
+        self._built_at: Optional[float] = None
+        # 字段 -> 二元组 -> 酒店ID集合
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: defaultdict(set) for field in FIELD_WEIGHTS}
+        # 酒店ID -> 字段 -> 二元组集合（用于增量删除）
+        self._documents: Dict[int, Dict[str, Set[str]]] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def ensure_built(self, db: Session):
+        """索引未构建或已过期时从数据库重建"""
+        if self._built_at is None or time.monotonic() - self._built_at > self._refresh_seconds:
+            self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        """从数据库全量重建索引"""
+        hotels = db.query(Hotel).options(joinedload(Hotel.city)).all()
+        postings = {field: defaultdict(set) for field in FIELD_WEIGHTS}
+        documents = {}
+        for hotel in hotels:
+            fields = _hotel_fields(hotel)
+            documents[hotel.id] = fields
+            for field, grams in fields.items():
+                for gram in grams:
+                    postings[field][gram].add(hotel.id)
+
+        with self._lock:
+            self._postings = postings
+            self._documents = documents
+            self._built_at = time.monotonic()
+
+    def add_hotel(self, hotel: Hotel):
+        """新增或更新一家酒店的索引（索引尚未构建时忽略，首次查询时会全量构建）"""
+        if not self.is_built:
+            return
+
+        fields = _hotel_fields(hotel)
+        with self._lock:
+            self._remove(hotel.id)
+            self._documents[hotel.id] = fields
+            for field, grams in fields.items():
+                for gram in grams:
+                    self._postings[field][gram].add(hotel.id)
+
+    def remove_hotel(self, hotel_id: int):
+        """从索引中删除一家酒店"""
+        with self._lock:
+            self._remove(hotel_id)
+
+    def _remove(self, hotel_id: int):
+        fields = self._documents.pop(hotel_id, None)
+        if not fields:
+            return
+        for field, grams in fields.items():
+            field_postings = self._postings[field]
+            for gram in grams:
+                hotel_ids = field_postings.get(gram)
+                if hotel_ids is not None:
+                    hotel_ids.discard(hotel_id)
+                    if not hotel_ids:
+                        del field_postings[gram]
+
+    def search(
+        self,
+        text: str,
+        fields: Iterable[str] = tuple(FIELD_WEIGHTS),
+        limit: Optional[int] = 1000
+    ) -> Optional[List[int]]:
+        """
+        按相关度返回匹配的酒店ID列表，limit 为 None 时返回全部匹配（用作筛选条件时不能截断）
+        每个查询二元组都必须在指定字段中出现；得分为各字段权重与逆文档频率的加权和
+        查询文本不足两个字符（无法切分二元组）时返回 None，由调用方回退到 LIKE 查询
+        """
+        grams = tokenize(text)
+        if not grams:
+            return None
+
+        fields = [field for field in fields if field in FIELD_WEIGHTS]
+        with self._lock:
+            total = len(self._documents) or 1
+            scores: Dict[int, float] = defaultdict(float)
+            matched: Optional[Set[int]] = None
+
+            for gram in grams:
+                gram_hotels = set()
+                for field in fields:
+                    hotel_ids = self._postings[field].get(gram)
+                    if not hotel_ids:
+                        continue
+                    idf = math.log(1 + total / len(hotel_ids))
+                    for hotel_id in hotel_ids:
+                        scores[hotel_id] += FIELD_WEIGHTS[field] * idf
+                    gram_hotels |= hotel_ids
+
+                matched = gram_hotels if matched is None else matched & gram_hotels
+                if not matched:
+                    return []
+
+        ranked = sorted(matched, key=lambda hotel_id: (-scores[hotel_id], hotel_id))
+        return ranked if limit is None else ranked[:limit]
+
+# 全局索引实例
+hotel_search_index = HotelSearchIndex()
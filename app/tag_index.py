@@ -0,0 +1,144 @@
+# 酒店标签与设施索引
+# 将 Hotel.tags、Hotel.facilities 中的JSON数组解析后建立 标签 -> 酒店ID集合 的内存索引，
+# 多标签筛选通过集合交集/并集完成，不再对每行做字符串匹配
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.config import SEARCH_INDEX_REFRESH_SECONDS
+from app.models import Hotel
+
+def parse_json_list(value: Optional[str]) -> List[str]:
+    """解析JSON数组格式的字段，解析失败时按单个原始字符串处理"""
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except (ValueError, TypeError):
+        return [value]
+    return [str(item) for item in parsed] if isinstance(parsed, list) else [str(parsed)]
+
+class HotelTagIndex:
+    """
+    进程内的酒店标签/设施索引
+    首次使用时从数据库构建，之后由酒店的增删改接口增量维护，
+    并按 SEARCH_INDEX_REFRESH_SECONDS 定期全量重建以同步其他进程的修改
+    """
+
+    def __init__(self, refresh_seconds: int = SEARCH_INDEX_REFRESH_SECONDS):
+        self._lock = threading.RLock()
+        self._refresh_seconds = refresh_seconds
+        self._built_at: Optional[float] = None
+        # 标签 -> 酒店ID集合
+        self._tag_hotels: Dict[str, Set[int]] = defaultdict(set)
+        # 设施 -> 酒店ID集合
+        self._facility_hotels: Dict[str, Set[int]] = defaultdict(set)
+        # 酒店ID -> 解析后的标签/设施列表（保持原有顺序）
+        self._hotel_tags: Dict[int, List[str]] = {}
+        self._hotel_facilities: Dict[int, List[str]] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def ensure_built(self, db: Session):
+        """索引未构建或已过期时从数据库重建"""
+        if self._built_at is None or time.monotonic() - self._built_at > self._refresh_seconds:
+            self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        """从数据库全量重建索引（只读取需要的三列）"""
+        rows = db.query(Hotel.id, Hotel.tags, Hotel.facilities).all()
+        tag_hotels = defaultdict(set)
+        facility_hotels = defaultdict(set)
+        hotel_tags = {}
+        hotel_facilities = {}
+        for hotel_id, tags, facilities in rows:
+            hotel_tags[hotel_id] = parse_json_list(tags)
+            hotel_facilities[hotel_id] = parse_json_list(facilities)
+            for tag in hotel_tags[hotel_id]:
+                tag_hotels[tag].add(hotel_id)
+            for facility in hotel_facilities[hotel_id]:
+                facility_hotels[facility].add(hotel_id)
+
+        with self._lock:
+            self._tag_hotels = tag_hotels
+            self._facility_hotels = facility_hotels
+            self._hotel_tags = hotel_tags
+            self._hotel_facilities = hotel_facilities
+            self._built_at = time.monotonic()
+
+    def add_hotel(self, hotel: Hotel):
+        """新增或更新一家酒店的索引（索引尚未构建时忽略，首次使用时会全量构建）"""
+        if not self.is_built:
+            return
+
+        tags = parse_json_list(hotel.tags)
+        facilities = parse_json_list(hotel.facilities)
+        with self._lock:
+            self._remove(hotel.id)
+            self._hotel_tags[hotel.id] = tags
+            self._hotel_facilities[hotel.id] = facilities
+            for tag in tags:
+                self._tag_hotels[tag].add(hotel.id)
+            for facility in facilities:
+                self._facility_hotels[facility].add(hotel.id)
+
+    def remove_hotel(self, hotel_id: int):
+        """从索引中删除一家酒店"""
+        with self._lock:
+            self._remove(hotel_id)
+
+    def _remove(self, hotel_id: int):
+        for tag in self._hotel_tags.pop(hotel_id, []):
+            self._discard(self._tag_hotels, tag, hotel_id)
+        for facility in self._hotel_facilities.pop(hotel_id, []):
+            self._discard(self._facility_hotels, facility, hotel_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[int]], key: str, hotel_id: int):
+        hotel_ids = postings.get(key)
+        if hotel_ids is not None:
+            hotel_ids.discard(hotel_id)
+            if not hotel_ids:
+                del postings[key]
+
+    def get_tags(self, hotel_id: int) -> Optional[List[str]]:
+        """获取酒店的标签列表，酒店不在索引中时返回 None"""
+        with self._lock:
+            tags = self._hotel_tags.get(hotel_id)
+            return list(tags) if tags is not None else None
+
+    def match(
+        self,
+        tags: Optional[Iterable[str]] = None,
+        facilities: Optional[Iterable[str]] = None,
+        match_all: bool = True
+    ) -> Optional[Set[int]]:
+        """
+        返回满足标签和设施条件的酒店ID集合
+        match_all 为 True 时需包含全部指定标签（交集），否则包含任一标签即可（并集）；
+        标签条件与设施条件之间始终为“且”的关系。未指定任何条件时返回 None
+        """
+        groups = [
+            (self._tag_hotels, [tag for tag in (tags or []) if tag]),
+            (self._facility_hotels, [facility for facility in (facilities or []) if facility]),
+        ]
+        result: Optional[Set[int]] = None
+        with self._lock:
+            for postings, keys in groups:
+                if not keys:
+                    continue
+                sets = [postings.get(key, set()) for key in keys]
+                if match_all:
+                    sets.sort(key=len)
+                    group_ids = set(sets[0]).intersection(*sets[1:])
+                else:
+                    group_ids = set().union(*sets)
+                result = group_ids if result is None else result & group_ids
+        return result
+
+# 全局索引实例
+hotel_tag_index = HotelTagIndex()
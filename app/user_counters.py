@@ -0,0 +1,129 @@
+# 用户预订计数器
+# users 表冗余保存 booking_count（未取消的预订数）和 first_booking_at（首次下单时间），
+# 报价判断新用户、统计新老用户时直接读取，不再对 bookings 表 COUNT(*)。
+# 计数随预订创建/取消在同一事务中原子更新，定期由对账任务按 bookings 表重新计算修正
+import logging
+import time
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import bindparam, case, func, update
+from sqlalchemy.orm import Session
+from app.models import Booking, User
+from app.booking_archive import bookings_for_range
+
+logger = logging.getLogger(__name__)
+
+def record_booking_created(db: Session, user_id: int, booked_at: datetime = None, count: int = 1):
+    """新增 count 条有效预订（不提交）"""
+    db.query(User).filter(User.id == user_id).update(
+        {
+            User.booking_count: func.coalesce(User.booking_count, 0) + count,
+            User.first_booking_at: func.coalesce(User.first_booking_at, booked_at or datetime.now()),
+        },
+        synchronize_session=False
+    )
+
+def record_booking_cancelled(db: Session, user_id: int):
+    """一条有效预订被取消（不提交）"""
+    db.query(User).filter(User.id == user_id).update(
+        {
+            User.booking_count: case(
+                (User.booking_count > 0, User.booking_count - 1),
+                else_=0
+            )
+        },
+        synchronize_session=False
+    )
+
+def record_bookings_cancelled_bulk(db: Session, counts: Dict[int, int]):
+    """批量扣减多个用户的有效预订数（不提交）；counts: {用户ID: 取消的预订数}"""
+    if not counts:
+        return
+    users = User.__table__
+    statement = update(users).where(
+        users.c.id == bindparam("b_user_id")
+    ).values(
+        booking_count=case(
+            (users.c.booking_count > bindparam("b_count"), users.c.booking_count - bindparam("b_count")),
+            else_=0
+        )
+    )
+    db.execute(statement, [{"b_user_id": user_id, "b_count": count} for user_id, count in counts.items()])
+
+def apply_booking_status_change(db: Session, booking: Booking, new_status: str):
+    """预订状态在取消与非取消之间变化时同步计数（在修改 booking.status 之前调用）"""
+    was_cancelled = booking.status == "cancelled"
+    is_cancelled = new_status == "cancelled"
+    if is_cancelled and not was_cancelled:
+        record_booking_cancelled(db, booking.user_id)
+    elif was_cancelled and not is_cancelled:
+        record_booking_created(db, booking.user_id, booking.booking_time)
+
+def is_new_user(db: Session, user_id: int = None) -> bool:
+    """是否为新用户（没有有效预订）"""
+    if not user_id:
+        return False
+    booking_count = db.query(User.booking_count).filter(User.id == user_id).scalar()
+    return not booking_count
+
+def reconcile_booking_counters(db: Session, batch_size: int = 1000) -> int:
+    """
+    按 bookings 表（含归档表）重新计算所有用户的计数器，只更新不一致的用户，返回修正的用户数
+    """
+    start = time.perf_counter()
+    # 包含已归档的历史预订
+    bookings = bookings_for_range(db)
+    stats = {
+        row.user_id: (row.active_count or 0, row.first_booking_at)
+        for row in db.query(
+            bookings.user_id,
+            func.sum(case((bookings.status != "cancelled", 1), else_=0)).label("active_count"),
+            func.min(bookings.booking_time).label("first_booking_at")
+        ).group_by(bookings.user_id)
+    }
+
+    # 计数在对账期间被并发修改的用户跳过，留待下次对账
+    users = User.__table__
+    statement = update(users).where(
+        users.c.id == bindparam("b_user_id"),
+        func.coalesce(users.c.booking_count, 0) == bindparam("b_old_count")
+    ).values(
+        booking_count=bindparam("b_booking_count"),
+        first_booking_at=bindparam("b_first_booking_at")
+    )
+
+    # 先读完再写（流式读取期间不能在同一连接上执行更新）
+    rows = []
+    for user_id, booking_count, first_booking_at in db.query(
+        User.id, User.booking_count, User.first_booking_at
+    ).yield_per(batch_size):
+        expected_count, expected_first = stats.get(user_id, (0, None))
+        if (booking_count or 0) != expected_count or first_booking_at != expected_first:
+            rows.append({
+                "b_user_id": user_id,
+                "b_old_count": booking_count or 0,
+                "b_booking_count": int(expected_count),
+                "b_first_booking_at": expected_first
+            })
+
+    for i in range(0, len(rows), batch_size):
+        db.execute(statement, rows[i:i + batch_size])
+    db.commit()
+
+    logger.info("用户预订计数对账完成，修正 %d 个用户，耗时 %.1fms", len(rows), (time.perf_counter() - start) * 1000)
+    return len(rows)
+
+def run_reconciliation() -> int:
+    """定时任务入口：使用独立会话执行对账"""
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        return reconcile_booking_counters(session)
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    # 对账命令：python -m app.user_counters
+    fixed = run_reconciliation()
+    print(f"用户预订计数对账完成，共修正 {fixed} 个用户")
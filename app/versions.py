@@ -0,0 +1,75 @@
+# 缓存版本号
+# 数据修改时在同一事务内递增 cache_versions 表中的版本号，
+# 各进程的内存缓存定期比较版本号，发现变化后重建，从而在多进程部署下保持一致
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+from sqlalchemy.orm import Session
+from app.config import VERSION_CHECK_SECONDS
+from app.models import CacheVersion
+
+T = TypeVar("T")
+
+def get_version(db: Session, name: str) -> int:
+    """读取缓存版本号，不存在时视为0"""
+    version = db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar()
+    return version or 0
+
+def bump_version(db: Session, name: str):
+    """递增缓存版本号（不提交，随调用方的事务一起提交）"""
+    updated = db.query(CacheVersion).filter(CacheVersion.name == name).update(
+        {CacheVersion.version: CacheVersion.version + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(CacheVersion(name=name, version=1))
+
+class VersionedCache(Generic[T]):
+    """
+    按版本号失效的进程内缓存
+    最多每 VERSION_CHECK_SECONDS 秒查询一次版本号，版本变化时调用 loader 重新加载；
+    设置 max_age_seconds 时，即使版本未变，数据加载超过该时长也会重新加载（兜底直接改库的情况）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[Session], T],
+        check_seconds: float = VERSION_CHECK_SECONDS,
+        max_age_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.loader = loader
+        self.check_seconds = check_seconds
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+        self._value: Optional[T] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    @property
+    def version(self) -> Optional[int]:
+        """当前已加载数据的版本号"""
+        return self._version
+
+    def get(self, db: Session) -> T:
+        """获取缓存数据，必要时检查版本号并重新加载"""
+        with self._lock:
+            now = time.monotonic()
+            if self._value is not None and now - self._checked_at < self.check_seconds:
+                return self._value
+            version = get_version(db, self.name)
+            expired = self.max_age_seconds is not None and now - self._loaded_at >= self.max_age_seconds
+            if self._value is None or version != self._version or expired:
+                self._value = self.loader(db)
+                self._version = version
+                self._loaded_at = now
+            self._checked_at = now
+            return self._value
+
+    def invalidate(self):
+        """丢弃本进程的缓存（本进程刚修改数据后调用，立即生效）"""
+        with self._lock:
+            self._value = None
+            self._version = None
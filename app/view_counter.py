@@ -0,0 +1,66 @@
+# 酒店浏览次数缓冲计数
+# 详情页浏览只在内存中累加，由定时任务批量写回数据库，
+# 避免每次浏览都对热门酒店行加锁写入。进程异常退出时可能丢失少量未写回的计数
+import logging
+import threading
+import time
+from collections import Counter
+from sqlalchemy import bindparam, func, update
+from app.database import SessionLocal
+from app.models import Hotel
+
+logger = logging.getLogger(__name__)
+
+class ViewCounter:
+    """进程内的浏览次数缓冲区"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+
+    def increment(self, hotel_id: int, count: int = 1):
+        """记录一次浏览（仅写内存）"""
+        with self._lock:
+            self._pending[hotel_id] += count
+
+    def pending(self, hotel_id: int) -> int:
+        """获取尚未写回数据库的浏览次数"""
+        with self._lock:
+            return self._pending.get(hotel_id, 0)
+
+    def flush(self) -> int:
+        """
+        将缓冲的浏览次数批量写回数据库，返回更新的酒店数
+        写入失败时把计数放回缓冲区，等待下次重试
+        """
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        start = time.perf_counter()
+        hotels = Hotel.__table__
+        statement = update(hotels).where(
+            hotels.c.id == bindparam("b_hotel_id")
+        ).values(
+            view_count=func.coalesce(hotels.c.view_count, 0) + bindparam("b_increment")
+        )
+        rows = [{"b_hotel_id": hotel_id, "b_increment": count} for hotel_id, count in pending.items()]
+
+        db = SessionLocal()
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        finally:
+            db.close()
+
+        logger.info("写回 %d 家酒店的浏览次数，耗时 %.1fms", len(rows), (time.perf_counter() - start) * 1000)
+        return len(rows)
+
+# 全局计数器实例
+hotel_view_counter = ViewCounter()
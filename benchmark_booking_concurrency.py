@@ -0,0 +1,165 @@
+# 并发预订压力测试
+# 在配置的数据库上创建临时用户、酒店和房型，用多个线程通过预订接口（POST /api/bookings/）同时抢订同一段日期，
+# 对比旧的“先查询再写入”占用方式与条件更新的原子占用方式：是否超卖、成功数和吞吐量。
+# 请求经过完整的接口流程（认证、计价、库存、预订记录、用户计数），旧方式通过替换接口中的库存占用函数模拟。
+# 需要支持行锁的数据库（MySQL）才能反映真实的并发行为，SQLite 会把所有写入串行化。
+# 用法：python benchmark_booking_concurrency.py [--requests 300] [--threads 32] [--rooms 20] [--hotels 1] [--nights 3]
+import argparse
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as day_time, timedelta
+from decimal import Decimal
+from unittest import mock
+from fastapi.testclient import TestClient
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.inventory import NO_ROOM_TYPE, check_availability, stay_dates
+from app.main import app
+from app.models import Booking, Hotel, IdempotencyKey, RoomInventory, RoomType, User
+from app.routers import bookings as bookings_router
+
+def legacy_reserve(db, hotel_id, room_type_id, check_in_date, check_out_date, room_count, capacity):
+    """旧的占用方式：先检查剩余房间，再读出台账行在内存中累加后写回（无锁，随预订记录一起提交）"""
+    check_availability(db, hotel_id, check_in_date, check_out_date, room_count, capacity, room_type_id)
+    rows = db.query(RoomInventory).filter(
+        RoomInventory.hotel_id == hotel_id,
+        RoomInventory.room_type_id == (room_type_id or NO_ROOM_TYPE),
+        RoomInventory.stay_date >= check_in_date,
+        RoomInventory.stay_date < check_out_date
+    ).all()
+    for row in rows:
+        row.booked_count = (row.booked_count or 0) + room_count
+
+def setup(hotel_count: int, user_count: int, rooms: int, check_in_date: date, check_out_date: date):
+    """创建临时用户、酒店、房型和空台账行，返回 ([(酒店ID, 房型ID)], [用户ID])"""
+    db = SessionLocal()
+    try:
+        suffix = int(time.time())
+        users = [
+            User(username=f"bench_{suffix}_{i}", password="-", role="user", status="active")
+            for i in range(user_count)
+        ]
+        db.add_all(users)
+        targets = []
+        for i in range(hotel_count):
+            # 入住/退房时间需显式设置：模型的字符串默认值在 SQLite 上无法写入 Time 列
+            hotel = Hotel(name=f"并发测试酒店{i + 1}", address="-", base_price=Decimal("100"),
+                          total_rooms=rooms, available_rooms=rooms,
+                          check_in_time=day_time(14), check_out_time=day_time(12))
+            db.add(hotel)
+            db.flush()
+            room_type = RoomType(hotel_id=hotel.id, type_name="测试房型", base_price=Decimal("100"),
+                                 total_count=rooms, available_count=rooms)
+            db.add(room_type)
+            db.flush()
+            for stay_date in stay_dates(check_in_date, check_out_date):
+                db.add(RoomInventory(hotel_id=hotel.id, room_type_id=room_type.id, stay_date=stay_date, booked_count=0))
+            targets.append((hotel.id, room_type.id))
+        db.commit()
+        return targets, [user.id for user in users]
+    finally:
+        db.close()
+
+def teardown(targets, user_ids):
+    db = SessionLocal()
+    try:
+        hotel_ids = [hotel_id for hotel_id, _ in targets]
+        db.query(IdempotencyKey).filter(IdempotencyKey.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(Booking).filter(Booking.hotel_id.in_(hotel_ids)).delete(synchronize_session=False)
+        db.query(RoomInventory).filter(RoomInventory.hotel_id.in_(hotel_ids)).delete(synchronize_session=False)
+        db.query(RoomType).filter(RoomType.hotel_id.in_(hotel_ids)).delete(synchronize_session=False)
+        db.query(Hotel).filter(Hotel.id.in_(hotel_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def booked_counts(targets):
+    """每个酒店每晚的最终占用数"""
+    db = SessionLocal()
+    try:
+        return {
+            hotel_id: [row.booked_count for row in db.query(RoomInventory).filter(
+                RoomInventory.hotel_id == hotel_id,
+                RoomInventory.room_type_id == room_type_id
+            ).order_by(RoomInventory.stay_date)]
+            for hotel_id, room_type_id in targets
+        }
+    finally:
+        db.close()
+
+def run(mode: str, requests: int, threads: int, rooms: int, hotel_count: int, nights: int):
+    check_in_date = date.today() + timedelta(days=30)
+    check_out_date = check_in_date + timedelta(days=nights)
+    targets, user_ids = setup(hotel_count, threads, rooms, check_in_date, check_out_date)
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in user_ids]
+    # 不作为上下文管理器使用，避免启动后台任务；服务端异常（如数据库错误）以 500 响应返回
+    client = TestClient(app, raise_server_exceptions=False)
+    outcomes = Counter()
+    successes = Counter()
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(threads)
+
+    def worker(i: int):
+        hotel_id, room_type_id = targets[i % len(targets)]
+        if i < threads:
+            start_barrier.wait()
+        response = client.post(
+            "/api/bookings/",
+            json={
+                "hotel_id": hotel_id,
+                "room_type_id": room_type_id,
+                "check_in_date": check_in_date.isoformat(),
+                "check_out_date": check_out_date.isoformat(),
+                "room_count": 1
+            },
+            headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+        )
+        if response.status_code == 200:
+            outcome = "成功"
+        elif response.status_code == 400:
+            outcome = "房间已满"
+        else:
+            outcome = f"错误{response.status_code}"
+        with lock:
+            outcomes[outcome] += 1
+            if outcome == "成功":
+                successes[hotel_id] += 1
+
+    # 旧方式：替换接口中的库存占用函数，其余流程（计价、预订记录、事务提交）保持一致
+    patch = mock.patch.object(bookings_router, "reserve_rooms", legacy_reserve) if mode == "legacy" else nullcontext()
+    try:
+        with patch:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(worker, range(requests)))
+            elapsed = time.perf_counter() - start
+
+        counts = booked_counts(targets)
+        # 超卖：成功的预订数超过房间数；丢失更新：台账记录的占用数少于成功的预订数
+        oversold = sum(max(0, successes[hotel_id] - rooms) for hotel_id, _ in targets)
+        lost = sum(successes[hotel_id] - min(nightly) for hotel_id, nightly in counts.items())
+        print(f"{mode:>6} | 请求 {requests:>5} | 吞吐 {requests / elapsed:>8.1f} 次/秒 | "
+              f"{dict(outcomes)} | 超卖 {oversold} 间 | 台账丢失更新 {lost}")
+    finally:
+        teardown(targets, user_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description="并发预订压力测试")
+    parser.add_argument("--requests", type=int, default=300, help="预订请求总数")
+    parser.add_argument("--threads", type=int, default=32, help="并发线程数")
+    parser.add_argument("--rooms", type=int, default=20, help="每个房型的房间数")
+    parser.add_argument("--hotels", type=int, default=1, help="请求均匀分散到的酒店数（验证不同酒店互不阻塞）")
+    parser.add_argument("--nights", type=int, default=3, help="每个预订的入住晚数")
+    parser.add_argument("--mode", choices=["legacy", "atomic", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["legacy", "atomic"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        run(mode, args.requests, args.threads, args.rooms, args.hotels, args.nights)
+
+if __name__ == "__main__":
+    main()
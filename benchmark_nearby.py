@@ -0,0 +1,86 @@
+# 附近酒店查询性能测试
+# 生成合成酒店坐标，对比网格索引与逐个计算距离的全量扫描在不同酒店规模下的查询耗时
+# 用法：python benchmark_nearby.py [--sizes 1000 10000 100000] [--queries 200] [--radius 5]
+import argparse
+import random
+import time
+from app.geo_index import GeoGridIndex, haversine_km
+
+# 合成数据的城市中心（纬度, 经度），酒店围绕城市中心正态分布
+CITY_CENTERS = [
+    (39.9042, 116.4074),  # 北京
+    (31.2304, 121.4737),  # 上海
+    (23.1291, 113.2644),  # 广州
+    (22.5431, 114.0579),  # 深圳
+    (30.2741, 120.1551),  # 杭州
+    (30.5728, 104.0668),  # 成都
+    (18.2528, 109.5119),  # 三亚
+    (24.4798, 118.0894),  # 厦门
+    (34.3416, 108.9398),  # 西安
+    (32.0603, 118.7969),  # 南京
+]
+
+def generate_hotels(count: int, rng: random.Random):
+    """生成 count 个合成酒店坐标"""
+    hotels = []
+    for hotel_id in range(1, count + 1):
+        center_lat, center_lng = rng.choice(CITY_CENTERS)
+        hotels.append((hotel_id, rng.gauss(center_lat, 0.3), rng.gauss(center_lng, 0.3)))
+    return hotels
+
+def brute_force(hotels, lat: float, lng: float, radius_km: float):
+    """全量扫描：计算每家酒店的距离"""
+    results = []
+    for hotel_id, hotel_lat, hotel_lng in hotels:
+        distance = haversine_km(lat, lng, hotel_lat, hotel_lng)
+        if distance <= radius_km:
+            results.append((hotel_id, distance))
+    results.sort(key=lambda item: (item[1], item[0]))
+    return results
+
+def run(size: int, query_count: int, radius_km: float, seed: int):
+    rng = random.Random(seed)
+    hotels = generate_hotels(size, rng)
+
+    start = time.perf_counter()
+    index = GeoGridIndex()
+    for hotel_id, lat, lng in hotels:
+        index.add(hotel_id, lat, lng)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    queries = [
+        (rng.gauss(lat, 0.2), rng.gauss(lng, 0.2))
+        for lat, lng in (rng.choice(CITY_CENTERS) for _ in range(query_count))
+    ]
+
+    start = time.perf_counter()
+    index_results = [index.query(lat, lng, radius_km) for lat, lng in queries]
+    index_ms = (time.perf_counter() - start) * 1000 / query_count
+
+    start = time.perf_counter()
+    scan_results = [brute_force(hotels, lat, lng, radius_km) for lat, lng in queries]
+    scan_ms = (time.perf_counter() - start) * 1000 / query_count
+
+    assert index_results == scan_results, "网格索引结果与全量扫描不一致"
+
+    avg_hits = sum(len(r) for r in index_results) / query_count
+    print(
+        f"{size:>8} | {build_ms:>10.1f} | {index_ms:>10.3f} | {scan_ms:>10.3f} | "
+        f"{scan_ms / index_ms:>7.1f}x | {avg_hits:>8.1f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="附近酒店查询性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="酒店数量")
+    parser.add_argument("--queries", type=int, default=200, help="每个规模的查询次数")
+    parser.add_argument("--radius", type=float, default=5.0, help="查询半径（公里）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    print(f"查询半径 {args.radius} 公里，每个规模 {args.queries} 次查询")
+    print(f"{'酒店数':>8} | {'建索引ms':>10} | {'索引ms/次':>10} | {'扫描ms/次':>10} | {'加速比':>8} | {'平均结果':>8}")
+    for size in args.sizes:
+        run(size, args.queries, args.radius, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+-- 游标分页的排序列改为 NOT NULL，并添加与排序一致的组合索引
+-- 适用于按旧版 schema.sql 建立的数据库（新建数据库直接使用 schema.sql 即可）
+-- 游标条件 (排序键) < (游标值) 不会匹配 NULL，排序列为空的行会在翻页时被跳过
+
+USE hotel_booking;
+
+-- 1. 酒店列表：按 (is_recommended, rating, id) 倒序
+UPDATE hotels SET rating = 0.00 WHERE rating IS NULL;
+UPDATE hotels SET is_recommended = 0 WHERE is_recommended IS NULL;
+ALTER TABLE hotels
+    MODIFY rating DECIMAL(3, 2) NOT NULL DEFAULT 0.00 COMMENT '评分（0-5分）',
+    MODIFY is_recommended TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否推荐：1-是，0-否',
+    ADD INDEX idx_recommended_rating_id (is_recommended, rating, id) COMMENT '酒店列表默认排序（游标分页）';
+
+-- 2. 用户收藏列表：按 (user_id, created_at, id) 定位
+UPDATE favorites SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE favorites
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '收藏时间',
+    ADD INDEX idx_user_created_id (user_id, created_at, id) COMMENT '用户收藏列表排序（游标分页）';
+
+-- 3. 预订列表、评论列表的排序列
+UPDATE bookings SET booking_time = COALESCE(confirm_time, CURRENT_TIMESTAMP) WHERE booking_time IS NULL;
+ALTER TABLE bookings
+    MODIFY booking_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '预订时间';
+
+UPDATE reviews SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE reviews
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间';
@@ -0,0 +1,9 @@
+-- 预订列表合并读取归档表，按 (booking_time, id) 游标分页：归档表的预订时间改为 NOT NULL 并添加索引
+-- 需在 001_keyset_pagination_indexes.sql 之后执行
+
+USE hotel_booking;
+
+UPDATE bookings_archive SET booking_time = COALESCE(confirm_time, archived_at, CURRENT_TIMESTAMP) WHERE booking_time IS NULL;
+ALTER TABLE bookings_archive
+    MODIFY booking_time TIMESTAMP NOT NULL COMMENT '预订时间',
+    ADD INDEX idx_booking_time (booking_time);
@@ -22,6 +22,8 @@ CREATE TABLE IF NOT EXISTS users (
     role ENUM('user', 'admin') DEFAULT 'user' COMMENT '角色：user-普通用户，admin-管理员',
     status ENUM('active', 'inactive', 'banned') DEFAULT 'active' COMMENT '账户状态',
     last_login_time TIMESTAMP NULL COMMENT '最后登录时间',
+    booking_count INT NOT NULL DEFAULT 0 COMMENT '有效预订数（不含已取消）',
+    first_booking_at TIMESTAMP NULL COMMENT '首次预订时间',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     INDEX idx_username (username),
@@ -53,7 +55,7 @@ CREATE TABLE IF NOT EXISTS hotels (
     base_price DECIMAL(10, 2) NOT NULL DEFAULT 0.00 COMMENT '基础价格（元/晚）',
     nearby_attractions TEXT COMMENT '附近景点信息（JSON格式）',
     images TEXT COMMENT '酒店图片（JSON格式，存储图片URL数组）',
-    rating DECIMAL(3, 2) DEFAULT 0.00 COMMENT '评分（0-5分）',
+    rating DECIMAL(3, 2) NOT NULL DEFAULT 0.00 COMMENT '评分（0-5分）',
     review_count INT DEFAULT 0 COMMENT '评论数量',
     star_level TINYINT DEFAULT 3 COMMENT '星级（1-5星）',
     total_rooms INT DEFAULT 0 COMMENT '总房间数',
@@ -66,7 +68,7 @@ CREATE TABLE IF NOT EXISTS hotels (
     facilities TEXT COMMENT '酒店设施（JSON格式）',
     parking_info VARCHAR(200) COMMENT '停车信息',
     wifi_info VARCHAR(200) COMMENT 'WiFi信息',
-    is_recommended TINYINT(1) DEFAULT 0 COMMENT '是否推荐：1-是，0-否',
+    is_recommended TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否推荐：1-是，0-否',
     view_count INT DEFAULT 0 COMMENT '浏览次数',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -77,7 +79,8 @@ CREATE TABLE IF NOT EXISTS hotels (
     INDEX idx_base_price (base_price),
     INDEX idx_rating (rating),
     INDEX idx_star_level (star_level),
-    INDEX idx_is_recommended (is_recommended)
+    INDEX idx_is_recommended (is_recommended),
+    INDEX idx_recommended_rating_id (is_recommended, rating, id) COMMENT '酒店列表默认排序（游标分页）'
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='酒店表';
 
 -- 4. 房间类型表
@@ -121,7 +124,7 @@ CREATE TABLE IF NOT EXISTS bookings (
     payment_method ENUM('alipay', 'wechat', 'bank_card', 'cash', 'points') COMMENT '支付方式',
     payment_status ENUM('unpaid', 'paid', 'refunded', 'partial_refund') DEFAULT 'unpaid' COMMENT '支付状态',
     status ENUM('pending', 'confirmed', 'cancelled', 'completed', 'no_show') DEFAULT 'pending' COMMENT '预订状态：pending-待确认，confirmed-已确认，cancelled-已取消，completed-已完成，no_show-未入住',
-    booking_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '预订时间',
+    booking_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '预订时间',
     confirm_time TIMESTAMP NULL COMMENT '确认时间',
     cancel_time TIMESTAMP NULL COMMENT '取消时间',
     cancel_reason VARCHAR(500) COMMENT '取消原因',
@@ -133,6 +136,7 @@ CREATE TABLE IF NOT EXISTS bookings (
     INDEX idx_user_id (user_id),
     INDEX idx_hotel_id (hotel_id),
     INDEX idx_check_in_date (check_in_date),
+    INDEX idx_booking_time (booking_time),
     INDEX idx_status (status),
     INDEX idx_payment_status (payment_status),
     INDEX idx_booking_time (booking_time)
@@ -143,12 +147,13 @@ CREATE TABLE IF NOT EXISTS favorites (
     id INT AUTO_INCREMENT PRIMARY KEY COMMENT '收藏ID',
     user_id INT NOT NULL COMMENT '用户ID',
     hotel_id INT NOT NULL COMMENT '酒店ID',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '收藏时间',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '收藏时间',
     UNIQUE KEY uk_user_hotel (user_id, hotel_id) COMMENT '用户和酒店的唯一组合',
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE,
     INDEX idx_user_id (user_id),
-    INDEX idx_hotel_id (hotel_id)
+    INDEX idx_hotel_id (hotel_id),
+    INDEX idx_user_created_id (user_id, created_at, id) COMMENT '用户收藏列表排序（游标分页）'
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='收藏表';
 
 -- 7. 评论表
@@ -170,7 +175,7 @@ CREATE TABLE IF NOT EXISTS reviews (
     reply_content TEXT COMMENT '商家回复内容',
     reply_time TIMESTAMP NULL COMMENT '回复时间',
     status ENUM('pending', 'approved', 'rejected') DEFAULT 'pending' COMMENT '审核状态',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE,
@@ -260,6 +265,85 @@ CREATE TABLE IF NOT EXISTS holidays (
     INDEX idx_holiday_date (holiday_date)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='节假日表';
 
+-- 12. 房间库存台账表（按晚记录每个房型及酒店合计已占用的房间数）
+-- 上线后执行 python -m app.inventory 根据 bookings 表回填（含酒店合计行）
+CREATE TABLE IF NOT EXISTS room_inventory (
+    id INT AUTO_INCREMENT PRIMARY KEY COMMENT '台账ID',
+    hotel_id INT NOT NULL COMMENT '酒店ID',
+    room_type_id INT NOT NULL DEFAULT 0 COMMENT '房间类型ID（0表示未指定房型，-1表示酒店合计）',
+    stay_date DATE NOT NULL COMMENT '入住日期（按晚）',
+    booked_count INT NOT NULL DEFAULT 0 COMMENT '已占用房间数',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_hotel_room_type_date (hotel_id, room_type_id, stay_date),
+    INDEX idx_stay_date (stay_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='房间库存台账表';
+
+-- 13. 缓存版本号表（价格规则等数据修改时递增，各进程据此重建内存缓存）
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY COMMENT '缓存名称',
+    version INT NOT NULL DEFAULT 0 COMMENT '版本号',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='缓存版本号表';
+
+INSERT INTO cache_versions (name, version) VALUES
+('price_rules', 0),
+('holidays', 0),
+('coupons', 0),
+('base_prices', 0)
+ON DUPLICATE KEY UPDATE name=name;
+
+-- 14. 预订幂等键表（客户端携带 Idempotency-Key 重试创建预订时返回首次创建的预订，过期后定期清理）
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    id INT AUTO_INCREMENT PRIMARY KEY COMMENT 'ID',
+    user_id INT NOT NULL COMMENT '用户ID',
+    idempotency_key VARCHAR(64) NOT NULL COMMENT '客户端提供的幂等键',
+    request_hash CHAR(64) NOT NULL COMMENT '请求内容摘要（SHA-256）',
+    booking_id INT NOT NULL COMMENT '创建的预订ID',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    expires_at TIMESTAMP NOT NULL COMMENT '过期时间',
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (booking_id) REFERENCES bookings(id) ON DELETE CASCADE,
+    UNIQUE KEY uk_user_idempotency_key (user_id, idempotency_key),
+    INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='预订幂等键表';
+
+-- 15. 预订归档表（结构与预订表相同，保存已完成、已取消、未入住且离店已久的历史预订）
+-- 由归档任务按批从 bookings 表迁移（python -m app.booking_archive），保留原预订ID
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    id INT PRIMARY KEY COMMENT '预订ID（与原预订相同）',
+    booking_no VARCHAR(50) NOT NULL UNIQUE COMMENT '预订编号',
+    user_id INT NOT NULL COMMENT '用户ID',
+    hotel_id INT NOT NULL COMMENT '酒店ID',
+    room_type_id INT COMMENT '房间类型ID',
+    check_in_date DATE NOT NULL COMMENT '入住日期',
+    check_out_date DATE NOT NULL COMMENT '离店日期',
+    nights INT NOT NULL COMMENT '入住天数',
+    room_count INT NOT NULL DEFAULT 1 COMMENT '房间数量',
+    guest_name VARCHAR(50) COMMENT '入住人姓名',
+    guest_phone VARCHAR(20) COMMENT '入住人电话',
+    base_price DECIMAL(10, 2) NOT NULL COMMENT '基础价格（元/晚）',
+    discount_rate DECIMAL(5, 2) DEFAULT 0.00 COMMENT '折扣率（0-100，如10表示10%折扣）',
+    coupon_discount DECIMAL(10, 2) DEFAULT 0.00 COMMENT '优惠券折扣金额',
+    final_price DECIMAL(10, 2) NOT NULL COMMENT '最终支付价格',
+    payment_method ENUM('alipay', 'wechat', 'bank_card', 'cash', 'points') COMMENT '支付方式',
+    payment_status ENUM('unpaid', 'paid', 'refunded', 'partial_refund') DEFAULT 'unpaid' COMMENT '支付状态',
+    status ENUM('pending', 'confirmed', 'cancelled', 'completed', 'no_show') DEFAULT 'pending' COMMENT '预订状态',
+    booking_time TIMESTAMP NOT NULL COMMENT '预订时间',
+    confirm_time TIMESTAMP NULL COMMENT '确认时间',
+    cancel_time TIMESTAMP NULL COMMENT '取消时间',
+    cancel_reason VARCHAR(500) COMMENT '取消原因',
+    notes TEXT COMMENT '备注信息',
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (hotel_id) REFERENCES hotels(id) ON DELETE CASCADE,
+    FOREIGN KEY (room_type_id) REFERENCES room_types(id) ON DELETE SET NULL,
+    INDEX idx_user_id (user_id),
+    INDEX idx_hotel_id (hotel_id),
+    INDEX idx_check_in_date (check_in_date),
+    INDEX idx_booking_time (booking_time)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='预订归档表';
+
 -- ========== 插入示例数据 ==========
 
 -- 插入城市数据
@@ -420,6 +504,18 @@ INSERT INTO bookings (booking_no, user_id, hotel_id, room_type_id, check_in_date
 ('BK20250104001', 5, 5, NULL, '2025-05-01', '2025-05-05', 4, 1, '赵六', '13800138004', 388.00, 0.00, 1552.00, 'alipay', 'paid', 'confirmed', '2025-02-01 16:45:00', '2025-02-01 16:50:00')
 ON DUPLICATE KEY UPDATE booking_no=booking_no;
 
+-- 根据示例预订初始化用户预订计数
+UPDATE users u
+JOIN (
+    SELECT user_id,
+           SUM(CASE WHEN status <> 'cancelled' THEN 1 ELSE 0 END) AS active_count,
+           MIN(booking_time) AS first_booking_at
+    FROM bookings
+    GROUP BY user_id
+) b ON b.user_id = u.id
+SET u.booking_count = b.active_count,
+    u.first_booking_at = b.first_booking_at;
+
 -- 插入示例评论数据
 INSERT INTO reviews (user_id, hotel_id, booking_id, rating, title, content, service_rating, cleanliness_rating, location_rating, value_rating, status, created_at) VALUES
 (2, 1, 1, 5.0, '非常满意的度假体验', '酒店位置绝佳，海景房视野开阔，服务周到，设施完善。早餐丰富，私人海滩很赞！强烈推荐！', 5.0, 5.0, 5.0, 4.5, 'approved', '2025-02-20 10:00:00'),
@@ -247,6 +247,59 @@ const bookingAPI = {
     cancel: (id) => apiRequest(`/bookings/${id}/cancel`, {
         method: 'PUT',
     }),
+    
+    // 获取预订事件流的短期令牌（需要管理员权限）
+    getStreamToken: () => apiRequest(`/bookings/stream/token`, {
+        method: 'POST',
+    }),
+    
+    // 订阅预订事件（SSE），返回关闭函数
+    // handlers: { onEvent(type, data), onReset() }；EventSource 不能设置请求头，使用短期令牌认证，
+    // 连接断开且令牌已过期时重新获取令牌，并带上最后收到的事件ID续传
+    subscribe: (handlers = {}, hotelId = null) => {
+        let source = null;
+        let lastEventId = null;
+        let closed = false;
+        
+        const handle = (event) => {
+            lastEventId = event.lastEventId || lastEventId;
+            const data = JSON.parse(event.data);
+            if (event.type === 'reset') {
+                handlers.onReset && handlers.onReset(data);
+            } else {
+                handlers.onEvent && handlers.onEvent(event.type, data);
+            }
+        };
+        
+        const connect = async () => {
+            if (closed) return;
+            try {
+                const { token } = await bookingAPI.getStreamToken();
+                const params = new URLSearchParams({ token });
+                if (hotelId) params.set('hotel_id', hotelId);
+                if (lastEventId) params.set('last_event_id', lastEventId);
+                source = new EventSource(`${API_BASE_URL}/bookings/stream?${params.toString()}`);
+                ['booking.created', 'booking.updated', 'booking.cancelled', 'booking.archived', 'reset'].forEach(
+                    (type) => source.addEventListener(type, handle)
+                );
+                source.onerror = () => {
+                    // 浏览器会自动重连；连接被拒绝（如令牌过期）时 EventSource 关闭，需要重新获取令牌
+                    if (source.readyState === EventSource.CLOSED) {
+                        setTimeout(connect, 3000);
+                    }
+                };
+            } catch (error) {
+                console.error('预订事件流连接失败:', error);
+                setTimeout(connect, 10000);
+            }
+        };
+        
+        connect();
+        return () => {
+            closed = true;
+            if (source) source.close();
+        };
+    },
 };
 
 // 收藏相关API（不再传递user_id，后端从token获取）
@@ -407,8 +407,7 @@ async function calculatePrice() {
             check_out_date: checkOutDate
         });
         
-        const nights = DatePicker.getDaysBetween(checkInDate, checkOutDate);
-        const totalPrice = parseFloat(result.final_price) * roomCount * nights;
+        const totalPrice = parseFloat(result.total_price) * roomCount;
         
         let priceText = `${utils.formatPrice(totalPrice)}`;
         if (result.applied_rules && result.applied_rules.length > 0) {
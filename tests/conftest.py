@@ -0,0 +1,62 @@
+# 测试公共夹具：使用临时 SQLite 数据库，每个测试前重建表并清空进程内缓存
+import os
+import tempfile
+
+# 必须在导入 app 之前设置，app.database 导入时即创建引擎
+_db_dir = tempfile.mkdtemp(prefix="hotel_booking_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+from datetime import time
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from app.auth import create_access_token
+from app.cache import _caches
+from app.coupon_index import coupon_index_cache
+from app.database import Base, SessionLocal, engine
+from app.holiday_calendar import holiday_cache
+from app.main import app
+from app.models import Hotel, User
+from app.pricing_engine import base_price_version, rule_cache
+
+@pytest.fixture(autouse=True)
+def reset_database():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    for cache in _caches.values():
+        cache.clear()
+    for versioned in (rule_cache, holiday_cache, base_price_version, coupon_index_cache):
+        versioned.invalidate()
+    yield
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client():
+    # 不进入上下文管理器，不触发启动事件（后台定时任务）
+    return TestClient(app)
+
+def make_user(db, username: str = "user", role: str = "user") -> User:
+    user = User(username=username, password="x", role=role, status="active")
+    db.add(user)
+    db.commit()
+    return user
+
+def make_hotel(db, name: str = "测试酒店", rooms: int = 10, **fields) -> Hotel:
+    # SQLite 的 Time 列不接受字符串默认值，显式设置入住、退房时间
+    hotel = Hotel(
+        name=name, address="-", base_price=Decimal("100"), total_rooms=rooms, available_rooms=rooms,
+        check_in_time=time(14), check_out_time=time(12), **fields
+    )
+    db.add(hotel)
+    db.commit()
+    return hotel
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
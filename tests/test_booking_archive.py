@@ -0,0 +1,94 @@
+# 预订归档
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from app.booking_archive import archive_bookings
+from app import pricing_simulator
+from app.booking_events import booking_events
+from app.models import Booking, BookingArchive
+from app.pagination import NEXT_CURSOR_HEADER
+from conftest import auth_headers, make_hotel, make_user
+from test_query_counts import count_statements
+
+def add_booking(db, user, hotel, check_in: date, status: str = "completed", nights: int = 1, price: str = "100") -> Booking:
+    booking = Booking(
+        booking_no=f"BK{db.query(Booking).count() + db.query(BookingArchive).count():05d}",
+        user_id=user.id, hotel_id=hotel.id, check_in_date=check_in,
+        check_out_date=check_in + timedelta(days=nights), nights=nights, room_count=1,
+        base_price=Decimal(price), final_price=Decimal(price) * nights, status=status,
+        booking_time=datetime.combine(check_in - timedelta(days=7), datetime.min.time())
+    )
+    db.add(booking)
+    db.commit()
+    return booking
+
+def test_archive_moves_old_finished_bookings_and_publishes(db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    old_id = add_booking(db, user, hotel, date(2024, 1, 1)).id
+    recent_id = add_booking(db, user, hotel, date.today() - timedelta(days=3)).id
+
+    assert archive_bookings(db, before=date.today() - timedelta(days=30)) == 1
+    assert [row.id for row in db.query(Booking)] == [recent_id]
+    assert [row.id for row in db.query(BookingArchive)] == [old_id]
+
+    event = booking_events._buffer[-1]
+    assert event.event_type == "booking.archived"
+    assert json.loads(event.data)["booking"]["id"] == old_id
+
+def test_statistics_aggregate_live_and_archived_tables_separately(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    add_booking(db, user, hotel, date(2024, 1, 1), price="100")
+    add_booking(db, user, hotel, date(2024, 2, 1), status="cancelled", price="80")
+    add_booking(db, user, hotel, date.today() - timedelta(days=3), price="200")
+    add_booking(db, user, hotel, date.today() + timedelta(days=3), status="confirmed", price="300")
+    assert archive_bookings(db, before=date.today() - timedelta(days=30)) == 2
+
+    with count_statements() as statements:
+        overview = client.get("/api/statistics/overview?start_date=2024-01-01").json()
+        by_hotel = client.get("/api/statistics/by-hotel?start_date=2024-01-01").json()
+    # 每张表分别带日期条件聚合，不在 UNION ALL 派生表上过滤
+    assert not [statement for statement in statements if "UNION" in statement.upper()]
+    assert overview["total_bookings"] == 4
+    assert overview["total_revenue"] == 600
+    assert {item["status"]: item["count"] for item in overview["bookings_by_status"]} == {
+        "completed": 2, "cancelled": 1, "confirmed": 1
+    }
+    assert by_hotel == [{"hotel_id": hotel.id, "hotel_name": hotel.name, "booking_count": 3, "total_revenue": 600}]
+
+    # 查询范围不涉及归档日期时只读取 bookings 表
+    recent = client.get(f"/api/statistics/overview?start_date={date.today() - timedelta(days=7)}").json()
+    assert recent["total_bookings"] == 2
+
+    pricing_simulator._init_worker([])
+    result = pricing_simulator.simulate_hotel(hotel.id, since=date(2024, 1, 1))
+    assert result["bookings"] == 3
+    assert result["actual_revenue"] == 600
+    assert pricing_simulator._hotels_with_bookings(date(2024, 1, 1), None) == [hotel.id]
+
+def test_booking_list_includes_archived_bookings(client, db):
+    user = make_user(db)
+    other = make_user(db, username="other")
+    hotel = make_hotel(db)
+    ids = [add_booking(db, user, hotel, check_in).id for check_in in (
+        date(2024, 1, 1), date.today() - timedelta(days=3), date(2024, 3, 1), date.today() - timedelta(days=1)
+    )]
+    add_booking(db, other, hotel, date(2024, 2, 1))
+    assert archive_bookings(db, before=date.today() - timedelta(days=30)) == 3
+
+    # 两张表按预订时间倒序合并，逐页翻完不重复、不遗漏
+    seen, cursor = [], None
+    while True:
+        response = client.get(
+            "/api/bookings/?limit=1" + (f"&cursor={cursor}" if cursor else ""), headers=auth_headers(user)
+        )
+        assert response.status_code == 200, response.text
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert seen == [ids[3], ids[1], ids[2], ids[0]]
+
+    response = client.get("/api/bookings/?status=completed&limit=10", headers=auth_headers(user))
+    assert len(response.json()) == 4
@@ -0,0 +1,28 @@
+# 预订事件流的认证
+from app.auth import create_stream_token
+from conftest import auth_headers, make_user
+
+def test_stream_token_requires_admin(client, db):
+    user = make_user(db)
+    admin = make_user(db, "admin", role="admin")
+    assert client.post("/api/bookings/stream/token", headers=auth_headers(user)).status_code == 403
+
+    response = client.post("/api/bookings/stream/token", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.json()["token"]
+
+def test_stream_rejects_missing_or_invalid_token(client, db):
+    user = make_user(db)
+    assert client.get("/api/bookings/stream").status_code == 401
+    assert client.get("/api/bookings/stream?token=invalid").status_code == 401
+    # 普通访问令牌不能作为事件流令牌
+    access_token = auth_headers(user)["Authorization"].split()[1]
+    assert client.get(f"/api/bookings/stream?token={access_token}").status_code == 401
+    # 非管理员的事件流令牌
+    assert client.get(f"/api/bookings/stream?token={create_stream_token(user)}").status_code == 403
+
+def test_stream_token_is_not_an_access_token(client, db):
+    admin = make_user(db, "admin", role="admin")
+    headers = {"Authorization": f"Bearer {create_stream_token(admin)}"}
+    assert client.get("/api/bookings/", headers=headers).status_code == 401
+    assert client.post("/api/bookings/stream/token", headers=headers).status_code == 401
@@ -0,0 +1,77 @@
+# 预订状态自动流转
+import json
+from datetime import datetime, timedelta
+from app.booking_events import booking_events
+from sqlalchemy.orm import Query
+from app import booking_lifecycle
+from app.booking_lifecycle import advance_booking_statuses
+from app.models import Booking
+from conftest import make_hotel, make_user
+from test_bookings import booked_counts, create_booking
+
+def test_expired_pending_booking_is_cancelled_once(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    booking = create_booking(client, user, hotel)
+    create_booking(client, user, hotel)
+    client.put(f"/api/bookings/{booking['id']}", json={"status": "pending"})
+    assert booked_counts(db, hotel.id) == [2, 2]
+
+    counts = advance_booking_statuses(db, now=datetime.now() + timedelta(hours=1))
+    assert counts == {"completed": 0, "no_show": 0, "expired": 1}
+    assert db.get(Booking, booking["id"]).status == "cancelled"
+    assert booked_counts(db, hotel.id) == [1, 1]
+
+    # 自动取消同样推送给前台
+    event = booking_events._buffer[-1]
+    assert event.event_type == "booking.cancelled"
+    assert json.loads(event.data)["booking"]["id"] == booking["id"]
+    assert json.loads(event.data)["booking"]["status"] == "cancelled"
+
+    # 已被自动取消的预订不能再次取消释放库存
+    assert client.put(f"/api/bookings/{booking['id']}/cancel").status_code == 400
+    assert advance_booking_statuses(db, now=datetime.now() + timedelta(hours=1))["expired"] == 0
+    assert booked_counts(db, hotel.id) == [1, 1]
+
+def test_batch_is_reselected_when_status_changed_under_lock(client, db, monkeypatch):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    booking = create_booking(client, user, hotel)
+    client.put(f"/api/bookings/{booking['id']}", json={"status": "pending"})
+
+    # 模拟选取之后、更新之前用户取消了该预订
+    original_query = db.query
+    state = {"cancelled": False}
+
+    def query(*entities, **kwargs):
+        if entities and entities[0] is Booking and not state["cancelled"]:
+            state["cancelled"] = True
+            assert client.put(f"/api/bookings/{booking['id']}/cancel").status_code == 200
+        return original_query(*entities, **kwargs)
+
+    monkeypatch.setattr(db, "query", query)
+    counts = advance_booking_statuses(db, now=datetime.now() + timedelta(hours=1))
+    assert counts["expired"] == 0
+    assert booked_counts(db, hotel.id) == [0, 0]
+
+def test_batch_that_keeps_conflicting_is_skipped(client, db, monkeypatch, caplog):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    booking = create_booking(client, user, hotel)
+    client.put(f"/api/bookings/{booking['id']}", json={"status": "pending"})
+
+    # 模拟每次在锁内都发现状态已变化：条件更新总是没有更新到行
+    attempts = []
+
+    def update(self, values, **kwargs):
+        attempts.append(values)
+        return 0
+
+    monkeypatch.setattr(Query, "update", update)
+    counts = advance_booking_statuses(db, now=datetime.now() + timedelta(hours=1))
+    assert counts["expired"] == 0
+    assert len(attempts) == booking_lifecycle.MAX_BATCH_CONFLICTS
+    assert "本轮跳过 1 条预订" in caplog.text
+    monkeypatch.undo()
+    assert db.get(Booking, booking["id"]).status == "pending"
+    assert booked_counts(db, hotel.id) == [1, 1]
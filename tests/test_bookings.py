@@ -0,0 +1,97 @@
+# 预订创建、取消与库存台账
+from datetime import date, timedelta
+from decimal import Decimal
+from app.inventory import HOTEL_TOTAL, NO_ROOM_TYPE
+from app.models import RoomInventory, RoomType
+from conftest import auth_headers, make_hotel, make_user
+
+def booked_counts(db, hotel_id, room_type_key=HOTEL_TOTAL):
+    """酒店每晚的合计占用数（或指定台账房型ID的占用数）"""
+    db.expire_all()
+    return [row.booked_count for row in db.query(RoomInventory).filter(
+        RoomInventory.hotel_id == hotel_id,
+        RoomInventory.room_type_id == room_type_key
+    ).order_by(RoomInventory.stay_date)]
+
+def create_booking(client, user, hotel, nights=2, **fields):
+    check_in = date.today() + timedelta(days=7)
+    response = client.post("/api/bookings/", headers=auth_headers(user), json={
+        "hotel_id": hotel.id,
+        "check_in_date": check_in.isoformat(),
+        "check_out_date": (check_in + timedelta(days=nights)).isoformat(),
+        "room_count": 1,
+        **fields
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_cancel_releases_inventory_once(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    first = create_booking(client, user, hotel)
+    create_booking(client, user, hotel)
+    assert booked_counts(db, hotel.id) == [2, 2]
+
+    assert client.put(f"/api/bookings/{first['id']}/cancel").status_code == 200
+    assert booked_counts(db, hotel.id) == [1, 1]
+
+    # 重复取消被拒绝，不会释放其他预订占用的库存
+    assert client.put(f"/api/bookings/{first['id']}/cancel").status_code == 400
+    assert client.put(f"/api/bookings/{first['id']}", json={"status": "cancelled"}).status_code == 200
+    assert booked_counts(db, hotel.id) == [1, 1]
+
+def test_update_status_reserves_again(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    booking = create_booking(client, user, hotel)
+    client.put(f"/api/bookings/{booking['id']}/cancel")
+    assert booked_counts(db, hotel.id) == [0, 0]
+
+    response = client.put(f"/api/bookings/{booking['id']}", json={"status": "confirmed"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed"
+    assert booked_counts(db, hotel.id) == [1, 1]
+
+def test_delete_room_type_with_active_bookings_is_refused(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    room_type = RoomType(hotel_id=hotel.id, type_name="大床房", base_price=Decimal("300"), total_count=5)
+    db.add(room_type)
+    db.commit()
+    booking = create_booking(client, user, hotel, room_type_id=room_type.id)
+
+    # 有效预订仍占用该房型的库存，删除后取消会从“未指定房型”的台账释放
+    assert client.delete(f"/api/room-types/{room_type.id}").status_code == 400
+    assert booked_counts(db, hotel.id, room_type.id) == [1, 1]
+
+    assert client.put(f"/api/bookings/{booking['id']}/cancel").status_code == 200
+    assert client.delete(f"/api/room-types/{room_type.id}").status_code == 200
+    assert booked_counts(db, hotel.id, room_type.id) == []
+    assert booked_counts(db, hotel.id, NO_ROOM_TYPE) == []
+    assert booked_counts(db, hotel.id) == [0, 0]
+
+def test_typed_and_unassigned_bookings_share_hotel_capacity(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db, rooms=3)
+    # 房型房间总数之和超过酒店可用房间数
+    room_types = [RoomType(hotel_id=hotel.id, type_name=f"房型{i}", base_price=Decimal("300"), total_count=2) for i in range(2)]
+    db.add_all(room_types)
+    db.commit()
+
+    create_booking(client, user, hotel, room_type_id=room_types[0].id)
+    create_booking(client, user, hotel, room_type_id=room_types[1].id)
+    create_booking(client, user, hotel)
+    assert booked_counts(db, hotel.id) == [3, 3]
+
+    # 房型自身仍有空房，但酒店已满：指定房型和未指定房型的预订都被拒绝
+    check_in = date.today() + timedelta(days=7)
+    for fields in ({"room_type_id": room_types[0].id}, {}):
+        response = client.post("/api/bookings/", headers=auth_headers(user), json={
+            "hotel_id": hotel.id,
+            "check_in_date": check_in.isoformat(),
+            "check_out_date": (check_in + timedelta(days=2)).isoformat(),
+            **fields
+        })
+        assert response.status_code == 400, response.text
+    assert booked_counts(db, hotel.id) == [3, 3]
+    assert booked_counts(db, hotel.id, room_types[0].id) == [1, 1]
@@ -0,0 +1,33 @@
+# 优惠券有效期索引：修改、删除优惠券后列表立即反映变化
+from datetime import date, timedelta
+from app.coupon_index import coupon_index_cache
+
+def create_coupon(client, code: str) -> dict:
+    response = client.post("/api/coupons/", json={
+        "coupon_code": code, "coupon_name": code, "coupon_type": "cash", "discount_amount": "10",
+        "start_date": str(date.today() - timedelta(days=1)), "end_date": str(date.today() + timedelta(days=30))
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def listed_ids(client, **params) -> list:
+    return [coupon["id"] for coupon in client.get("/api/coupons/", params=params).json()]
+
+def test_coupon_edits_and_deletes_refresh_the_index(client):
+    first = create_coupon(client, "A")
+    second = create_coupon(client, "B")
+    assert listed_ids(client, is_active=True) == [first["id"], second["id"]]
+    version = coupon_index_cache.version
+
+    # 停用、改期后不再出现在当天有效的列表中
+    assert client.put(f"/api/coupons/{first['id']}", json={"is_active": False}).status_code == 200
+    assert listed_ids(client, is_active=True) == [second["id"]]
+    assert coupon_index_cache.version != version
+
+    tomorrow = str(date.today() + timedelta(days=1))
+    assert client.put(f"/api/coupons/{second['id']}", json={"start_date": tomorrow}).status_code == 200
+    assert listed_ids(client) == [first["id"]]
+
+    assert client.delete(f"/api/coupons/{first['id']}").status_code == 200
+    assert listed_ids(client) == []
+    assert client.put(f"/api/coupons/{first['id']}", json={"is_active": True}).status_code == 404
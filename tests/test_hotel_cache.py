@@ -0,0 +1,20 @@
+# 酒店响应缓存的失效
+from app.routers.hotels import hotel_response_cache
+from conftest import auth_headers, make_hotel, make_user
+
+def test_new_review_invalidates_all_hotel_lists(client, db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    make_hotel(db, name="其他酒店")
+    # 缓存一个不包含该酒店的列表页（评分变化后该酒店可能进入此类页面）
+    client.get("/api/hotels/?min_rating=4")
+    client.get("/api/hotels/")
+    assert len(hotel_response_cache) == 2
+
+    response = client.post("/api/reviews/", headers=auth_headers(user), json={
+        "hotel_id": hotel.id, "rating": 5, "content": "很好"
+    })
+    assert response.status_code == 200, response.text
+    assert len(hotel_response_cache) == 0
+    counts = {item["id"]: item["review_count"] for item in client.get("/api/hotels/").json()}
+    assert counts[hotel.id] == 1
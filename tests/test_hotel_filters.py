@@ -0,0 +1,99 @@
+# 酒店标签筛选：匹配的酒店较多时在 Python 中过滤，结果与 SQL IN 条件一致
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+from app.geo_index import hotel_geo_index
+from app.models import City, Hotel
+from app.routers import hotels as hotels_router
+from app.schemas import HotelListWithFacetsResponse
+from app.pagination import NEXT_CURSOR_HEADER
+from app.tag_index import hotel_tag_index
+from conftest import auth_headers, make_hotel, make_user
+from test_query_counts import count_statements
+
+@pytest.fixture
+def tagged_hotels(db):
+    """12 家酒店，偶数编号带“亲子”标签"""
+    city = City(name="杭州")
+    db.add(city)
+    db.commit()
+    hotels = [
+        make_hotel(
+            db, name=f"酒店{i}", city_id=city.id, tags=json.dumps(["亲子"] if i % 2 == 0 else ["商务"]),
+            latitude=Decimal("30.25") + Decimal(i) / 1000, longitude=Decimal("120.16")
+        )
+        for i in range(12)
+    ]
+    hotel_tag_index.rebuild(db)
+    hotel_geo_index.rebuild(db)
+    return {"city_id": city.id, "family": {hotel.id for hotel in hotels[::2]}}
+
+def all_pages(client, url):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200, response.text
+        ids.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+@pytest.mark.parametrize("max_ids", [2, 500])
+def test_tag_filter_paginates_same_with_and_without_sql_in(client, tagged_hotels, monkeypatch, max_ids):
+    monkeypatch.setattr(hotels_router, "MAX_SQL_ID_FILTER", max_ids)
+    monkeypatch.setattr("app.pagination.FILTERED_SCAN_BATCH_SIZE", 3)
+    ids = all_pages(client, "/api/hotels/?tag=亲子&limit=2")
+    assert len(ids) == len(set(ids)) == 6
+    assert set(ids) == tagged_hotels["family"]
+
+    body = HotelListWithFacetsResponse.model_validate(
+        client.get("/api/hotels/?tag=亲子&facets=true&limit=2").json()
+    )
+    assert body.facets.total == 6
+    assert len(body.items) == 2
+    assert {(facet.value, facet.count) for facet in body.facets.tag} == {("亲子", 6)}
+
+def test_hotel_list_schema_declares_facets_response(client):
+    schema = client.get("/openapi.json").json()
+    response_schema = schema["paths"]["/api/hotels/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    refs = json.dumps(response_schema)
+    assert "HotelListWithFacetsResponse" in refs and "HotelResponseUpdated" in refs
+
+@pytest.mark.parametrize("max_ids", [2, 500])
+def test_tag_filter_on_availability_and_nearby(client, tagged_hotels, monkeypatch, max_ids):
+    monkeypatch.setattr(hotels_router, "MAX_SQL_ID_FILTER", max_ids)
+    check_in = date.today() + timedelta(days=3)
+    response = client.get(
+        f"/api/hotels/availability?city_id={tagged_hotels['city_id']}&tag=亲子"
+        f"&check_in={check_in}&check_out={check_in + timedelta(days=1)}"
+    )
+    assert {item["id"] for item in response.json()} == tagged_hotels["family"]
+
+    response = client.get("/api/hotels/nearby?lat=30.25&lng=120.16&radius_km=5&limit=4&tag=亲子")
+    assert len(response.json()) == 4
+    assert {item["id"] for item in response.json()} <= tagged_hotels["family"]
+
+def test_availability_inventory_query_does_not_bind_hotel_ids(client, db, tagged_hotels):
+    user = make_user(db)
+    check_in = date.today() + timedelta(days=3)
+    hotel_id = next(iter(tagged_hotels["family"]))
+    response = client.post("/api/bookings/", headers=auth_headers(user), json={
+        "hotel_id": hotel_id,
+        "check_in_date": check_in.isoformat(),
+        "check_out_date": (check_in + timedelta(days=1)).isoformat(),
+        "room_count": 10
+    })
+    assert response.status_code == 200, response.text
+
+    with count_statements() as statements:
+        response = client.get(
+            f"/api/hotels/availability?city_id={tagged_hotels['city_id']}"
+            f"&check_in={check_in}&check_out={check_in + timedelta(days=1)}"
+        )
+    assert {item["id"] for item in response.json()} == {
+        hotel.id for hotel in db.query(Hotel)
+    } - {hotel_id}
+    # 库存聚合按酒店筛选条件的子查询过滤，而不是逐个绑定 12 个酒店ID
+    inventory = [statement for statement in statements if "room_inventory" in statement]
+    assert len(inventory) == 1 and "SELECT hotels.id" in inventory[0]
@@ -0,0 +1,28 @@
+# 游标分页：排序列有组合索引，翻页按索引定位而不是全表排序
+from sqlalchemy import text
+from app.database import engine
+from app.models import Favorite, Hotel
+from app.pagination import _after_condition
+
+def query_plan(db, query) -> str:
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    return " ".join(row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+def test_hotel_and_favorite_pages_use_composite_indexes(db):
+    keys = [(Hotel.is_recommended, True), (Hotel.rating, True), (Hotel.id, True)]
+    hotels = db.query(Hotel).filter(_after_condition(keys, [True, 4.5, 10])).order_by(
+        Hotel.is_recommended.desc(), Hotel.rating.desc(), Hotel.id.desc()
+    ).limit(11)
+    plan = query_plan(db, hotels)
+    assert "idx_recommended_rating_id" in plan and "TEMP B-TREE" not in plan
+
+    favorites = db.query(Favorite).filter(Favorite.user_id == 1).order_by(
+        Favorite.created_at.desc(), Favorite.id.desc()
+    ).limit(11)
+    plan = query_plan(db, favorites)
+    assert "idx_user_created_id" in plan and "TEMP B-TREE" not in plan
+
+def test_sort_columns_are_not_nullable():
+    # 游标条件不会匹配 NULL，排序列为空的行会在翻页时被跳过
+    for column in (Hotel.is_recommended, Hotel.rating, Favorite.created_at):
+        assert not column.nullable
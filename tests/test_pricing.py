@@ -0,0 +1,59 @@
+# 报价缓存与基础价格版本号
+from datetime import date, timedelta
+from decimal import Decimal
+from app.models import Hotel
+from app.pricing_engine import BASE_PRICES_VERSION, base_price_version
+from app.versions import bump_version
+from conftest import auth_headers, make_hotel, make_user
+from test_bookings import create_booking
+
+def quote(client, hotel):
+    response = client.post("/api/pricing/calculate", json={
+        "hotel_id": hotel.id, "check_in_date": "2030-03-04", "check_out_date": "2030-03-05"
+    })
+    assert response.status_code == 200, response.text
+    return Decimal(str(response.json()["total_price"]))
+
+def test_quote_cache_follows_base_price_version(client, db, monkeypatch):
+    monkeypatch.setattr(base_price_version, "check_seconds", 0)
+    hotel = make_hotel(db)
+    assert quote(client, hotel) == Decimal("100")
+
+    # 模拟其他进程修改基础价格：只改库并递增版本号，不清理本进程的缓存
+    db.query(Hotel).filter(Hotel.id == hotel.id).update({Hotel.base_price: Decimal("150")})
+    db.commit()
+    assert quote(client, hotel) == Decimal("100")
+    bump_version(db, BASE_PRICES_VERSION)
+    db.commit()
+    assert quote(client, hotel) == Decimal("150")
+
+def test_booking_reuses_warm_quote_until_base_price_changes(client, db, monkeypatch):
+    monkeypatch.setattr(base_price_version, "check_seconds", 0)
+    user = make_user(db)
+    hotel = make_hotel(db)
+    check_in = date.today() + timedelta(days=7)
+    response = client.post("/api/pricing/calculate", headers=auth_headers(user), json={
+        "hotel_id": hotel.id,
+        "check_in_date": check_in.isoformat(),
+        "check_out_date": (check_in + timedelta(days=1)).isoformat()
+    })
+    assert Decimal(str(response.json()["total_price"])) == Decimal("100")
+
+    # 只改库、不递增版本号：创建预订复用用户刚看到的缓存报价
+    db.query(Hotel).filter(Hotel.id == hotel.id).update({Hotel.base_price: Decimal("180")})
+    db.commit()
+    booking = create_booking(client, user, hotel, nights=1)
+    assert Decimal(str(booking["final_price"])) == Decimal("100")
+
+    # 基础价格版本号变化后缓存报价失效，按新价格成交（另一位新用户，与缓存报价的用户分群相同）
+    bump_version(db, BASE_PRICES_VERSION)
+    db.commit()
+    booking = create_booking(client, make_user(db, username="other"), hotel, nights=1)
+    assert Decimal(str(booking["final_price"])) == Decimal("180")
+
+def test_update_hotel_price_invalidates_quotes(client, db):
+    hotel = make_hotel(db)
+    assert quote(client, hotel) == Decimal("100")
+    response = client.put(f"/api/hotels/{hotel.id}", json={"base_price": 120})
+    assert response.status_code == 200, response.text
+    assert quote(client, hotel) == Decimal("120")
@@ -0,0 +1,29 @@
+# 价格规则离线模拟：按规则ID汇总，同名规则分别统计
+from datetime import date, datetime
+from decimal import Decimal
+from app.models import Booking
+from app.pricing_simulator import run_simulation
+from conftest import make_hotel, make_user
+
+def test_rules_with_the_same_name_are_reported_separately(db):
+    user = make_user(db)
+    hotel = make_hotel(db)
+    for i, check_in in enumerate((date(2025, 3, 10), date(2025, 8, 10))):
+        db.add(Booking(
+            booking_no=f"BK{i}", user_id=user.id, hotel_id=hotel.id,
+            check_in_date=check_in, check_out_date=date(check_in.year, check_in.month, 11), nights=1,
+            room_count=1, base_price=Decimal("100"), final_price=Decimal("100"), status="completed",
+            booking_time=datetime(2025, 1, 1 + i)
+        ))
+    db.commit()
+
+    season = {"rule_name": "季节优惠", "rule_type": "season"}
+    rules = [
+        {**season, "discount_rate": 10, "start_date": "2025-03-01", "end_date": "2025-03-31"},
+        {**season, "discount_rate": 20, "start_date": "2025-08-01", "end_date": "2025-08-31"},
+    ]
+    report = run_simulation(rules, hotel_ids=[hotel.id], workers=1)
+    assert [(rule["rule_id"], rule["rule_name"], rule["bookings"], rule["discount_amount"]) for rule in report["rules"]] == [
+        (1, "季节优惠", 1, 10.0),
+        (2, "季节优惠", 1, 20.0),
+    ]
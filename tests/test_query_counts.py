@@ -0,0 +1,99 @@
+# 列表接口的 SQL 语句数不应随每页条数增长（防止逐行懒加载关联对象的 N+1 查询）
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+from app.database import engine
+from app.models import Booking, City, Coupon, Favorite, UserCoupon
+from conftest import auth_headers, make_hotel, make_user
+
+ROW_COUNT = 12
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def statement_count(client, url: str, headers: dict = None) -> int:
+    with count_statements() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+@pytest.fixture
+def seeded(db):
+    """每张表 ROW_COUNT 行，每家酒店属于不同城市"""
+    user = make_user(db)
+    hotels = []
+    for i in range(ROW_COUNT):
+        city = City(name=f"城市{i}")
+        db.add(city)
+        db.flush()
+        hotels.append(make_hotel(db, name=f"酒店{i}", city_id=city.id))
+
+    check_in = date.today() + timedelta(days=10)
+    for i, hotel in enumerate(hotels):
+        db.add(Booking(
+            booking_no=f"BK{i:05d}", user_id=user.id, hotel_id=hotel.id,
+            check_in_date=check_in, check_out_date=check_in + timedelta(days=1), nights=1,
+            room_count=1, base_price=Decimal("100"), final_price=Decimal("100"), status="confirmed",
+            booking_time=datetime(2026, 1, 1) + timedelta(minutes=i)
+        ))
+        db.add(Favorite(user_id=user.id, hotel_id=hotel.id))
+        coupon = Coupon(
+            coupon_code=f"C{i}", coupon_name=f"优惠券{i}", coupon_type="cash", discount_amount=Decimal("10"),
+            start_date=date.today(), end_date=date.today() + timedelta(days=30), hotel_id=hotel.id
+        )
+        db.add(coupon)
+        db.flush()
+        db.add(UserCoupon(user_id=user.id, coupon_id=coupon.id))
+    db.commit()
+    return user
+
+@pytest.mark.parametrize("path", ["/api/hotels/", "/api/bookings/", "/api/favorites/"])
+def test_list_query_count_does_not_grow_with_page_size(client, seeded, path):
+    headers = auth_headers(seeded)
+    small = statement_count(client, f"{path}?limit=2", headers)
+    large = statement_count(client, f"{path}?limit=10", headers)
+    assert small == large
+
+def test_my_coupons_query_count_does_not_grow_with_coupon_count(client, db, seeded):
+    # 我的优惠券不分页，比较拥有 2 张和 ROW_COUNT 张优惠券的用户
+    other = make_user(db, "other")
+    for coupon_id in db.query(Coupon.id).order_by(Coupon.id).limit(2):
+        db.add(UserCoupon(user_id=other.id, coupon_id=coupon_id[0]))
+    db.commit()
+
+    small = statement_count(client, "/api/coupons/my?limit=2", auth_headers(other))
+    large = statement_count(client, "/api/coupons/my?limit=10", auth_headers(seeded))
+    assert small == large
+
+def test_batch_quote_query_count_does_not_grow_with_quote_count(client, db, seeded):
+    # 用户分群在循环前从已登录的用户对象读取，报价数增加不会增加查询
+    hotel_ids = [hotel_id for hotel_id, in db.query(Booking.hotel_id).order_by(Booking.hotel_id)]
+    check_in = date.today() + timedelta(days=20)
+
+    def batch_statements(count: int) -> list:
+        with count_statements() as statements:
+            response = client.post("/api/pricing/batch", headers=auth_headers(seeded), json={
+                "check_in_date": str(check_in), "check_out_date": str(check_in + timedelta(days=2)),
+                "hotel_ids": hotel_ids[:count]
+            })
+        assert response.status_code == 200, response.text
+        return statements
+
+    batch_statements(1)  # 预热规则、节假日缓存
+    small = batch_statements(2)
+    large = batch_statements(ROW_COUNT)
+    assert len(small) == len(large)
+    # 认证取用户之外不再单独查询用户计数
+    assert sum("FROM users" in statement for statement in large) == 1
@@ -0,0 +1,65 @@
+# 酒店名称倒排索引
+from datetime import time
+from decimal import Decimal
+import pytest
+from app.models import Hotel
+from app.pagination import NEXT_CURSOR_HEADER
+from app.routers import hotels as hotels_router
+from app.search_index import HotelSearchIndex, hotel_search_index
+from test_query_counts import count_statements
+
+def build_index(db, count: int) -> HotelSearchIndex:
+    db.add_all([
+        Hotel(name=f"如家酒店{i}", address="-", base_price=Decimal("100"),
+              check_in_time=time(14), check_out_time=time(12))
+        for i in range(count)
+    ])
+    db.commit()
+    index = HotelSearchIndex()
+    index.rebuild(db)
+    return index
+
+def test_search_without_limit_returns_all_matches(db):
+    index = build_index(db, 1200)
+    assert len(index.search("如家", fields=("name",))) == 1000
+    assert len(index.search("如家", fields=("name",), limit=None)) == 1200
+
+def test_short_text_falls_back_to_like(db):
+    assert build_index(db, 1).search("如", fields=("name",)) is None
+
+def keyword_pages(client, url):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200, response.text
+        ids.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+def test_keyword_search_pages_by_cursor_in_bounded_chunks(client, db, monkeypatch):
+    monkeypatch.setattr(hotels_router, "MAX_SQL_ID_FILTER", 4)
+    build_index(db, 12)
+    db.query(Hotel).filter(Hotel.id % 3 == 0).update({Hotel.star_level: 5})
+    db.commit()
+    hotel_search_index.rebuild(db)
+    expected = [
+        hotel_id for hotel_id in hotel_search_index.search("如家")
+        if db.get(Hotel, hotel_id).star_level != 5
+    ]
+
+    with count_statements() as statements:
+        ids = keyword_pages(client, "/api/hotels/?keyword=如家&star_level=3&limit=3")
+    assert ids == expected
+    # 每条查询绑定的酒店ID不超过 MAX_SQL_ID_FILTER，不再生成按相关度排序的 CASE
+    assert not [statement for statement in statements if "CASE" in statement]
+
+    # 旧的 skip 分页仍按相关度顺序
+    response = client.get("/api/hotels/?keyword=如家&star_level=3&limit=3&skip=3")
+    assert [item["id"] for item in response.json()] == expected[3:6]
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzEsMl0"])
+def test_keyword_search_rejects_foreign_cursor(client, db, cursor):
+    build_index(db, 3)
+    hotel_search_index.rebuild(db)
+    assert client.get(f"/api/hotels/?keyword=如家&cursor={cursor}").status_code == 400